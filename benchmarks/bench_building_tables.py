@@ -0,0 +1,93 @@
+"""
+Building memory and queries: the pickled Room/Window dataclass snapshot vs memory-mapped tables.
+
+    python -m benchmarks.bench_building_tables --rooms 5000 --windows-per-room 4
+
+Reports the Python heap each representation costs a worker after loading (the mapped columns
+are page cache shared by all workers, shown separately as the file size) and times two queries
+(windows of every room, rooms in a volume range) as object loops vs column operations.
+"""
+import gc
+import time
+import pickle
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+import numpy as np
+
+from ifc_parsers import Room, Site, Window
+from building_tables import BuildingTables
+from benchmarks.bench_window_index import synthetic_boxes
+
+
+def synthetic_site(n_rooms: int, windows_per_room: int, seed: int = 0) -> Site:
+    rng = np.random.default_rng(seed)
+    boxes, windows = synthetic_boxes(n_rooms, n_rooms * windows_per_room, seed)
+    site = Site(52.0, 4.37, 0.0)
+    for i, bbox in enumerate(boxes):
+        name = f"{i // 100:02d}.West.{i % 100:03d}"
+        room_windows = [
+            Window(global_id=f"W{i}.{k}", room_name=str(i), bounding_box=w.bounding_box,
+                   SHGC=0.6, area=float(rng.uniform(1, 4)), is_external=True)
+            for k, w in enumerate(windows[i * windows_per_room:(i + 1) * windows_per_room])
+        ]
+        site.add_room(Room(global_id=f"R{i:06d}", short_name=str(i), long_name=name,
+                           volume=float(rng.uniform(30, 600)), bounding_box=bbox, windows=room_windows))
+    return site
+
+
+def heap_cost(load) -> tuple[object, int]:
+    """Result of load() and the Python heap it still holds."""
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=5000)
+    parser.add_argument("--windows-per-room", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bkviewer-bench-"))
+    site = synthetic_site(args.rooms, args.windows_per_room)
+    pkl, bkt = workdir / "site.pkl", workdir / "site.bkt"
+    pkl.write_bytes(pickle.dumps(site, protocol=pickle.HIGHEST_PROTOCOL))
+    BuildingTables.from_site(site).save(bkt)
+    del site
+
+    objects, object_heap = heap_cost(lambda: pickle.loads(pkl.read_bytes()))
+    columnar, columnar_heap = heap_cost(lambda: BuildingTables.load(bkt).site())
+    print(f"{args.rooms} rooms x {args.windows_per_room} windows")
+    print(f"  dataclasses      {object_heap / 2**20:8.2f} MiB heap per worker")
+    print(f"  tables           {columnar_heap / 2**20:8.2f} MiB heap per worker"
+          f" + {bkt.stat().st_size / 2**20:.2f} MiB mapped, shared by all workers")
+
+    rooms = list(objects.rooms.values())
+    tables = columnar.tables
+    assert [len(r.windows or []) for r in rooms] == list(tables.rooms["window_count"])
+    loop = timed(lambda: [sum((w.area or 0) * (w.SHGC or 0) for w in (r.windows or [])) for r in rooms])
+    columns = timed(lambda: np.bincount(tables.windows_of(np.arange(len(tables)))[1],
+                                        weights=tables.window_gain(np.arange(len(tables.windows["room"]))),
+                                        minlength=len(tables)))
+    print(f"  window gain per room   loop {loop * 1e3:8.2f} ms   columns {columns * 1e3:8.2f} ms ({loop / columns:.0f}x)")
+
+    expected = [i for i, r in enumerate(rooms) if 100 <= r.volume <= 200]
+    assert list(tables.rooms_by_volume(100, 200)) == expected
+    loop = timed(lambda: [i for i, r in enumerate(rooms) if 100 <= r.volume <= 200])
+    columns = timed(lambda: tables.rooms_by_volume(100, 200))
+    print(f"  rooms by volume range  loop {loop * 1e3:8.2f} ms   columns {columns * 1e3:8.2f} ms ({loop / columns:.0f}x)")
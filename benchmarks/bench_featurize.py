@@ -0,0 +1,109 @@
+"""
+Training featurization: the row-by-row prepare_training_data (iterrows, one weather lookup and
+one solar pass per observation, hourly downsampling afterwards) vs the columnar version.
+
+    python -m benchmarks.bench_featurize                                   # newest CSV in output/
+    python -m benchmarks.bench_featurize --csv output/combined_training_data_20250521.csv
+
+Sensor readings and external temperatures both come from the CSV, so nothing goes remote;
+rooms are synthetic (same volume and window set for every room in the file).
+"""
+import io
+import argparse
+import time
+import contextlib
+from pathlib import Path
+import pandas as pd
+
+from ifc_parsers import Site, Room, Window
+from ifc_calculators import solar_inflow_matrix
+from weather import CSVWeatherProvider, configure_weather, get_weather_store
+from xgboost_training_NEW import prepare_training_data
+
+
+def keep_first_per_hour(df_prepared: pd.DataFrame) -> pd.DataFrame:
+    """Keep only one observation per hour (the earliest)."""
+    if df_prepared.empty:
+        return df_prepared
+    # 1. Floor each timestamp to its hour
+    df_prepared['hour'] = df_prepared['timestamp'].dt.floor('h')
+    # 2. Sort so you pick the earliest (or latest) in each hour
+    df_prepared = df_prepared.sort_values('timestamp')
+    # 3. Group by the floored hour and take the first record
+    return (
+        df_prepared
+        .groupby('hour', group_keys=False)
+        .first()
+        .reset_index(drop=True)
+    )
+
+
+def legacy_prepare(df: pd.DataFrame, site: Site, room: Room) -> pd.DataFrame:
+    """The previous prepare_training_data followed by keep_first_per_hour."""
+    records = []
+    store = get_weather_store()
+    store.get_range(site, df['timestamp'].min(), df['timestamp'].max())
+    for _, row in df.iterrows():
+        timestamp = row['timestamp']
+        external_temp = store.get_temp(site, timestamp)
+        if external_temp is None:
+            continue
+        solar_inflow = float(solar_inflow_matrix(site, room.windows, pd.DatetimeIndex([timestamp])).sum())
+        print(f"[INFO] Total solar inflow at {timestamp}: {solar_inflow:.2f} J")
+        records.append({
+            'timestamp': timestamp,
+            'room_name': room.long_name,
+            'internal_temp': row['internal_temp'],
+            'external_temp': external_temp,
+            'volume': room.volume,
+            'solar_inflow': solar_inflow,
+        })
+    return keep_first_per_hour(pd.DataFrame(records))
+
+
+def synthetic_room(name: str, n_windows: int) -> Room:
+    windows = [
+        Window(global_id=f"{name}-{i}", room_name=name, SHGC=0.6, area=1.5 + 0.25 * i, is_external=True)
+        for i in range(n_windows)
+    ]
+    return Room(global_id=name, short_name=name, long_name=name, volume=440.0, windows=windows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", type=Path, default=None, help="training CSV (default: newest in output/)")
+    parser.add_argument("--windows", type=int, default=6, help="windows per synthetic room")
+    args = parser.parse_args()
+
+    csv = args.csv or max(Path("output").glob("combined_training_data_*.csv"))
+    configure_weather(CSVWeatherProvider(csv, time_column="timestamp", temp_column="external_temp"), ":memory:")
+    data = pd.read_csv(csv, parse_dates=["timestamp"])
+    site = Site(latitude=52.0056, longitude=4.3706, elevation=0.0)
+    print(f"{csv}: {len(data)} rows, {data['room_name'].nunique()} rooms, {args.windows} windows per room")
+
+    legacy_total = columnar_total = 0.0
+    for room_name, df in data.groupby("room_name"):
+        room = synthetic_room(room_name, args.windows)
+        raw = df[["timestamp", "internal_temp"]].reset_index(drop=True)
+
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = legacy_prepare(raw, site, room)
+        legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = prepare_training_data(raw, site, room)
+        columnar = time.perf_counter() - t0
+
+        pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False)
+        legacy_total += legacy
+        columnar_total += columnar
+        print(f"  {room_name:12s} {len(raw):5d} rows  legacy {legacy:7.3f} s   columnar {columnar:7.4f} s"
+              f"   ({legacy / columnar:.0f}x)")
+    print(f"  {'total':12s}             legacy {legacy_total:7.3f} s   columnar {columnar_total:7.4f} s"
+          f"   ({legacy_total / columnar_total:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+FROST ingestion: the original one-page-at-a-time loop vs FrostClient, against a local stub.
+
+    python -m benchmarks.bench_frost_ingest --datastreams 1 2 4 8 --latency 0.05
+"""
+import argparse
+import time
+import requests
+import pandas as pd
+
+from frost_client import FrostClient
+from benchmarks.frost_stub import FrostStub
+
+
+def legacy_fetch_all(base_url: str, page_size: int) -> pd.DataFrame:
+    """The original fetch_all_sensor_data: bare requests.get, one page after another."""
+    pages = []
+    skip = 0
+    while True:
+        data = requests.get(f"{base_url}&$top={page_size}&$skip={skip}").json()
+        observations = data.get("value", [])[:page_size]
+        if not observations:
+            break
+        pages.append(pd.DataFrame(
+            [{"timestamp": o.get("phenomenonTime"), "internal_temp": o.get("result")} for o in observations]
+        ))
+        skip += page_size
+    return pd.concat(pages, ignore_index=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datastreams", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--observations", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per simulated request")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with FrostStub(datastreams=max(args.datastreams), observations=args.observations, latency=args.latency) as stub:
+        print(f"{args.observations} observations per datastream, page size {args.page_size}, latency {args.latency * 1e3:.0f} ms")
+        for n in args.datastreams:
+            urls = {ds: stub.observations_url(ds) for ds in range(1, n + 1)}
+
+            t0 = time.perf_counter()
+            legacy = {ds: legacy_fetch_all(url, args.page_size) for ds, url in urls.items()}
+            legacy_time = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            with FrostClient(max_workers=args.workers, max_streams=n) as client:
+                fetched = client.fetch_many(urls, page_size=args.page_size)
+            pooled_time = time.perf_counter() - t0
+
+            assert all(len(fetched[ds]) == len(legacy[ds]) for ds in urls), "row counts differ"
+            print(f"  {n:2d} datastreams  legacy {legacy_time:7.2f} s   FrostClient {pooled_time:7.2f} s"
+                  f"   ({legacy_time / pooled_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
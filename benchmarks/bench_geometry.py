@@ -0,0 +1,67 @@
+"""
+Geometry extraction: one create_shape per element vs extract_geometry's bulk iterator pass.
+
+    python -m benchmarks.bench_geometry                                # synthetic building
+    python -m benchmarks.bench_geometry --ifc static/IFC/BK_v2_vb_updated.ifc --threads 1 2 4 8
+
+Tessellates every IfcSpace and external IfcWindow, checks that both paths give the same
+bounding boxes, and times the iterator at each thread count (default: 1 and every core).
+"""
+import os
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import ifcopenshell
+import ifcopenshell.geom
+
+from ifc_parsers import compute_bounding_box, external_windows, extract_geometry, geometry_settings
+from benchmarks.synthetic_ifc import generate_building
+
+
+def per_element(settings, elements) -> dict:
+    """The original path: one create_shape call per element."""
+    boxes = {}
+    for element in elements:
+        try:
+            bbox = compute_bounding_box(ifcopenshell.geom.create_shape(settings, element))
+        except Exception:
+            bbox = None
+        if bbox is not None:
+            boxes[element.id()] = bbox
+    return boxes
+
+
+def bench(ifc_path: Path, thread_counts: list[int]) -> None:
+    model = ifcopenshell.open(ifc_path)
+    settings = geometry_settings()
+    elements = list(model.by_type("IfcSpace")) + [w for w, _ in external_windows(model)]
+
+    t0 = time.perf_counter()
+    expected = per_element(settings, elements)
+    legacy = time.perf_counter() - t0
+    print(f"{ifc_path}: {len(elements)} elements")
+    print(f"  create_shape loop           {legacy:8.2f} s")
+
+    for threads in thread_counts:
+        t0 = time.perf_counter()
+        geometry = extract_geometry(model, elements, settings, threads=threads)
+        bulk = time.perf_counter() - t0
+        assert {k: g.bounding_box for k, g in geometry.items()} == expected, "bulk geometry disagrees with create_shape"
+        print(f"  extract_geometry {threads:3d} thr    {bulk:8.2f} s   ({legacy / bulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ifc", type=Path, help="benchmark a real IFC instead of a synthetic building")
+    parser.add_argument("--floors", type=int, default=6)
+    parser.add_argument("--rooms-per-floor", type=int, default=60)
+    parser.add_argument("--windows-per-room", type=int, default=3)
+    parser.add_argument("--threads", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    ifc_path = args.ifc
+    if ifc_path is None:
+        ifc_path = generate_building(Path(tempfile.mkdtemp(prefix="bkviewer-bench-")) / "geometry.ifc",
+                                     args.floors, args.rooms_per_floor, args.windows_per_room)
+    bench(ifc_path, args.threads)
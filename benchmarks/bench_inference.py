@@ -0,0 +1,60 @@
+"""
+Model inference: sklearn Pipeline.predict on a DataFrame vs FastPredictor on a NumPy array,
+with a parity check against every saved pipeline.
+
+    python -m benchmarks.bench_inference
+    python -m benchmarks.bench_inference --models xgboost_models --batch 1 32 1024
+"""
+import argparse
+import time
+from pathlib import Path
+import joblib
+import numpy as np
+import pandas as pd
+
+from inference import FastPredictor, FEATURES
+
+
+def per_call(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", type=Path, default=Path("xgboost_models"))
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16, 256, 4096])
+    parser.add_argument("--rows", type=int, default=10_000, help="rows in the parity check")
+    args = parser.parse_args()
+
+    paths = sorted(args.models.glob("xgb_pipeline_*.joblib"))
+    if not paths:
+        raise SystemExit(f"No xgb_pipeline_*.joblib in {args.models}/")
+
+    for path in paths:
+        pipeline = joblib.load(path)
+        predictor = FastPredictor(pipeline)
+        if not predictor.fast:
+            print(f"{path.name}: not foldable, skipped")
+            continue
+        X = predictor.probe(args.rows, seed=1)
+        expected = pipeline.predict(pd.DataFrame(X, columns=FEATURES))
+        diff = np.abs(predictor.predict(X) - expected).max()
+        assert diff <= 1e-5, f"{path.name}: max abs difference {diff}"
+        print(f"{path.name}: parity on {args.rows} rows, max abs difference {diff:.2e}")
+
+        for batch in args.batch:
+            rows = X[:batch] if batch <= len(X) else predictor.probe(batch, seed=2)
+            frame = pd.DataFrame(rows, columns=FEATURES)
+            repeat = max(20, 20_000 // batch)
+            slow = per_call(lambda: pipeline.predict(frame), max(5, repeat // 10))
+            fast = per_call(lambda: predictor.predict(rows), repeat)
+            print(f"  batch {batch:5d}  Pipeline.predict {slow * 1e6:9.1f} us   FastPredictor {fast * 1e6:9.1f} us"
+                  f"   ({slow / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Window-to-room assignment: the original per-window Python loop vs WindowIndex.
+
+    python -m benchmarks.bench_window_index                       # synthetic bounding boxes
+    python -m benchmarks.bench_window_index --ifc static/IFC/BK_v2_vb_updated.ifc
+
+With --ifc, the original parse_room loop (one create_shape per window, per room) is timed for
+a sample of rooms and extrapolated to the whole building, next to parse_building.
+"""
+import argparse
+import time
+import numpy as np
+import ifcopenshell
+import ifcopenshell.geom
+import ifcopenshell.util.element
+
+from ifc_parsers import BoundingBox, Window, WindowIndex, WINDOW_BUFFER, compute_bounding_box, parse_building
+
+
+def legacy_assign(room_boxes: list[BoundingBox], windows: list[Window], buf: float = WINDOW_BUFFER) -> list[list[int]]:
+    """The containment test from the original parse_room, run for every room."""
+    result = []
+    for bbox in room_boxes:
+        hits = []
+        for i, w in enumerate(windows):
+            wbbox = w.bounding_box
+            if (
+                wbbox.x_min >= bbox.x_min - buf and
+                wbbox.y_min >= bbox.y_min - buf and
+                wbbox.z_min >= bbox.z_min - buf and
+                wbbox.x_max <= bbox.x_max + buf and
+                wbbox.y_max <= bbox.y_max + buf and
+                wbbox.z_max <= bbox.z_max + buf
+            ):
+                hits.append(i)
+        result.append(hits)
+    return result
+
+
+def synthetic_boxes(n_rooms: int, n_windows: int, seed: int = 0) -> tuple[list[BoundingBox], list[Window]]:
+    rng = np.random.default_rng(seed)
+    def box(lo, size):
+        return BoundingBox(lo[0], lo[0] + size[0], lo[1], lo[1] + size[1], lo[2], lo[2] + size[2])
+    rooms = [box(rng.uniform(0, 200, 3), rng.uniform(3, 12, 3)) for _ in range(n_rooms)]
+    windows = [
+        Window(global_id=str(i), room_name="", bounding_box=box(rng.uniform(0, 200, 3), rng.uniform(0.1, 2.5, 3)))
+        for i in range(n_windows)
+    ]
+    return rooms, windows
+
+
+def bench_synthetic(n_rooms: int, n_windows: int, repeat: int) -> None:
+    rooms, windows = synthetic_boxes(n_rooms, n_windows)
+    index = WindowIndex(windows)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        expected = legacy_assign(rooms, windows)
+    legacy = (time.perf_counter() - t0) / repeat
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        matrix = index.query_all(rooms)
+    vectorized = (time.perf_counter() - t0) / repeat
+
+    assert [list(np.flatnonzero(row)) for row in matrix] == expected, "WindowIndex disagrees with the legacy loop"
+    print(f"synthetic {n_rooms} rooms x {n_windows} windows")
+    print(f"  legacy loop      {legacy * 1e3:10.2f} ms")
+    print(f"  WindowIndex      {vectorized * 1e3:10.2f} ms   ({legacy / vectorized:.0f}x)")
+
+
+def bench_ifc(ifc_path: str, sample_rooms: int) -> None:
+    model = ifcopenshell.open(ifc_path)
+    settings = ifcopenshell.geom.settings()
+    settings.set(settings.USE_WORLD_COORDS, True)
+    spaces = model.by_type("IfcSpace")
+    windows = model.by_type("IfcWindow")
+    sample = spaces[:sample_rooms]
+
+    # original per-room loop: psets read up to three times and one tessellation per window
+    t0 = time.perf_counter()
+    for space in sample:
+        bbox = compute_bounding_box(ifcopenshell.geom.create_shape(settings, space))
+        for w in windows:
+            psets = ifcopenshell.util.element.get_psets(w).get("Pset_WindowCommon", {})
+            if not psets.get("IsExternal", False):
+                continue
+            try:
+                wbbox = compute_bounding_box(ifcopenshell.geom.create_shape(settings, w))
+            except Exception:
+                wbbox = None
+            if bbox and wbbox:
+                ifcopenshell.util.element.get_psets(w).get("BaseQuantities", {})
+                ifcopenshell.util.element.get_psets(w).get("Analytical Properties(Type)", {})
+    per_room = (time.perf_counter() - t0) / max(len(sample), 1)
+
+    t0 = time.perf_counter()
+    site = parse_building(ifc_path)
+    building = time.perf_counter() - t0
+
+    print(f"{ifc_path}: {len(spaces)} spaces, {len(windows)} windows")
+    print(f"  legacy loop      {per_room:10.2f} s per room, ~{per_room * len(spaces):.1f} s for the building (extrapolated)")
+    print(f"  parse_building   {building:10.2f} s for all {len(site.rooms)} rooms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=619)
+    parser.add_argument("--windows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ifc", help="also benchmark against a real IFC file")
+    parser.add_argument("--sample-rooms", type=int, default=3)
+    args = parser.parse_args()
+
+    bench_synthetic(args.rooms, args.windows, args.repeat)
+    if args.ifc:
+        bench_ifc(args.ifc, args.sample_rooms)
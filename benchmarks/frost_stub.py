@@ -0,0 +1,117 @@
+"""
+Local stand-in for the FROST Server OData API, for exercising the ingestion code offline.
+
+    with FrostStub(datastreams=3, observations=2000, latency=0.05) as stub:
+        url = stub.observations_url(1)   # same shape as the real Datastreams(N)/Observations URL
+
+Supports $top, $skip, $count=true and $filter=phenomenonTime gt <ISO time> on
+/FROST-Server/v1.0/Datastreams(N)/Observations. Results are always newest first, like
+$orderby=phenomenonTime desc. add_observations() appends newer data between runs.
+"""
+import re
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+_PATH_RE = re.compile(r"^/FROST-Server/v1\.0/Datastreams\((\d+)\)/Observations$")
+_FILTER_RE = re.compile(r"^phenomenonTime gt (\S+)$")
+
+
+class FrostStub:
+    def __init__(self, datastreams: int = 3, observations: int = 2000, latency: float = 0.0,
+                 start: str = "2025-03-01", freq: str = "10min", fail_every: int = 0):
+        """
+        latency: seconds added to every response. fail_every: if > 0, every n-th request gets a
+        503 first, to exercise retries.
+        """
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.freq = freq
+        self._rng = np.random.default_rng(0)
+        self.data: dict[int, list[dict]] = {ds: [] for ds in range(1, datastreams + 1)}
+        self._next = pd.Timestamp(start, tz="UTC")
+        self.add_observations(observations)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def add_observations(self, count: int) -> None:
+        """Append count newer observations to every datastream."""
+        times = pd.date_range(self._next, periods=count, freq=self.freq)
+        self._next = times[-1] + pd.Timedelta(self.freq)
+        for ds, observations in self.data.items():
+            new = [
+                {"phenomenonTime": t.isoformat(), "result": round(float(v), 1)}
+                for t, v in zip(times, 21 + 2 * self._rng.standard_normal(count))
+            ]
+            # newest first
+            self.data[ds] = new[::-1] + observations
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/FROST-Server/v1.0"
+
+    def observations_url(self, datastream: int) -> str:
+        return f"{self.base_url}/Datastreams({datastream})/Observations?$orderby=phenomenonTime desc"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub.fail_every and stub.requests % stub.fail_every == 0
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if fail:
+                    self.send_error(503)
+                    return
+                parts = urlsplit(self.path)
+                match = _PATH_RE.match(parts.path)
+                if not match or int(match.group(1)) not in stub.data:
+                    self.send_error(404)
+                    return
+                params = parse_qs(parts.query)
+                observations = stub.data[int(match.group(1))]
+                if "$filter" in params:
+                    condition = _FILTER_RE.match(params["$filter"][0])
+                    if not condition:
+                        self.send_error(400, "only 'phenomenonTime gt <time>' filters are supported")
+                        return
+                    after = pd.Timestamp(condition.group(1))
+                    observations = [o for o in observations if pd.Timestamp(o["phenomenonTime"]) > after]
+                skip = int(params.get("$skip", ["0"])[0])
+                top = int(params.get("$top", ["100"])[0])
+                body = {}
+                if params.get("$count", ["false"])[0] == "true":
+                    body["@iot.count"] = len(observations)
+                body["value"] = observations[skip:skip + top]
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def __enter__(self) -> "FrostStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
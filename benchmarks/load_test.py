@@ -0,0 +1,317 @@
+"""
+End-to-end load test of the FastAPI app (main.app), in-process and fully offline: a synthetic IFC
+(or --ifc), stub weather and the models in xgboost_models/.
+
+    python -m benchmarks.load_test --concurrency 1 8 32 --duration 20 --output load.json
+    python -m benchmarks.load_test --mix hot=1                        # one room, over and over
+    python -m benchmarks.load_test --mix random=0.8,batch=0.1,series=0.1 --uncached
+    python -m benchmarks.load_test --output new.json --compare load.json --max-regression 1.25
+
+Requests go through httpx's ASGI transport straight into the app, with its lifespan (warmup)
+running as in uvicorn and traffic starting once /readyz answers 200. Each --concurrency level
+is a closed loop: that many clients send requests back to back for --duration seconds after
+--warmup seconds that aren't recorded. Request kinds, picked at random by --mix weights:
+
+    hot       GET /api/simulate/{room}, always the same room
+    random    GET /api/simulate/{room}, a uniformly random room
+    batch     POST /api/simulate/batch with --batch-size random rooms
+    series    GET /api/simulate/{room}/series, the next 24 hours hourly for a random room
+    building  GET /api/building/temperatures, every room as NDJSON
+
+--uncached turns the per-room response cache off, so every simulate request is computed
+(concurrent requests for one room still share a computation). Clients and app share one event
+loop and one process, as in a single uvicorn worker; network time is not included.
+
+Per level and per kind the JSON has throughput, error rate and latency percentiles (ms), plus
+the server's own stage breakdown from the Server-Timing headers. --compare exits with status 1
+when a p50/p99 got more than --max-regression times slower, throughput dropped by more than
+that factor, or the error rate went past --max-error-rate.
+"""
+import os
+import math
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from collections import defaultdict
+from typing import Optional
+import numpy as np
+import pandas as pd
+import httpx
+
+from caching import TTLCache
+from weather import configure_weather
+from building_snapshot import SNAPSHOT_DIR_ENV
+from benchmarks.synthetic_ifc import generate_building, room_name
+from benchmarks.stub_weather import StubWeatherProvider
+from benchmarks.suite import environment, git_info
+
+SCHEMA_VERSION = 1
+KINDS = ("hot", "random", "batch", "series", "building")
+DEFAULT_MIX = "hot=0.3,random=0.5,batch=0.1,series=0.1"
+PERCENTILES = (50, 90, 99)
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """Weights from "random=0.8,batch=0.2", normalized to sum to 1; a bare kind counts as weight 1."""
+    weights = {}
+    for part in text.split(","):
+        kind, _, weight = part.strip().partition("=")
+        if kind not in KINDS:
+            raise ValueError(f"Unknown request kind '{kind}', expected one of {', '.join(KINDS)}")
+        weights[kind] = float(weight) if weight else 1.0
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Mix weights must add up to more than 0")
+    return {kind: weight / total for kind, weight in weights.items()}
+
+
+def parse_server_timing(header: Optional[str]) -> dict[str, float]:
+    """'resolve;dur=0.12, predict;dur=0.80' -> {stage: milliseconds}."""
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            stages[name] = float(params[4:])
+    return stages
+
+
+class RequestMix:
+    """Builds the next request for a kind; seeded, so runs with the same arguments send the same requests."""
+    def __init__(self, rooms: list[str], hot_room: str, weights: dict[str, float], batch_size: int, seed: int):
+        self.rooms = rooms
+        self.hot_room = hot_room
+        self.kinds = list(weights)
+        self.weights = np.array([weights[k] for k in self.kinds])
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+
+    def next(self) -> tuple[str, str, str, Optional[dict]]:
+        """(kind, method, url, JSON body)"""
+        kind = self.kinds[self.rng.choice(len(self.kinds), p=self.weights)]
+        room = self.rooms[self.rng.integers(len(self.rooms))]
+        if kind == "hot":
+            return kind, "GET", f"/api/simulate/{self.hot_room}", None
+        if kind == "random":
+            return kind, "GET", f"/api/simulate/{room}", None
+        if kind == "batch":
+            picked = self.rng.choice(len(self.rooms), size=min(self.batch_size, len(self.rooms)), replace=False)
+            return kind, "POST", "/api/simulate/batch", {"rooms": [self.rooms[i] for i in picked]}
+        if kind == "series":
+            return kind, "GET", f"/api/simulate/{room}/series", None
+        return kind, "GET", "/api/building/temperatures", None
+
+
+async def client_loop(client: httpx.AsyncClient, mix: RequestMix, record_from: float, stop_at: float,
+                      records: list[dict]) -> None:
+    while time.perf_counter() < stop_at:
+        kind, method, url, body = mix.next()
+        start = time.perf_counter()
+        record = {"kind": kind}
+        try:
+            response = await client.request(method, url, json=body)
+            record["status"] = response.status_code
+            record["ok"] = response.status_code < 400
+            record["stages"] = parse_server_timing(response.headers.get("server-timing"))
+        except Exception as e:
+            record["status"] = None
+            record["ok"] = False
+            record["error"] = repr(e)
+        end = time.perf_counter()
+        if start >= record_from and end <= stop_at:
+            record["latency"] = end - start
+            records.append(record)
+
+
+def summarize(records: list[dict], seconds: float) -> dict:
+    latencies = np.array([r["latency"] for r in records]) * 1e3
+    errors = sum(not r["ok"] for r in records)
+    summary = {
+        "requests": len(records),
+        "throughput": len(records) / seconds,
+        "errors": errors,
+        "error_rate": errors / len(records) if records else 0.0,
+    }
+    if len(records):
+        summary.update({f"p{p}": float(np.percentile(latencies, p)) for p in PERCENTILES})
+        summary.update({"mean": float(latencies.mean()), "max": float(latencies.max())})
+    statuses = defaultdict(int)
+    for r in records:
+        statuses[str(r["status"])] += 1
+    summary["statuses"] = dict(statuses)
+    return summary
+
+
+async def run_level(client: httpx.AsyncClient, mix: RequestMix, concurrency: int, duration: float,
+                    warmup: float) -> dict:
+    records: list[dict] = []
+    start = time.perf_counter()
+    record_from, stop_at = start + warmup, start + warmup + duration
+    await asyncio.gather(*(client_loop(client, mix, record_from, stop_at, records) for _ in range(concurrency)))
+
+    result = {"concurrency": concurrency, "duration": duration, "overall": summarize(records, duration), "kinds": {}}
+    for kind in mix.kinds:
+        result["kinds"][kind] = summarize([r for r in records if r["kind"] == kind], duration)
+    # median milliseconds per server-side stage, over the responses that reported it
+    stages = defaultdict(list)
+    for r in records:
+        for name, ms in r.get("stages", {}).items():
+            stages[name].append(ms)
+    result["server_timing_p50"] = {name: float(np.median(values)) for name, values in stages.items()}
+    failures = [r.get("error") or f"HTTP {r['status']}" for r in records if not r["ok"]]
+    result["sample_errors"] = sorted(set(failures))[:5]
+    return result
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> dict:
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get("/readyz")
+        report = response.json()
+        if response.status_code == 200:
+            return report
+        if not report["warming_up"] or time.perf_counter() > deadline:
+            raise SystemExit(f"App did not become ready: {json.dumps(report['steps'])}")
+        await asyncio.sleep(0.1)
+
+
+async def load_test(args: argparse.Namespace, ifc_path: Path, rooms: list[str], hot_room: str) -> dict:
+    # the request path reads the building and models through the simulator's module globals
+    import main
+    import simulator
+    from buildings import Building, BuildingRegistry
+    simulator.buildings = BuildingRegistry([Building("loadtest", ifc_path)])
+    if args.uncached:
+        # every entry is already expired when it is read back
+        main.pipeline.response_cache = TTLCache(maxsize=1, clock=lambda: math.inf)
+
+    weights = parse_mix(args.mix)
+    levels = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            readiness = await wait_ready(client, args.ready_timeout)
+            print(f"ready after {readiness['seconds_since_start']:.1f} s")
+            for concurrency in args.concurrency:
+                mix = RequestMix(rooms, hot_room, weights, args.batch_size, args.seed)
+                level = await run_level(client, mix, concurrency, args.duration, args.warmup)
+                levels[f"concurrency={concurrency}"] = level
+                overall = level["overall"]
+                print(f"  concurrency {concurrency:4d}  {overall['throughput']:9.1f} req/s   "
+                      f"p50 {overall.get('p50', float('nan')):8.2f} ms   p99 {overall.get('p99', float('nan')):8.2f} ms   "
+                      f"errors {overall['error_rate']:.2%}")
+                for kind, summary in level["kinds"].items():
+                    if summary["requests"]:
+                        print(f"      {kind:9s} {summary['throughput']:9.1f} req/s   p50 {summary['p50']:8.2f} ms   "
+                              f"p99 {summary['p99']:8.2f} ms   errors {summary['error_rate']:.2%}")
+                for error in level["sample_errors"]:
+                    print(f"      ! {error}")
+            cache_stats = (await client.get("/api/cache/stats")).json()
+    return {"levels": levels, "cache_stats": cache_stats}
+
+
+def compare(levels: dict, baseline: dict, max_regression: float, max_error_rate: float) -> bool:
+    """Print latency/throughput ratios against a baseline run; False if any gate fails."""
+    ok = True
+    print(f"\nvs {baseline.get('git', {}).get('commit') or 'baseline'}:")
+    for level_name, level in levels.items():
+        base_level = baseline.get("levels", {}).get(level_name)
+        scopes = {"overall": level["overall"], **level["kinds"]}
+        for scope, summary in scopes.items():
+            if summary["error_rate"] > max_error_rate:
+                print(f"  {level_name:16s} {scope:9s} error rate {summary['error_rate']:.2%}  ERRORS")
+                ok = False
+            if base_level is None:
+                continue
+            base = base_level["overall"] if scope == "overall" else base_level["kinds"].get(scope)
+            if not base or not base.get("requests") or not summary["requests"]:
+                continue
+            flags = []
+            for p in ("p50", "p99"):
+                if summary[p] / base[p] > max_regression:
+                    flags.append(p)
+            if base["throughput"] / summary["throughput"] > max_regression:
+                flags.append("throughput")
+            ok = ok and not flags
+            print(f"  {level_name:16s} {scope:9s} p50 x{summary['p50'] / base['p50']:5.2f}   "
+                  f"p99 x{summary['p99'] / base['p99']:5.2f}   throughput x{summary['throughput'] / base['throughput']:5.2f}"
+                  + (f"  REGRESSION ({', '.join(flags)})" if flags else ""))
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ifc", type=Path, default=None, help="sample IFC to use instead of a synthetic one")
+    parser.add_argument("--floors", type=int, default=4)
+    parser.add_argument("--rooms-per-floor", type=int, default=40)
+    parser.add_argument("--windows-per-room", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="clients per level")
+    parser.add_argument("--duration", type=float, default=10.0, help="recorded seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unrecorded seconds before each level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"request kinds and weights ({', '.join(KINDS)})")
+    parser.add_argument("--batch-size", type=int, default=50, help="rooms per batch request")
+    parser.add_argument("--uncached", action="store_true", help="turn the per-room response cache off")
+    parser.add_argument("--weather-latency", type=float, default=0.0, help="seconds per stub weather fetch")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--output", type=Path, default=None, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="baseline JSON from an earlier run")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="with --compare: fail if p50/p99 or throughput are worse by more than this factor")
+    parser.add_argument("--max-error-rate", type=float, default=0.0,
+                        help="with --compare: fail if any error rate is above this")
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    workdir = Path(tempfile.mkdtemp(prefix="bkviewer-load-"))
+    # building snapshots go to the temp dir too, not the checkout's snapshots/
+    os.environ[SNAPSHOT_DIR_ENV] = str(workdir / "snapshots")
+    if args.ifc is not None:
+        ifc_path = args.ifc
+        fixture = {"ifc": str(ifc_path)}
+    else:
+        fixture = {"floors": args.floors, "rooms_per_floor": args.rooms_per_floor,
+                   "windows_per_room": args.windows_per_room, "seed": 0}
+        ifc_path = generate_building(workdir / "load_building.ifc", args.floors, args.rooms_per_floor,
+                                     args.windows_per_room, seed=0)
+    configure_weather(StubWeatherProvider(latency=args.weather_latency), ":memory:")
+
+    from building_snapshot import get_building
+    rooms = sorted(room.long_name for room in get_building(ifc_path).rooms.values())
+    # a south-façade room halfway up the synthetic building, else the first room
+    hot_room = room_name(args.floors // 2, 0) if args.ifc is None else rooms[0]
+
+    settings = {k: getattr(args, k) for k in ("concurrency", "duration", "warmup", "mix", "batch_size",
+                                              "uncached", "weather_latency", "seed")}
+    print(f"{len(rooms)} rooms, hot room {hot_room}, mix {args.mix}{', uncached' if args.uncached else ''}")
+    results = asyncio.run(load_test(args, ifc_path, rooms, hot_room))
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created": pd.Timestamp.now(tz="UTC").isoformat(),
+        "git": git_info(),
+        "environment": environment(),
+        "fixture": fixture,
+        "settings": settings,
+        **results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        # results are only comparable for the same load; say so when the baseline ran another one
+        base_settings = json.loads(json.dumps(baseline.get("settings", {})))
+        differing = [k for k, v in json.loads(json.dumps(settings)).items() if base_settings.get(k) != v]
+        if differing:
+            print(f"[WARNING] Baseline ran with different settings: "
+                  + ", ".join(f"{k}={base_settings.get(k)!r} (now {settings[k]!r})" for k in differing))
+        if not compare(results["levels"], baseline, args.max_regression, args.max_error_rate):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Benchmark suite for the hot paths, fully offline: a synthetic IFC (benchmarks.synthetic_ifc),
+stub weather (benchmarks.stub_weather) and the models in xgboost_models/.
+
+    python -m benchmarks.suite --output bench.json                  # run everything
+    python -m benchmarks.suite --filter endpoint --repeat 50
+    python -m benchmarks.suite --output new.json --compare bench.json --max-regression 1.25
+
+Every case reports per-call seconds (min/median/mean/p95/stdev over --repeat samples, each
+sample timing enough calls to last at least --min-time). The JSON carries the git commit and
+library versions, so files from different commits can be compared with --compare, which exits
+with status 1 when a case's median got slower than --max-regression times the baseline.
+"""
+import os
+import json
+import time
+import contextlib
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from importlib import metadata
+from dataclasses import dataclass
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+import ifcopenshell
+import ifcopenshell.geom
+
+from ifc_parsers import compute_bounding_box, extract_site_details, parse_room, parse_building
+from ifc_calculators import window_solar_inflow
+from weather import configure_weather
+from building_snapshot import SNAPSHOT_DIR_ENV
+from benchmarks.synthetic_ifc import generate_building, room_name
+from benchmarks.stub_weather import StubWeatherProvider
+
+SCHEMA_VERSION = 1
+PACKAGES = ("ifcopenshell", "numpy", "pandas", "pvlib", "xgboost", "scikit-learn", "fastapi")
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[], object]
+    # run before every call, outside the timed region; forces one call per sample
+    setup: Optional[Callable[[], None]] = None
+    # upper bound on samples for slow cases
+    max_repeat: Optional[int] = None
+
+
+def measure(case: Case, repeat: int, min_time: float) -> dict:
+    """Per-call timings of case.fn over repeat samples."""
+    repeat = min(repeat, case.max_repeat or repeat)
+    if case.setup is not None:
+        number = 1
+    else:
+        # calibrate: enough calls per sample that timer resolution doesn't matter
+        number = 1
+        while True:
+            t0 = time.perf_counter()
+            for _ in range(number):
+                case.fn()
+            if time.perf_counter() - t0 >= min_time or number >= 1 << 16:
+                break
+            number *= 2
+    samples = []
+    for _ in range(repeat):
+        if case.setup is not None:
+            case.setup()
+        t0 = time.perf_counter()
+        for _ in range(number):
+            case.fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return {
+        "unit": "s",
+        "number": number,
+        "repeat": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "p95": float(np.percentile(samples, 95)),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def git_info() -> dict:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def environment() -> dict:
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+    }
+
+
+def build_cases(ifc_path: Path, target_room: str, stack: contextlib.ExitStack) -> list[Case]:
+    model = ifcopenshell.open(ifc_path)
+    settings = ifcopenshell.geom.settings()
+    settings.set(settings.USE_WORLD_COORDS, True)
+    space = next(s for s in model.by_type("IfcSpace") if s.LongName == target_room)
+    shape = ifcopenshell.geom.create_shape(settings, space)
+
+    site = parse_building(ifc_path)
+    room = site.get_room(target_room)
+    window = room.windows[0]
+    noon = pd.Timestamp("2025-06-21 12:00", tz=site.timezone)
+
+    # the request path reads the building and the model through the simulator's module globals
+    import simulator
+    import main
+    from fastapi.testclient import TestClient
+    from buildings import Building, BuildingRegistry
+    simulator.buildings = BuildingRegistry([Building("bench", ifc_path)])
+    # entering the client runs the app's lifespan, which warms up in the background
+    client = stack.enter_context(TestClient(main.app))
+    while client.get("/readyz").json()["warming_up"]:
+        time.sleep(0.05)
+
+    def get_room():
+        response = client.get(f"/api/simulate/{target_room}")
+        response.raise_for_status()
+
+    return [
+        Case("compute_bounding_box", lambda: compute_bounding_box(shape)),
+        Case("extract_site_details[model]", lambda: extract_site_details(model)),
+        Case("extract_site_details[path]", lambda: extract_site_details(ifc_path), max_repeat=20),
+        Case("parse_room", lambda: parse_room(ifc_path, target_room), max_repeat=10),
+        Case("parse_building", lambda: parse_building(ifc_path), max_repeat=5),
+        Case("window_solar_inflow", lambda: window_solar_inflow(window, site, noon)),
+        Case("predict_internal_temp", lambda: simulator.predict_internal_temp(target_room)),
+        Case("endpoint[GET /api/simulate/{room}, cached]", get_room),
+        Case("endpoint[GET /api/simulate/{room}, uncached]", get_room, setup=main.pipeline.response_cache.clear),
+    ]
+
+
+def compare(results: dict, baseline: dict, max_regression: Optional[float]) -> bool:
+    """Print median ratios against a baseline run; False if any case regressed past the limit."""
+    ok = True
+    base = baseline.get("results", {})
+    print(f"\nvs {baseline.get('git', {}).get('commit') or 'baseline'}:")
+    for name, result in results.items():
+        if name not in base:
+            print(f"  {name:50s} (new)")
+            continue
+        ratio = result["median"] / base[name]["median"]
+        flag = ""
+        if max_regression is not None and ratio > max_regression:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"  {name:50s} {base[name]['median'] * 1e3:10.3f} ms -> {result['median'] * 1e3:10.3f} ms"
+              f"   x{ratio:5.2f}{flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--floors", type=int, default=4)
+    parser.add_argument("--rooms-per-floor", type=int, default=40)
+    parser.add_argument("--windows-per-room", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=30, help="samples per case")
+    parser.add_argument("--min-time", type=float, default=0.01, help="minimum seconds per sample")
+    parser.add_argument("--filter", default=None, help="only run cases whose name contains this")
+    parser.add_argument("--output", type=Path, default=None, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="baseline JSON from an earlier run")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="with --compare: fail if a median is more than this factor slower")
+    args = parser.parse_args()
+
+    fixture = {"floors": args.floors, "rooms_per_floor": args.rooms_per_floor,
+               "windows_per_room": args.windows_per_room, "seed": 0}
+    workdir = Path(tempfile.mkdtemp(prefix="bkviewer-bench-"))
+    # building snapshots go to the temp dir too, not the checkout's snapshots/
+    os.environ[SNAPSHOT_DIR_ENV] = str(workdir / "snapshots")
+    ifc_path = generate_building(workdir / "bench_building.ifc", args.floors, args.rooms_per_floor,
+                                 args.windows_per_room, seed=0)
+    configure_weather(StubWeatherProvider(), ":memory:")
+    # a south-façade room halfway up the building
+    target_room = room_name(args.floors // 2, 0)
+
+    results = {}
+    print(f"synthetic building: {fixture}, room {target_room}")
+    with contextlib.ExitStack() as stack:
+        cases = build_cases(ifc_path, target_room, stack)
+        if args.filter:
+            cases = [case for case in cases if args.filter in case.name]
+        for case in cases:
+            case.fn()  # warm up caches and lazy imports
+            results[case.name] = result = measure(case, args.repeat, args.min_time)
+            print(f"  {case.name:50s} median {result['median'] * 1e3:10.3f} ms   p95 {result['p95'] * 1e3:10.3f} ms"
+                  f"   ({result['repeat']}x{result['number']})")
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created": pd.Timestamp.now(tz="UTC").isoformat(),
+        "git": git_info(),
+        "environment": environment(),
+        "fixture": fixture,
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+    if args.compare:
+        if not compare(results, json.loads(args.compare.read_text()), args.max_regression):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
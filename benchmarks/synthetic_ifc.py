@@ -0,0 +1,126 @@
+"""
+Synthetic IFC buildings for benchmarks, so nothing depends on the (unpublished) BK model.
+
+    python -m benchmarks.synthetic_ifc /tmp/bench.ifc --floors 4 --rooms-per-floor 40 --windows-per-room 3
+
+Each floor is two rows of box-shaped IfcSpaces; the south row gets external IfcWindows on its
+façade. Spaces carry BaseQuantities.GrossVolume and windows carry Pset_WindowCommon.IsExternal,
+BaseQuantities.Area and "Analytical Properties(Type)" SHGC, i.e. everything ifc_parsers reads.
+Long names follow the BK pattern "<floor>.West.<number>", e.g. 00.West.000.
+"""
+import math
+import argparse
+from pathlib import Path
+from typing import Union
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api.root
+import ifcopenshell.api.unit
+import ifcopenshell.api.context
+import ifcopenshell.api.project
+import ifcopenshell.api.spatial
+import ifcopenshell.api.geometry
+import ifcopenshell.api.pset
+import ifcopenshell.api.aggregate
+
+# room footprint and spacing (m)
+ROOM_LENGTH = 6.0
+ROOM_DEPTH = 5.0
+ROOM_HEIGHT = 3.0
+GRID_X = 7.0
+GRID_Y = 6.0
+STOREY_HEIGHT = 3.5
+
+
+def room_name(floor: int, number: int) -> str:
+    return f"{floor:02d}.West.{number:03d}"
+
+
+def _place(model: ifcopenshell.file, product, x: float, y: float, z: float) -> None:
+    matrix = np.eye(4)
+    matrix[:3, 3] = [x, y, z]
+    ifcopenshell.api.geometry.edit_object_placement(model, product=product, matrix=matrix)
+
+
+def generate_building(path: Union[str, Path], floors: int = 2, rooms_per_floor: int = 12,
+                      windows_per_room: int = 2, shgc: float = 0.6, seed: int = 0) -> Path:
+    """Write a synthetic building to path and return it. Same arguments give the same geometry."""
+    rng = np.random.default_rng(seed)
+    model = ifcopenshell.api.project.create_file(version="IFC4")
+    project = ifcopenshell.api.root.create_entity(model, ifc_class="IfcProject", name="Benchmark")
+    ifcopenshell.api.unit.assign_unit(model)
+    context = ifcopenshell.api.context.add_context(model, context_type="Model")
+    body = ifcopenshell.api.context.add_context(model, context_type="Model", context_identifier="Body",
+                                                target_view="MODEL_VIEW", parent=context)
+
+    # Delft, like the BK building
+    site = ifcopenshell.api.root.create_entity(model, ifc_class="IfcSite", name="Site")
+    site.RefLatitude = (52, 0, 20, 0)
+    site.RefLongitude = (4, 22, 14, 0)
+    site.RefElevation = 0.0
+    ifcopenshell.api.aggregate.assign_object(model, products=[site], relating_object=project)
+    building = ifcopenshell.api.root.create_entity(model, ifc_class="IfcBuilding", name="Building")
+    ifcopenshell.api.aggregate.assign_object(model, products=[building], relating_object=site)
+
+    columns = math.ceil(rooms_per_floor / 2)
+    window_span = (ROOM_LENGTH - 1.0) / max(windows_per_room, 1)
+    space_count = 0
+    for floor in range(floors):
+        storey = ifcopenshell.api.root.create_entity(model, ifc_class="IfcBuildingStorey", name=f"{floor:02d}")
+        ifcopenshell.api.aggregate.assign_object(model, products=[storey], relating_object=building)
+        spaces = []
+        for number in range(rooms_per_floor):
+            i, j = number % columns, number // columns
+            space_count += 1
+            space = ifcopenshell.api.root.create_entity(model, ifc_class="IfcSpace", name=str(space_count))
+            space.LongName = room_name(floor, number)
+            spaces.append(space)
+            representation = ifcopenshell.api.geometry.add_wall_representation(
+                model, context=body, length=ROOM_LENGTH, height=ROOM_HEIGHT, thickness=ROOM_DEPTH)
+            ifcopenshell.api.geometry.assign_representation(model, product=space, representation=representation)
+            _place(model, space, i * GRID_X, j * GRID_Y, floor * STOREY_HEIGHT)
+            qto = ifcopenshell.api.pset.add_qto(model, product=space, name="BaseQuantities")
+            volume = ROOM_LENGTH * ROOM_DEPTH * ROOM_HEIGHT * rng.uniform(0.8, 1.2)
+            ifcopenshell.api.pset.edit_qto(model, qto=qto, properties={"GrossVolume": round(volume, 3)})
+
+            if j != 0:
+                continue
+            # south façade windows, flush with the room's outer face
+            for k in range(windows_per_room):
+                window = ifcopenshell.api.root.create_entity(model, ifc_class="IfcWindow",
+                                                             name=f"W{space_count}.{k}")
+                ifcopenshell.api.spatial.assign_container(model, products=[window], relating_structure=storey)
+                width = window_span - 0.3
+                representation = ifcopenshell.api.geometry.add_wall_representation(
+                    model, context=body, length=width, height=1.5, thickness=0.1)
+                ifcopenshell.api.geometry.assign_representation(model, product=window, representation=representation)
+                _place(model, window, i * GRID_X + 0.5 + k * window_span, -0.05, floor * STOREY_HEIGHT + 1.0)
+                pset = ifcopenshell.api.pset.add_pset(model, product=window, name="Pset_WindowCommon")
+                ifcopenshell.api.pset.edit_pset(model, pset=pset, properties={"IsExternal": True})
+                qto = ifcopenshell.api.pset.add_qto(model, product=window, name="BaseQuantities")
+                ifcopenshell.api.pset.edit_qto(model, qto=qto, properties={"Area": round(width * 1.5, 3)})
+                pset = ifcopenshell.api.pset.add_pset(model, product=window, name="Analytical Properties(Type)")
+                ifcopenshell.api.pset.edit_pset(model, pset=pset, properties={"Solar Heat Gain Coefficient": shgc})
+        ifcopenshell.api.aggregate.assign_object(model, products=spaces, relating_object=storey)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    model.write(str(path))
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--floors", type=int, default=2)
+    parser.add_argument("--rooms-per-floor", type=int, default=12)
+    parser.add_argument("--windows-per-room", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    path = generate_building(args.path, args.floors, args.rooms_per_floor, args.windows_per_room, seed=args.seed)
+    print(f"Wrote {path}: {args.floors * args.rooms_per_floor} spaces, "
+          f"{args.floors * math.ceil(args.rooms_per_floor / 2) * args.windows_per_room} external windows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Union
+
+from ifc_parsers import Site, parse_building
+from building_tables import BuildingTables
+from instrumentation import stage
+
+# A parsed building is saved to disk keyed by the IFC file's content hash,
+# so the (slow) IFC parse only happens again when the IFC itself changes.
+# Snapshots are columnar building tables that are memory-mapped on load, so every
+# worker process serving the same IFC shares one physical copy of the building.
+
+SNAPSHOT_DIR = Path("snapshots")
+# overrides SNAPSHOT_DIR, e.g. so benchmarks keep their snapshots out of the checkout
+SNAPSHOT_DIR_ENV = "BUILDING_SNAPSHOT_DIR"
+# bump whenever Site/Room/Window change shape, so stale snapshots are not loaded
+SNAPSHOT_VERSION = 4
+
+
+def file_digest(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of the file contents, read in chunks so large IFCs don't need to fit in memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def snapshot_path(ifc_path: Union[str, Path], digest: str, snapshot_dir: Union[str, Path] = SNAPSHOT_DIR) -> Path:
+    return Path(snapshot_dir) / f"{Path(ifc_path).stem}_v{SNAPSHOT_VERSION}_{digest[:16]}.bkt"
+
+
+def load_building(ifc_path: Union[str, Path], snapshot_dir: Optional[Union[str, Path]] = None,
+                  rebuild: bool = False) -> Site:
+    """
+    Return the Site for the given IFC, memory-mapping its snapshot when one exists for the
+    current file contents. Otherwise the IFC is parsed and a new snapshot is written.
+    Either way the rooms are views into the snapshot's tables (see building_tables).
+    Snapshots live in snapshot_dir, else $BUILDING_SNAPSHOT_DIR, else snapshots/.
+    """
+    ifc_path = Path(ifc_path)
+    if not ifc_path.exists():
+        raise FileNotFoundError(f"IFC file not found: {ifc_path}")
+    snapshot_dir = Path(snapshot_dir or os.environ.get(SNAPSHOT_DIR_ENV, SNAPSHOT_DIR))
+    path = snapshot_path(ifc_path, file_digest(ifc_path), snapshot_dir)
+
+    if path.exists() and not rebuild:
+        try:
+            with stage("snapshot_load"):
+                return BuildingTables.load(path).site()
+        except Exception as e:
+            print(f"[WARNING] Could not read snapshot {path} ({e!r}), rebuilding")
+
+    with stage("ifc_parse"):
+        site = parse_building(ifc_path)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    # write to a temp file first so a crash never leaves a half-written snapshot behind
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    BuildingTables.from_site(site).save(tmp)
+    os.replace(tmp, path)
+    # drop snapshots of older versions of the same IFC (v1 snapshots were pickles)
+    for old in [*snapshot_dir.glob(f"{ifc_path.stem}_v*.bkt"), *snapshot_dir.glob(f"{ifc_path.stem}_v*.pkl")]:
+        if old != path:
+            old.unlink(missing_ok=True)
+    print(f"[INFO] Building snapshot written to {path} ({len(site.rooms)} rooms)")
+    # serve the mapped copy, not the parsed objects, so this process shares pages with the others
+    return BuildingTables.load(path).site()
+
+
+# In-process cache of loaded buildings, bounded so memory stays flat however many buildings are
+# configured: at most MAX_LOADED_BUILDINGS Sites, the least recently used one dropped first (its
+# tables are unmapped once no request holds it any more). An entry is reloaded when the IFC's
+# mtime/size change.
+MAX_LOADED_BUILDINGS = int(os.environ.get("MAX_LOADED_BUILDINGS", 4))
+
+
+class BuildingCache:
+    """
+    LRU of loaded Sites keyed by IFC path (and timezone). Loads run outside the cache lock, one
+    per building: concurrent first requests for a cold building wait for the same load, while
+    requests for other buildings carry on.
+    """
+    def __init__(self, maxsize: int = MAX_LOADED_BUILDINGS):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._sites: OrderedDict[tuple, tuple[tuple[int, int], Site]] = OrderedDict()
+        self._lock = threading.Lock()
+        # one lock per building key, held while it loads; kept, there is one per configured building
+        self._loading: dict[tuple, threading.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sites)
+
+    def _cached(self, key: tuple, stamp: tuple[int, int]) -> Optional[Site]:
+        """The cached Site if it is still current, marked most recently used; caller holds _lock."""
+        cached = self._sites.get(key)
+        if cached is None or cached[0] != stamp:
+            return None
+        self._sites.move_to_end(key)
+        return cached[1]
+
+    def get(self, ifc_path: Union[str, Path], timezone: Optional[str] = None) -> Site:
+        ifc_path = Path(ifc_path)
+        stat = os.stat(ifc_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = (ifc_path, timezone)
+        with self._lock:
+            site = self._cached(key, stamp)
+            if site is not None:
+                self.hits += 1
+                return site
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        if not load_lock.acquire(blocking=False):
+            # another request is loading this building; wait for it and share the result
+            with self._lock:
+                self.coalesced += 1
+            load_lock.acquire()
+        try:
+            with self._lock:
+                site = self._cached(key, stamp)
+            if site is not None:
+                return site
+            site = load_building(ifc_path)
+            if timezone is not None:
+                site.timezone = timezone
+            with self._lock:
+                self._sites[key] = (stamp, site)
+                self._sites.move_to_end(key)
+                self.loads += 1
+                while len(self._sites) > self.maxsize:
+                    (evicted, _), _ = self._sites.popitem(last=False)
+                    self.evictions += 1
+                    print(f"[INFO] Building {evicted} dropped from memory (more than {self.maxsize} loaded)")
+            return site
+        finally:
+            load_lock.release()
+
+    def loaded(self, ifc_path: Union[str, Path]) -> bool:
+        with self._lock:
+            return any(path == Path(ifc_path) for path, _ in self._sites)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sites.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._sites),
+                "maxsize": self.maxsize,
+                "loaded": [str(path) for path, _ in self._sites],
+                "hits": self.hits,
+                "loads": self.loads,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+
+building_cache = BuildingCache()
+
+
+def get_building(ifc_path: Union[str, Path], timezone: Optional[str] = None) -> Site:
+    """Cached accessor used on the request path: O(1) once the building is loaded."""
+    return building_cache.get(ifc_path, timezone)
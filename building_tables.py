@@ -0,0 +1,300 @@
+import os
+import json
+from pathlib import Path
+from collections.abc import Mapping
+from typing import Iterator, Optional, Union
+import numpy as np
+
+from ifc_parsers import BoundingBox, Site
+
+# Columnar building storage. A parsed building is kept as two struct-of-arrays tables, one NumPy
+# column per field: rooms (ids, names, volume, bbox, window range) and windows (owning room,
+# area, SHGC, bbox), sorted by room so a room's windows are one contiguous slice. The columns
+# live in a single file that every process memory-maps read-only, so uvicorn workers share one
+# physical copy through the page cache instead of each holding its own Python objects.
+# RoomView/WindowView expose a row with the attributes of Room/Window, so Site.rooms keeps working.
+
+MAGIC = b"BKTABLE1"
+# written into the header; bump when columns change meaning, load() refuses other versions
+FORMAT_VERSION = 1
+# column offsets are aligned so every column view is aligned for its dtype
+ALIGN = 64
+BBOX_FIELDS = ("x_min", "x_max", "y_min", "y_max", "z_min", "z_max")
+
+
+def _strings(values: list[str]) -> np.ndarray:
+    """UTF-8 fixed-width bytes column; decoded again on access."""
+    encoded = [v.encode("utf-8") for v in values]
+    return np.array(encoded, dtype=f"S{max([len(v) for v in encoded] + [1])}")
+
+
+def _bbox_row(bbox: Optional[BoundingBox]) -> list[float]:
+    return [getattr(bbox, f) for f in BBOX_FIELDS] if bbox is not None else [np.nan] * len(BBOX_FIELDS)
+
+
+def _bbox(row: np.ndarray) -> Optional[BoundingBox]:
+    if np.isnan(row[0]):
+        return None
+    return BoundingBox(*(float(v) for v in row))
+
+
+def _optional(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _lookup(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted copy of keys and the row each sorted key came from; equal keys keep row order."""
+    order = np.argsort(keys, kind="stable")
+    return keys[order], order.astype(np.int64)
+
+
+class WindowView:
+    """One row of the windows table, read like a Window."""
+    __slots__ = ("_tables", "_row")
+
+    def __init__(self, tables: "BuildingTables", row: int):
+        self._tables = tables
+        self._row = row
+
+    @property
+    def global_id(self) -> str:
+        return self._tables.windows["global_id"][self._row].decode("utf-8")
+
+    @property
+    def room_name(self) -> str:
+        return self._tables.rooms["short_name"][self._tables.windows["room"][self._row]].decode("utf-8")
+
+    @property
+    def bounding_box(self) -> Optional[BoundingBox]:
+        return _bbox(self._tables.windows["bbox"][self._row])
+
+    @property
+    def SHGC(self) -> Optional[float]:
+        return _optional(self._tables.windows["shgc"][self._row])
+
+    @property
+    def area(self) -> Optional[float]:
+        return _optional(self._tables.windows["area"][self._row])
+
+    @property
+    def solar_inflow(self) -> Optional[float]:
+        return None
+
+    @property
+    def is_external(self) -> bool:
+        return bool(self._tables.windows["is_external"][self._row])
+
+    def __repr__(self) -> str:
+        return f"WindowView({self.global_id!r}, room_name={self.room_name!r}, area={self.area}, SHGC={self.SHGC})"
+
+
+class RoomView:
+    """One row of the rooms table, read like a Room."""
+    __slots__ = ("_tables", "index")
+
+    def __init__(self, tables: "BuildingTables", index: int):
+        self._tables = tables
+        self.index = index
+
+    @property
+    def global_id(self) -> str:
+        return self._tables.rooms["global_id"][self.index].decode("utf-8")
+
+    @property
+    def short_name(self) -> str:
+        return self._tables.rooms["short_name"][self.index].decode("utf-8")
+
+    @property
+    def long_name(self) -> str:
+        return self._tables.rooms["long_name"][self.index].decode("utf-8")
+
+    @property
+    def volume(self) -> float:
+        return float(self._tables.rooms["volume"][self.index])
+
+    @property
+    def bounding_box(self) -> Optional[BoundingBox]:
+        return _bbox(self._tables.rooms["bbox"][self.index])
+
+    @property
+    def windows(self) -> Optional[list[WindowView]]:
+        rows = self._tables.window_rows(self.index)
+        return [WindowView(self._tables, int(row)) for row in rows] or None
+
+    def __repr__(self) -> str:
+        return f"RoomView({self.long_name!r}, short_name={self.short_name!r}, volume={self.volume})"
+
+
+class RoomMapping(Mapping):
+    """Read-only stand-in for Site.rooms: Global ID -> RoomView."""
+    def __init__(self, tables: "BuildingTables"):
+        self._tables = tables
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def __iter__(self) -> Iterator[str]:
+        return (gid.decode("utf-8") for gid in self._tables.rooms["global_id"])
+
+    def __getitem__(self, key: str) -> RoomView:
+        index = self._tables.find("gid", key)
+        if index is None:
+            raise KeyError(key)
+        return RoomView(self._tables, index)
+
+    def values(self) -> list[RoomView]:
+        return [RoomView(self._tables, i) for i in range(len(self._tables))]
+
+
+class BuildingTables:
+    """
+    The room and window tables of one building plus its site metadata. Columns are plain NumPy
+    arrays: in memory after from_site, memory-mapped after load.
+    """
+    def __init__(self, meta: dict, rooms: dict[str, np.ndarray], windows: dict[str, np.ndarray]):
+        self.meta = meta
+        self.rooms = rooms
+        self.windows = windows
+
+    def __len__(self) -> int:
+        return len(self.rooms["volume"])
+
+    @classmethod
+    def from_site(cls, site: Site) -> "BuildingTables":
+        """Columnar copy of a parsed Site (Room/Window dataclasses)."""
+        rooms = list(site.rooms.values())
+        windows = [(i, w) for i, room in enumerate(rooms) for w in (room.windows or [])]
+        counts = np.array([len(room.windows or []) for room in rooms], dtype=np.int64)
+
+        room_columns = {
+            "global_id": _strings([r.global_id for r in rooms]),
+            "short_name": _strings([r.short_name for r in rooms]),
+            "long_name": _strings([r.long_name for r in rooms]),
+            "volume": np.array([r.volume or 0 for r in rooms], dtype=np.float64),
+            "bbox": np.array([_bbox_row(r.bounding_box) for r in rooms], dtype=np.float64).reshape(-1, 6),
+            "window_start": np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)[:len(rooms)],
+            "window_count": counts,
+        }
+        # Global ID and case-insensitive name lookups (names repeat; equal keys stay in building order)
+        for name, values in (("gid", [r.global_id for r in rooms]), ("long", [r.long_name for r in rooms]),
+                             ("short", [r.short_name for r in rooms])):
+            if name != "gid":
+                values = [v.strip().lower() for v in values]
+            room_columns[f"lookup_{name}"], room_columns[f"lookup_{name}_rows"] = _lookup(_strings(values))
+
+        window_columns = {
+            "global_id": _strings([w.global_id for _, w in windows]),
+            "room": np.array([i for i, _ in windows], dtype=np.int64),
+            "area": np.array([np.nan if w.area is None else w.area for _, w in windows], dtype=np.float64),
+            "shgc": np.array([np.nan if w.SHGC is None else w.SHGC for _, w in windows], dtype=np.float64),
+            "bbox": np.array([_bbox_row(w.bounding_box) for _, w in windows], dtype=np.float64).reshape(-1, 6),
+            "is_external": np.array([w.is_external for _, w in windows], dtype=bool),
+        }
+        meta = {"latitude": site.latitude, "longitude": site.longitude,
+                "elevation": site.elevation, "timezone": site.timezone}
+        return cls(meta, room_columns, window_columns)
+
+    # STORAGE
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Layout: MAGIC, 8-byte little-endian header length, JSON header (FORMAT_VERSION, site metadata
+        and each column's dtype, shape and offset), then the raw columns at ALIGN-byte offsets.
+        """
+        columns = {f"rooms.{k}": v for k, v in self.rooms.items()}
+        columns.update({f"windows.{k}": v for k, v in self.windows.items()})
+        specs, offset = {}, 0
+        for name, column in columns.items():
+            specs[name] = {"dtype": column.dtype.str, "shape": list(column.shape), "offset": offset}
+            offset += -(-column.nbytes // ALIGN) * ALIGN
+        header = json.dumps({"version": FORMAT_VERSION, "meta": self.meta, "columns": specs}).encode("utf-8")
+        start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+        with open(path, "wb") as f:
+            f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for name, column in columns.items():
+                f.seek(start + specs[name]["offset"])
+                f.write(np.ascontiguousarray(column).tobytes())
+            f.truncate(start + offset)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "BuildingTables":
+        """Memory-map a file written by save(); columns are read-only views into the mapping."""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a building table file")
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} has building table format {header.get('version')}, expected {FORMAT_VERSION}")
+        start = -(-(len(MAGIC) + 8 + header_length) // ALIGN) * ALIGN
+        raw = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) > start else np.empty(0, np.uint8)
+        tables: dict[str, dict[str, np.ndarray]] = {"rooms": {}, "windows": {}}
+        for name, spec in header["columns"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            offset = start + spec["offset"]
+            column = raw[offset:offset + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+            table, field = name.split(".", 1)
+            tables[table][field] = column
+        return cls(header["meta"], tables["rooms"], tables["windows"])
+
+    def site(self) -> Site:
+        """A Site whose rooms are views into these tables."""
+        site = Site(self.meta["latitude"], self.meta["longitude"], self.meta["elevation"], self.meta["timezone"])
+        site.tables = self
+        site.rooms = RoomMapping(self)
+        return site
+
+    # QUERIES
+    def find_all(self, lookup: str, name: str) -> np.ndarray:
+        """Rows of every room whose `lookup` column ("gid", "long" or "short") equals name, in building order."""
+        keys = self.rooms[f"lookup_{lookup}"]
+        target = name.encode("utf-8")
+        lo, hi = np.searchsorted(keys, target, side="left"), np.searchsorted(keys, target, side="right")
+        return self.rooms[f"lookup_{lookup}_rows"][lo:hi]
+
+    def find(self, lookup: str, name: str) -> Optional[int]:
+        """Row of the first room whose `lookup` column equals name."""
+        rows = self.find_all(lookup, name)
+        return int(rows[0]) if len(rows) else None
+
+    def find_rooms(self, name: str) -> list[RoomView]:
+        """Case-insensitive lookup by long name, then short name, like Site.find_rooms."""
+        target = name.strip().lower()
+        rows = self.find_all("long", target)
+        if not len(rows):
+            rows = self.find_all("short", target)
+        return [RoomView(self, int(row)) for row in rows]
+
+    def get_room(self, name: str) -> Optional[RoomView]:
+        rooms = self.find_rooms(name)
+        return rooms[0] if rooms else None
+
+    def room(self, index: int) -> RoomView:
+        return RoomView(self, index)
+
+    def window_rows(self, room_index: int) -> np.ndarray:
+        """Rows of the windows table belonging to one room (a contiguous range)."""
+        start = int(self.rooms["window_start"][room_index])
+        return np.arange(start, start + int(self.rooms["window_count"][room_index]))
+
+    def windows_of(self, room_indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Window rows of several rooms at once, with the position in room_indices each row
+        belongs to (for np.bincount-style per-room totals).
+        """
+        room_indices = np.asarray(room_indices, dtype=np.int64)
+        counts = self.rooms["window_count"][room_indices]
+        owner = np.repeat(np.arange(len(room_indices)), counts)
+        # offset of every row inside its room's range, added to that room's start
+        within = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.rooms["window_start"][room_indices][owner] + within, owner
+
+    def window_gain(self, rows: np.ndarray) -> np.ndarray:
+        """area × SHGC per window row, missing values counted as 0 (as solar_inflow_matrix does)."""
+        return np.nan_to_num(self.windows["area"][rows]) * np.nan_to_num(self.windows["shgc"][rows])
+
+    def rooms_by_volume(self, low: float = -np.inf, high: float = np.inf) -> np.ndarray:
+        """Indices of the rooms with low <= volume <= high."""
+        volume = self.rooms["volume"]
+        return np.flatnonzero((volume >= low) & (volume <= high))
@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from ifc_parsers import Site
+from building_snapshot import building_cache, get_building
+from model_registry import MODEL_DIR, ModelRegistry
+
+# Campus buildings served by one deployment. Every building id maps to its IFC file, the
+# directory its models are trained into and, optionally, its timezone. The list comes from a
+# JSON file (BUILDINGS_CONFIG, default buildings.json):
+#
+#   {"default": "bk",
+#    "buildings": [{"id": "bk", "name": "Faculty of Architecture", "ifc": "static/IFC/BK_v2_vb_updated.ifc",
+#                   "models": "xgboost_models", "timezone": "Europe/Amsterdam"}, ...]}
+#
+# Without that file the BK building is the only one. Parsed buildings live in building_snapshot's
+# bounded LRU and are loaded on first use, so configuring more buildings costs no memory up front.
+
+BUILDINGS_CONFIG_ENV = "BUILDINGS_CONFIG"
+DEFAULT_CONFIG = Path("buildings.json")
+DEFAULT_BUILDING = "bk"
+DEFAULT_IFC = Path("static") / "IFC" / "BK_v2_vb_updated.ifc"
+# building ids appear in URLs
+_ID_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+@dataclass(frozen=True)
+class Building:
+    id: str
+    ifc_path: Path
+    model_dir: Path = MODEL_DIR
+    name: str = ""
+    # IFC files carry no timezone; None keeps the Site default (Europe/Amsterdam)
+    timezone: Optional[str] = None
+
+
+class UnknownBuildingError(ValueError):
+    """Raised for a building id that isn't configured."""
+
+
+class BuildingRegistry:
+    """
+    Configured buildings, and one ModelRegistry per model directory (buildings that share a
+    directory share the resident model and its watcher).
+    """
+    def __init__(self, buildings: list[Building], default: Optional[str] = None):
+        if not buildings:
+            raise ValueError("At least one building must be configured")
+        self.buildings: dict[str, Building] = {}
+        for building in buildings:
+            if not _ID_RE.match(building.id):
+                raise ValueError(f"Invalid building id '{building.id}' (letters, digits, '.', '_' and '-' only)")
+            if building.id in self.buildings:
+                raise ValueError(f"Building '{building.id}' is configured twice")
+            self.buildings[building.id] = building
+        self.default = default or buildings[0].id
+        if self.default not in self.buildings:
+            raise ValueError(f"Default building '{self.default}' is not configured")
+        self._models: dict[Path, ModelRegistry] = {}
+        self._lock = threading.Lock()
+        self._watching = False
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "BuildingRegistry":
+        config = json.loads(Path(path).read_text())
+        buildings = [
+            Building(
+                id=entry["id"],
+                ifc_path=Path(entry["ifc"]),
+                model_dir=Path(entry.get("models", MODEL_DIR)),
+                name=entry.get("name", ""),
+                timezone=entry.get("timezone"),
+            )
+            for entry in config["buildings"]
+        ]
+        return cls(buildings, config.get("default"))
+
+    @classmethod
+    def from_env(cls) -> "BuildingRegistry":
+        """Buildings from BUILDINGS_CONFIG (or buildings.json if present), else just the BK building."""
+        path = Path(os.environ.get(BUILDINGS_CONFIG_ENV, DEFAULT_CONFIG))
+        if path.exists():
+            return cls.from_file(path)
+        if BUILDINGS_CONFIG_ENV in os.environ:
+            raise FileNotFoundError(f"Buildings config not found: {path}")
+        return cls([Building(DEFAULT_BUILDING, DEFAULT_IFC, MODEL_DIR, "BK")])
+
+    def get(self, building_id: Optional[str] = None) -> Building:
+        """The building with this id; the default building for None."""
+        building = self.buildings.get(building_id or self.default)
+        if building is None:
+            raise UnknownBuildingError(f"No building '{building_id}'; known buildings: {', '.join(self.buildings)}")
+        return building
+
+    def site(self, building_id: Optional[str] = None) -> Site:
+        """The building's parsed Site, loaded (or memory-mapped from its snapshot) on first use."""
+        building = self.get(building_id)
+        return get_building(building.ifc_path, building.timezone)
+
+    def models(self, building_id: Optional[str] = None) -> ModelRegistry:
+        """The model registry serving this building."""
+        model_dir = self.get(building_id).model_dir
+        registry = self._models.get(model_dir)
+        if registry is None:
+            with self._lock:
+                registry = self._models.get(model_dir)
+                if registry is None:
+                    registry = self._models[model_dir] = ModelRegistry(model_dir)
+                    if self._watching:
+                        registry.start_watching()
+        return registry
+
+    def start_watching(self) -> None:
+        """Watch every model directory in use now, and each one used later, for new versions."""
+        with self._lock:
+            self._watching = True
+            registries = list(self._models.values())
+        for registry in registries:
+            registry.start_watching()
+
+    def stop_watching(self) -> None:
+        with self._lock:
+            self._watching = False
+            registries = list(self._models.values())
+        for registry in registries:
+            registry.stop_watching()
+
+    def describe(self) -> list[dict]:
+        """Every building with whether it is in memory and the model version it is served by."""
+        result = []
+        for building in self.buildings.values():
+            registry = self._models.get(building.model_dir)
+            result.append({
+                "id": building.id,
+                "name": building.name,
+                "default": building.id == self.default,
+                "loaded": building_cache.loaded(building.ifc_path),
+                "model_version": registry.active_version if registry is not None else None,
+            })
+        return result
@@ -0,0 +1,183 @@
+import json
+import time
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, Iterable, Iterator, Optional
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Client for the FROST Server OData Observations API used by the training pipeline.
+# One pooled session is shared by all requests; datastreams and their pages are fetched
+# concurrently from bounded thread pools, failed requests are retried with exponential
+# backoff, and page bodies are decoded incrementally while they stream in.
+
+OBSERVATION_COLUMNS = ["timestamp", "internal_temp"]
+
+
+class IncompletePageError(ValueError):
+    """Raised when a page body ends before its "value" array is closed, or isn't valid JSON."""
+
+
+def iter_observations(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """
+    Yield the objects of the top-level "value" array of an OData response while the body is
+    still arriving, without holding the whole page (or its parsed form) in memory. Raises
+    IncompletePageError if the body ends before the array is closed or doesn't decode.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    in_array = False
+    try:
+        for chunk in chunks:
+            buf = buf[pos:] + text.decode(chunk)
+            pos = 0
+            if not in_array:
+                key = buf.find('"value"')
+                if key < 0:
+                    # keep a tail in case the key is split across chunks
+                    pos = max(0, len(buf) - 8)
+                    continue
+                bracket = buf.find("[", key)
+                if bracket < 0:
+                    pos = key
+                    continue
+                pos = bracket + 1
+                in_array = True
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos >= len(buf):
+                    break
+                if buf[pos] == "]":
+                    return
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # object continues in the next chunk
+                    break
+                yield obj
+                pos = end
+        text.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise IncompletePageError(f"Page body isn't valid UTF-8: {e}") from e
+    if not in_array:
+        raise IncompletePageError('Page body ended without a "value" array')
+    if buf[pos:].strip(" \t\r\n,"):
+        try:
+            # everything complete was decoded above; what is left is cut off or malformed
+            decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            raise IncompletePageError(f"Page body ended inside the \"value\" array: {e}") from e
+    raise IncompletePageError('Page body ended before the "value" array was closed')
+
+
+def observations_frame(observations: Iterable[dict], limit: Optional[int] = None) -> pd.DataFrame:
+    """DataFrame of (timestamp, internal_temp) from FROST observation objects."""
+    rows = []
+    for obs in observations:
+        if limit is not None and len(rows) >= limit:
+            break
+        rows.append((obs.get("phenomenonTime"), obs.get("result")))
+    if not rows:
+        return pd.DataFrame(columns=OBSERVATION_COLUMNS)
+    df = pd.DataFrame(rows, columns=OBSERVATION_COLUMNS)
+    df = df.drop_duplicates(subset="timestamp")
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+class FrostClient:
+    """
+    Pooled, retrying FROST client. Up to max_streams datastreams and max_workers page requests
+    are in flight at once; all of them reuse the connections of one requests.Session.
+    """
+    def __init__(self, max_workers: int = 8, max_streams: int = 4, retries: int = 5,
+                 backoff_factor: float = 0.5, timeout: float = 30.0, chunk_size: int = 64 * 1024):
+        self.max_workers = max_workers
+        self.max_streams = max_streams
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+        )
+        # count requests come from the datastream threads, page requests from the page pool
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers + max_streams, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # one page pool shared by all datastreams, so max_workers bounds the requests in flight
+        self._pages = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="frost-page")
+
+    def close(self) -> None:
+        self._pages.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self) -> "FrostClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def fetch_page(self, url: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        One page of observations, decoded while streaming. The session retries failed responses;
+        a body that breaks off or doesn't decode is requested again here, with the same backoff.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    return observations_frame(iter_observations(response.iter_content(self.chunk_size)), limit)
+            except (IncompletePageError, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff_factor * 2 ** attempt
+                print(f"[WARNING] Incomplete FROST page ({e}); retrying in {delay:.1f}s: {url}")
+                time.sleep(delay)
+
+    def count(self, base_url: str) -> Optional[int]:
+        """Total number of observations behind base_url, if the server reports @iot.count."""
+        response = self.session.get(f"{base_url}&$top=0&$count=true", timeout=self.timeout)
+        response.raise_for_status()
+        count = response.json().get("@iot.count")
+        return int(count) if count is not None else None
+
+    def fetch_all(self, base_url: str, page_size: int = 500) -> pd.DataFrame:
+        """
+        Every observation behind base_url. When the server reports a count, all pages are
+        requested concurrently; otherwise pages are read one after another until an empty one.
+        """
+        total = self.count(base_url)
+        if total is None:
+            pages = []
+            skip = 0
+            while True:
+                page = self.fetch_page(f"{base_url}&$top={page_size}&$skip={skip}", limit=page_size)
+                if page.empty:
+                    break
+                pages.append(page)
+                skip += page_size
+        else:
+            urls = [f"{base_url}&$top={page_size}&$skip={skip}" for skip in range(0, total, page_size)]
+            pages = list(self._pages.map(lambda url: self.fetch_page(url, limit=page_size), urls))
+        pages = [page for page in pages if not page.empty]
+        if not pages:
+            return pd.DataFrame(columns=OBSERVATION_COLUMNS)
+        # pages can overlap if observations arrive while paging
+        return pd.concat(pages, ignore_index=True).drop_duplicates(subset="timestamp", ignore_index=True)
+
+    def fetch_many(self, urls: dict[Hashable, str], page_size: int = 500) -> dict[Hashable, pd.DataFrame]:
+        """fetch_all for several datastreams at once, keyed like urls."""
+        with ThreadPoolExecutor(max_workers=self.max_streams, thread_name_prefix="frost-stream") as pool:
+            futures = {key: pool.submit(self.fetch_all, url, page_size) for key, url in urls.items()}
+            return {key: future.result() for key, future in futures.items()}
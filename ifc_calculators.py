@@ -1,55 +1,36 @@
 # ifc_calculators.py
 
 import pvlib
+import numpy as np
 import pandas as pd
-from typing import Any
+from typing import Optional, Sequence, Union
 from ifc_parsers import Site, Window
+from caching import TTLCache
+from instrumentation import timed
 
-# def window_solar_inflow(window: Window, site: Site, timestamp: pd.Timestamp) -> float:
-#     """
-#     Calculate the solar inflow through a single window over a fixed 5-minute interval,
-#     using the site’s location metadata and the window’s area and SHGC.
-#     """
-#     # get “now” in the site’s timezone
-#     # solar_in_time = pd.Timestamp.now(tz=site.timezone)
+# Window orientation assumed for every window (vertical, facing south)
+WINDOW_TILT = 90  # degrees
+WINDOW_AZIMUTH = 180  # facing south
+# Each inflow value covers a 5-minute interval
+INTERVAL_SECONDS = 5 * 60
 
-#     # using specific timestamp for testing
-#     solar_in_time = timestamp.tz_convert(site.timezone) if timestamp.tzinfo else timestamp.tz_localize(site.timezone)
 
-#     # compute sun position
-#     solpos = pvlib.solarposition.get_solarposition(
-#         solar_in_time, site.latitude, site.longitude, site.elevation
-#     )
-#     apparent_zenith = float(solpos["apparent_zenith"].iloc[0])
+def site_times(site: Site, times: Union[pd.DatetimeIndex, Sequence[pd.Timestamp]]) -> pd.DatetimeIndex:
+    """Timestamps as a DatetimeIndex in the site's timezone (naive timestamps are taken as site-local)."""
+    times = pd.DatetimeIndex(times)
+    return times.tz_convert(site.timezone) if times.tz is not None else times.tz_localize(site.timezone)
 
-#     # very simple direct-beam model (800 W/m² if above horizon)
-#     I_direct = 800.0 if apparent_zenith < 90 else 0.0
 
-#     # 5-minute duration
-#     duration_seconds = 5 * 60  
-
-#     # J = W/m² * m² * SHGC * s
-#     return window.area * window.SHGC * I_direct * duration_seconds
-
-
-
-
-def window_solar_inflow(window: Window, site: Site, timestamp: pd.Timestamp) -> float:
+@timed("pvlib")
+def solar_conditions(site: Site, times: pd.DatetimeIndex) -> pd.DataFrame:
     """
-    Calculate the solar inflow through a single window over a fixed 5-minute interval,
-    using the site’s location metadata and the window’s area and SHGC.
+    Sun position and Ineichen clear-sky irradiance for every timestamp. None of this depends on
+    the window, so it is computed once per timestamp vector and shared by all windows.
     """
-    # get “now” in the site’s timezone
-    # solar_in_time = pd.Timestamp.now(tz=site.timezone)
-
-    # using specific timestamp for testing
-    solar_in_time = timestamp.tz_convert(site.timezone) if timestamp.tzinfo else timestamp.tz_localize(site.timezone)
-
-    # Create a time index
-    time = pd.DatetimeIndex([solar_in_time])
+    times = site_times(site, times)
 
     # Solar position
-    solpos = pvlib.solarposition.get_solarposition(time, site.latitude, site.longitude)
+    solpos = pvlib.solarposition.get_solarposition(times, site.latitude, site.longitude)
 
     # Airmass (absolute)
     airmass = pvlib.atmosphere.get_absolute_airmass(
@@ -57,10 +38,9 @@ def window_solar_inflow(window: Window, site: Site, timestamp: pd.Timestamp) ->
     )
 
     # Linke turbidity
-    linke_turbidity = pvlib.clearsky.lookup_linke_turbidity(time, site.latitude, site.longitude)
+    linke_turbidity = pvlib.clearsky.lookup_linke_turbidity(times, site.latitude, site.longitude)
 
     altitude = site.elevation if site.elevation is not None else 0
-    # Now use ineichen correctly
     clearsky = pvlib.clearsky.ineichen(
         apparent_zenith=solpos["apparent_zenith"],
         airmass_absolute=airmass,
@@ -68,29 +48,98 @@ def window_solar_inflow(window: Window, site: Site, timestamp: pd.Timestamp) ->
         altitude=altitude
     )
 
-    # Get direct normal irradiance (DNI), diffuse horizontal (DHI), global horizontal (GHI)
-    dni = clearsky["dni"].iloc[0]
-    dhi = clearsky["dhi"].iloc[0]
-
-    # Get window tilt and azimuth (assuming vertical south-facing for simplicity)
-    tilt = 90  # degrees
-    azimuth = 180  # facing south
-
-    # Calculate plane-of-array (POA) irradiance
+    conditions = pd.DataFrame({
+        "apparent_zenith": solpos["apparent_zenith"],
+        "azimuth": solpos["azimuth"],
+        "airmass": airmass,
+        "linke_turbidity": linke_turbidity,
+        "dni": clearsky["dni"],
+        "dhi": clearsky["dhi"],
+        "ghi": clearsky["ghi"],
+    }, index=times)
+    conditions["poa_global"] = plane_of_array_irradiance(conditions)
+    return conditions
+
+
+def plane_of_array_irradiance(conditions: pd.DataFrame) -> np.ndarray:
+    """Total irradiance (W/m²) on a window with WINDOW_TILT/WINDOW_AZIMUTH, one value per timestamp."""
     poa_irradiance = pvlib.irradiance.get_total_irradiance(
-        surface_tilt=tilt,
-        surface_azimuth=azimuth,
-        dni=dni,
-        ghi=clearsky["ghi"].iloc[0],
-        dhi=dhi,
-        solar_zenith=solpos["apparent_zenith"].iloc[0],
-        solar_azimuth=solpos["azimuth"].iloc[0]
+        surface_tilt=WINDOW_TILT,
+        surface_azimuth=WINDOW_AZIMUTH,
+        dni=conditions["dni"],
+        ghi=conditions["ghi"],
+        dhi=conditions["dhi"],
+        solar_zenith=conditions["apparent_zenith"],
+        solar_azimuth=conditions["azimuth"]
     )
+    return poa_irradiance["poa_global"].to_numpy(dtype=float)
+
+
+# Solar position and clear-sky irradiance cached per site and 5-minute bucket, so that once
+# one room has been served, every other prediction in the same bucket skips pvlib entirely
+SOLAR_BUCKET = "5min"  # pipeline.BUCKET_SECONDS mirrors this
+SOLAR_COLUMNS = ["apparent_zenith", "azimuth", "airmass", "linke_turbidity", "dni", "dhi", "ghi", "poa_global"]
+solar_cache = TTLCache(maxsize=4096, ttl=24 * 3600)
 
-    I_poa = poa_irradiance["poa_global"]  # more accurate solar inflow (W/m²)
 
-    # 5-minute duration
-    duration_seconds = 5 * 60  
+def solar_bucket(times: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """Start of the 5-minute bucket (UTC) each timestamp falls in."""
+    return times.tz_convert("UTC").floor(SOLAR_BUCKET)
 
-    # J = W/m² * m² * SHGC * s
-    return window.area * window.SHGC * I_poa * duration_seconds
\ No newline at end of file
+
+def cached_solar_conditions(site: Site, times: pd.DatetimeIndex, cache: TTLCache = solar_cache) -> pd.DataFrame:
+    """
+    Like solar_conditions, but evaluated at the start of each timestamp's 5-minute bucket and
+    served from cache keyed by (lat, lon, elevation, bucket). Only uncached buckets hit pvlib,
+    in a single vectorized call.
+    """
+    times = site_times(site, times)
+    buckets = solar_bucket(times)
+    location = (site.latitude, site.longitude, site.elevation)
+
+    rows: dict[pd.Timestamp, np.ndarray] = {}
+    missing = []
+    for bucket in buckets.unique():
+        row = cache.get(location + (bucket.value,))
+        if row is None:
+            missing.append(bucket)
+        else:
+            rows[bucket] = row
+    if missing:
+        computed = solar_conditions(site, pd.DatetimeIndex(missing))[SOLAR_COLUMNS].to_numpy()
+        for bucket, row in zip(missing, computed):
+            cache.set(location + (bucket.value,), row)
+            rows[bucket] = row
+
+    return pd.DataFrame(np.array([rows[b] for b in buckets]).reshape(-1, len(SOLAR_COLUMNS)),
+                        index=times, columns=SOLAR_COLUMNS)
+
+
+def solar_inflow_matrix(site: Site, windows: Sequence[Window], times: pd.DatetimeIndex,
+                        cache: Optional[TTLCache] = None) -> np.ndarray:
+    """
+    Solar inflow (J) through every window over a 5-minute interval starting at every timestamp.
+    Returns a (len(times), len(windows)) array; row sums give a room's total inflow per timestamp.
+    With a cache, conditions are evaluated per 5-minute bucket (see cached_solar_conditions).
+    """
+    gain = np.array([(w.area or 0) * (w.SHGC or 0) for w in windows], dtype=float)
+    return gain_solar_inflow(site, gain, times, cache)
+
+
+def gain_solar_inflow(site: Site, gain: np.ndarray, times: pd.DatetimeIndex,
+                      cache: Optional[TTLCache] = None) -> np.ndarray:
+    """solar_inflow_matrix for windows given as their area × SHGC, e.g. a column of building_tables."""
+    if cache is not None:
+        poa = cached_solar_conditions(site, times, cache)["poa_global"].to_numpy()
+    else:
+        poa = solar_conditions(site, times)["poa_global"].to_numpy()
+    # J = W/m² * m² * SHGC * s, broadcast over (time, window)
+    return poa[:, None] * gain[None, :] * INTERVAL_SECONDS
+
+
+def window_solar_inflow(window: Window, site: Site, timestamp: pd.Timestamp) -> float:
+    """
+    Calculate the solar inflow through a single window over a fixed 5-minute interval,
+    using the site’s location metadata and the window’s area and SHGC.
+    """
+    return float(solar_inflow_matrix(site, [window], pd.DatetimeIndex([timestamp]))[0, 0])
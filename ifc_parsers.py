@@ -1,10 +1,21 @@
+import os
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional, Union
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Optional, Sequence, Union
 # external
-import ifcopenshell
-import ifcopenshell.geom
-import ifcopenshell.util.element
+import numpy as np
+
+if TYPE_CHECKING:
+    # type only: ifcopenshell is imported by the functions that open or tessellate an IFC, so a
+    # building served from its snapshot (and the simulator importing this module) doesn't pay for it
+    import ifcopenshell
+
+from instrumentation import stage
+
+# windows up to this many metres outside a room's bounding box still count as the room's windows
+WINDOW_BUFFER = 2
+# threads for bulk geometry extraction; unset or 0 uses every core
+GEOMETRY_THREADS_ENV = "IFC_GEOMETRY_THREADS"
 
 # OBJECT DEFINITIONS
 @dataclass
@@ -36,9 +47,89 @@ class Room:
     bounding_box: Optional[BoundingBox] = None
     windows: Optional[list[Window]] = None
 
+@dataclass
+class ElementGeometry:
+    '''World-coordinate geometry of one element, reduced to what room and window construction need.'''
+    bounding_box: Optional[BoundingBox]
+    # (triangles, 3) unit face normals, only when extracted with normals=True
+    normals: Optional[np.ndarray] = None
+
+class WindowIndex:
+    """
+    Bounding boxes of all external windows of a model, kept as (N, 3) NumPy arrays of
+    minimum and maximum corners, so containment against one room or every room is a single
+    vectorized comparison instead of a Python loop.
+    """
+    def __init__(self, windows: list[Window]):
+        self.windows = [w for w in windows if w.bounding_box is not None]
+        boxes = [w.bounding_box for w in self.windows]
+        self.mins = np.array([[b.x_min, b.y_min, b.z_min] for b in boxes], dtype=float).reshape(-1, 3)
+        self.maxs = np.array([[b.x_max, b.y_max, b.z_max] for b in boxes], dtype=float).reshape(-1, 3)
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    @classmethod
+    def from_model(cls, model: "ifcopenshell.file", settings=None, threads: Optional[int] = None) -> "WindowIndex":
+        '''Reads psets of every IfcWindow and tessellates the external ones in one bulk pass.'''
+        external = external_windows(model)
+        geometry = extract_geometry(model, [w for w, _ in external], settings, threads)
+        return cls.from_elements(external, geometry)
+
+    @classmethod
+    def from_elements(cls, external: list[tuple], geometry: dict[int, ElementGeometry]) -> "WindowIndex":
+        '''Builds the index from external_windows() output and the geometry extracted for them.'''
+        windows: list[Window] = []
+        for w, psets in external:
+            element = geometry.get(w.id())
+            windows.append(
+                Window(
+                    global_id=w.GlobalId,
+                    room_name="",
+                    bounding_box=element.bounding_box if element is not None else None,
+                    area=psets.get("BaseQuantities", {}).get("Area", 0),
+                    SHGC=psets.get("Analytical Properties(Type)", {}).get("Solar Heat Gain Coefficient", 0),
+                    is_external=True,
+                )
+            )
+        return cls(windows)
+
+    def query(self, bbox: Optional[BoundingBox], buf: float = WINDOW_BUFFER) -> np.ndarray:
+        '''Indices of the windows lying inside bbox grown by buf metres on every side.'''
+        if bbox is None:
+            return np.empty(0, dtype=int)
+        lo = np.array([bbox.x_min, bbox.y_min, bbox.z_min]) - buf
+        hi = np.array([bbox.x_max, bbox.y_max, bbox.z_max]) + buf
+        inside = (self.mins >= lo).all(axis=1) & (self.maxs <= hi).all(axis=1)
+        return np.flatnonzero(inside)
+
+    def query_all(self, bboxes: list[Optional[BoundingBox]], buf: float = WINDOW_BUFFER) -> np.ndarray:
+        '''(rooms x windows) boolean containment matrix. Rooms without a bounding box match nothing.'''
+        room_lo = np.full((len(bboxes), 3), np.nan)
+        room_hi = np.full((len(bboxes), 3), np.nan)
+        for i, b in enumerate(bboxes):
+            if b is not None:
+                room_lo[i] = (b.x_min, b.y_min, b.z_min)
+                room_hi[i] = (b.x_max, b.y_max, b.z_max)
+        room_lo -= buf
+        room_hi += buf
+        # one (rooms x windows) comparison per axis keeps temporaries 2-D;
+        # NaN comparisons are False, so rooms without geometry get an all-False row
+        inside = self.mins[:, 0] >= room_lo[:, 0, None]
+        for axis in range(3):
+            if axis:
+                inside &= self.mins[:, axis] >= room_lo[:, axis, None]
+            inside &= self.maxs[:, axis] <= room_hi[:, axis, None]
+        return inside
+
+    def windows_for(self, indices: np.ndarray, room_name: str) -> list[Window]:
+        '''Copies of the selected windows, tagged with the room they were assigned to.'''
+        return [replace(self.windows[i], room_name=room_name) for i in indices]
+
 class Site:
     """
-    The Site class holds site attributes and manages a collection of Room objects.
+    The Site class holds site attributes and manages a collection of Room objects, keyed by
+    Global ID: long and short names are not unique (BK has four spaces called "Room").
     """
     def __init__(self, latitude: float, longitude: float, elevation: float, timezone: str = "Europe/Amsterdam"):
         self.rooms: dict[str, Room] = {}
@@ -46,11 +137,35 @@ class Site:
         self.longitude = longitude
         self.elevation = elevation
         self.timezone = timezone
+        # case-insensitive lookup tables, filled by add_room; every room with that name, in building order
+        self._by_long_name: dict[str, list[Room]] = {}
+        self._by_short_name: dict[str, list[Room]] = {}
+        # set for buildings loaded from columnar tables (building_tables.BuildingTables.site);
+        # rooms is then a read-only mapping of views into the tables
+        self.tables = None
 
-    def add_room(self, room: Room, key: Optional[str] = None) -> None:
-        if key is None:
-            key = room.short_name
-        self.rooms[key] = room
+    def add_room(self, room: Room) -> None:
+        if room.global_id in self.rooms:
+            print(f"[WARNING] Duplicate Global ID {room.global_id} ('{room.long_name or room.short_name}'), room skipped")
+            return
+        self.rooms[room.global_id] = room
+        self._by_long_name.setdefault(room.long_name.strip().lower(), []).append(room)
+        self._by_short_name.setdefault(room.short_name.strip().lower(), []).append(room)
+
+    def find_rooms(self, name: str) -> list[Room]:
+        """
+        Every room with this long name, else every room with this short name (case-insensitive),
+        in building order.
+        """
+        if self.tables is not None:
+            return self.tables.find_rooms(name)
+        target = name.strip().lower()
+        return self._by_long_name.get(target) or self._by_short_name.get(target) or []
+
+    def get_room(self, name: str) -> Optional[Room]:
+        """The first room with this long or short name (case-insensitive). Returns None if unknown."""
+        rooms = self.find_rooms(name)
+        return rooms[0] if rooms else None
 
 # mini FUNCTION TO COMPUTE BOUNDING BOX
 def compute_bounding_box(shape_obj) -> Optional[BoundingBox]:
@@ -66,11 +181,82 @@ def compute_bounding_box(shape_obj) -> Optional[BoundingBox]:
         z_min=min(zs), z_max=max(zs),
     )
 
+def geometry_settings():
+    '''Tessellation settings shared by every geometry call: world coordinates, no vertex normals.'''
+    import ifcopenshell.geom
+    settings = ifcopenshell.geom.settings()
+    settings.set(settings.USE_WORLD_COORDS, True)
+    # per-vertex normals are never read; face normals are computed from the triangles on demand
+    settings.set("no-normals", True)
+    return settings
+
+def geometry_threads(threads: Optional[int] = None) -> int:
+    '''Thread count for extract_geometry: the argument, else $IFC_GEOMETRY_THREADS, else every core.'''
+    if threads is None:
+        threads = int(os.environ.get(GEOMETRY_THREADS_ENV, 0) or 0) or os.cpu_count() or 1
+    return max(1, threads)
+
+def face_normals(verts: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    '''Unit normals of the triangles `faces` (indices into the (N, 3) `verts`).'''
+    tri = verts[faces.reshape(-1, 3)]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+
+def extract_geometry(model: "ifcopenshell.file", elements: Sequence, settings=None,
+                     threads: Optional[int] = None, normals: bool = False) -> dict[int, ElementGeometry]:
+    '''
+    Tessellates all `elements` in one pass of ifcopenshell's geometry iterator, spread over
+    `threads` threads (see geometry_threads), and keeps only their world-coordinate bounding
+    boxes and, with normals=True, face normals. Keyed by STEP id; elements that have no
+    geometry or fail to tessellate are left out, like a failed create_shape.
+    '''
+    import ifcopenshell.geom
+    if not elements:
+        return {}
+    if settings is None:
+        settings = geometry_settings()
+    iterator = ifcopenshell.geom.iterator(settings, model, geometry_threads(threads), include=list(elements))
+    result: dict[int, ElementGeometry] = {}
+    if not iterator.initialize():
+        return result
+    while True:
+        shape = iterator.get()
+        verts = np.frombuffer(shape.geometry.verts_buffer, dtype=np.float64).reshape(-1, 3)
+        if len(verts):
+            lo, hi = verts.min(axis=0), verts.max(axis=0)
+            bbox = BoundingBox(
+                x_min=float(lo[0]), x_max=float(hi[0]),
+                y_min=float(lo[1]), y_max=float(hi[1]),
+                z_min=float(lo[2]), z_max=float(hi[2]),
+            )
+            element_normals = None
+            if normals:
+                faces = np.frombuffer(shape.geometry.faces_buffer, dtype=np.int32)
+                element_normals = face_normals(verts, faces)
+            result[shape.id] = ElementGeometry(bounding_box=bbox, normals=element_normals)
+        if not iterator.next():
+            break
+    return result
+
+def external_windows(model: "ifcopenshell.file") -> list[tuple]:
+    '''(IfcWindow, psets) of every window whose Pset_WindowCommon marks it external.'''
+    import ifcopenshell.util.element
+    external = []
+    for w in model.by_type("IfcWindow"):
+        psets = ifcopenshell.util.element.get_psets(w)
+        if psets.get("Pset_WindowCommon", {}).get("IsExternal", False):
+            external.append((w, psets))
+    return external
+
 # FUNCTION TO EXTRACT SITE DETAILS FROM IFC FILE
-def extract_site_details(ifc_path: Union[str, Path]) -> Site:
-    if isinstance(ifc_path, str):
-        ifc_path = Path(ifc_path)
-    model = ifcopenshell.open(ifc_path)
+def extract_site_details(ifc_path: Union[str, Path, "ifcopenshell.file"]) -> Site:
+    '''Accepts a path or an already opened model, so callers holding the model don't open the IFC twice.'''
+    import ifcopenshell
+    if isinstance(ifc_path, ifcopenshell.file):
+        model = ifc_path
+    else:
+        model = ifcopenshell.open(Path(ifc_path))
     sites = model.by_type("IfcSite")
     if not sites:
         return Site(latitude=0.0, longitude=0.0, elevation=0.0)
@@ -84,16 +270,16 @@ def extract_site_details(ifc_path: Union[str, Path]) -> Site:
     return Site(latitude=lat, longitude=lon, elevation=elev)
 
 # FUNCTION TO create ROOM OBJECT FROM  IFC FILE
-def parse_room(ifc_path: Union[str, Path], room_name: str) -> Site:
+def parse_room(ifc_path: Union[str, Path], room_name: str, threads: Optional[int] = None) -> Site:
     '''This function builds and returns a Site object containing exactly one room in its .rooms dict'''
+    import ifcopenshell.geom
+    import ifcopenshell.util.element
     if isinstance(ifc_path, str):
         ifc_path = Path(ifc_path)
     model = ifcopenshell.open(ifc_path)
-    site = extract_site_details(ifc_path)
+    site = extract_site_details(model)
     spaces = model.by_type("IfcSpace")
-    windows = model.by_type("IfcWindow")
-    settings = ifcopenshell.geom.settings()
-    settings.set(settings.USE_WORLD_COORDS, True)
+    settings = geometry_settings()
     target = room_name.strip().lower()
 
     for space in spaces:
@@ -112,40 +298,8 @@ def parse_room(ifc_path: Union[str, Path], room_name: str) -> Site:
                 bbox = None
             
             # Gather external windows in the room
-            room_windows: list[Window] = []
-            for w in windows:
-                psets = ifcopenshell.util.element.get_psets(w).get("Pset_WindowCommon", {})
-                if not psets.get("IsExternal", False):
-                    continue
-                try:
-                    shape_w = ifcopenshell.geom.create_shape(settings, w)
-                    wbbox = compute_bounding_box(shape_w)
-                except Exception:
-                    wbbox = None
-                # Check if window inside room bbox
-                if bbox and wbbox:
-                    buf = 2
-                    if (
-                        wbbox.x_min >= bbox.x_min - buf and
-                        wbbox.y_min >= bbox.y_min - buf and
-                        wbbox.z_min >= bbox.z_min - buf and
-                        wbbox.x_max <= bbox.x_max + buf and
-                        wbbox.y_max <= bbox.y_max + buf and
-                        wbbox.z_max <= bbox.z_max + buf
-                    ):
-                        bq = ifcopenshell.util.element.get_psets(w).get("BaseQuantities", {})
-                        area = bq.get("Area", 0)
-                        shgc = ifcopenshell.util.element.get_psets(w).get("Analytical Properties(Type)", {}).get("Solar Heat Gain Coefficient", 0)
-                        room_windows.append(
-                            Window(
-                                global_id=w.GlobalId,
-                                room_name=short_name,
-                                bounding_box=wbbox,
-                                area=area,
-                                SHGC=shgc,
-                                is_external=True,
-                            )
-                        )
+            window_index = WindowIndex.from_model(model, settings, threads)
+            room_windows = window_index.windows_for(window_index.query(bbox), short_name)
             # Create the room object and add it to the site
             parsed = Room(
                 global_id=gid,
@@ -155,17 +309,60 @@ def parse_room(ifc_path: Union[str, Path], room_name: str) -> Site:
                 bounding_box=bbox,
                 windows=room_windows or None
             )
-            site.add_room(parsed, key=parsed.long_name)
+            site.add_room(parsed)
             return site
 
     # Not found
     raise ValueError(f"No space named '{room_name}' found in IFC")
 
+# FUNCTION TO create SITE OBJECT WITH EVERY ROOM FROM IFC FILE
+def parse_building(ifc_path: Union[str, Path], threads: Optional[int] = None) -> Site:
+    '''
+    Builds a Site holding every IfcSpace of the model, each with its external windows.
+    The IFC is opened once, and all spaces and external windows are tessellated together in one
+    multi-threaded geometry pass (`threads`, see geometry_threads).
+    '''
+    import ifcopenshell.util.element
+    if isinstance(ifc_path, str):
+        ifc_path = Path(ifc_path)
+    model = ifcopenshell.open(ifc_path)
+    site = extract_site_details(model)
+
+    spaces = model.by_type("IfcSpace")
+    external = external_windows(model)
+    with stage("geometry"):
+        geometry = extract_geometry(model, spaces + [w for w, _ in external], threads=threads)
+    window_index = WindowIndex.from_elements(external, geometry)
+    bboxes: list[Optional[BoundingBox]] = []
+    for space in spaces:
+        element = geometry.get(space.id())
+        bboxes.append(element.bounding_box if element is not None else None)
+    # one vectorized pass assigns windows to every room
+    containment = window_index.query_all(bboxes)
+
+    for space, bbox, inside in zip(spaces, bboxes, containment):
+        short_name = space.Name or ""
+        long_name = space.LongName or ""
+        props = ifcopenshell.util.element.get_psets(space)
+        volume = props.get("BaseQuantities", {}).get("GrossVolume", 0)
+        room_windows = window_index.windows_for(np.flatnonzero(inside), short_name)
+        site.add_room(
+            Room(
+                global_id=space.GlobalId,
+                short_name=short_name,
+                long_name=long_name,
+                volume=volume,
+                bounding_box=bbox,
+                windows=room_windows or None
+            )
+        )
+    return site
+
 if __name__ == "__main__":
     ifc_path = '../../vb_resources/BK_BIM/ifc/BK_v2_vb_updated.ifc'
     room_name = '81'
     site = parse_room(ifc_path, room_name)
-    room = site.rooms.get(room_name)
+    room = site.get_room(room_name)
     if room:
         print(f"Room: {room.short_name}, Volume: {room.volume}, Windows: {len(room.windows or [])}")
     else:
@@ -0,0 +1,77 @@
+from typing import Any, Optional
+import numpy as np
+import pandas as pd
+
+# Prediction without the sklearn/pandas layers. The trained Pipeline is StandardScaler followed
+# by XGBRegressor; at load time the scaler is reduced to two NumPy vectors and the booster is
+# called directly with inplace_predict, so a prediction costs one array op plus the trees.
+
+# feature columns the pipeline was trained on, in order
+FEATURES = ["external_temp", "volume", "solar_inflow"]
+
+
+class FastPredictor:
+    """
+    Drop-in for Pipeline.predict on a (rows × FEATURES) array. Pipelines that aren't a plain
+    StandardScaler + XGBRegressor (or that fail the parity probe) fall back to Pipeline.predict.
+    """
+    def __init__(self, pipeline: Any, check: bool = True):
+        self.pipeline = pipeline
+        self.booster = None
+        self.mean: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        try:
+            self._fold(pipeline)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            print(f"[WARNING] Fast inference unavailable, using Pipeline.predict: {e}")
+            self.booster = None
+            return
+        if check and not self.matches_pipeline(self.probe()):
+            print("[WARNING] Fast inference differs from Pipeline.predict, using Pipeline.predict")
+            self.booster = None
+
+    @property
+    def fast(self) -> bool:
+        return self.booster is not None
+
+    def _fold(self, pipeline: Any) -> None:
+        steps = pipeline.named_steps
+        scaler, model = steps["scaler"], steps["xgb"]
+        if type(scaler).__name__ != "StandardScaler" or len(steps) != 2:
+            raise TypeError(f"unsupported pipeline steps {list(steps)}")
+        n = len(FEATURES)
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else np.zeros(n)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else np.ones(n)
+        if self.mean.shape != (n,) or self.scale.shape != (n,):
+            raise ValueError(f"scaler was fitted on {self.mean.shape[0]} features, expected {n}")
+        # use the same trees as XGBRegressor.predict: up to the best iteration if early stopping ran
+        best = getattr(model, "best_iteration", None)
+        self._iteration_range = (0, best + 1) if best is not None else (0, 0)
+        self.booster = model.get_booster()
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predictions (float64) for every row of X, columns in FEATURES order."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.booster is None:
+            return np.asarray(self.pipeline.predict(pd.DataFrame(X, columns=FEATURES)), dtype=np.float64)
+        # scale in float64 like StandardScaler, then hand XGBoost the float32 it would convert to
+        scaled = np.ascontiguousarray((X - self.mean) / self.scale, dtype=np.float32)
+        predicted = self.booster.inplace_predict(scaled, iteration_range=self._iteration_range,
+                                                 validate_features=False)
+        return np.asarray(predicted, dtype=np.float64).reshape(-1)
+
+    def predict_one(self, external_temp: float, volume: float, solar_inflow: float) -> float:
+        return float(self.predict(np.array([[external_temp, volume, solar_inflow]]))[0])
+
+    def probe(self, rows: int = 64, seed: int = 0) -> np.ndarray:
+        """Feature rows spread around the training distribution, for parity checks."""
+        rng = np.random.default_rng(seed)
+        mean = self.mean if self.mean is not None else np.zeros(len(FEATURES))
+        scale = self.scale if self.scale is not None else np.ones(len(FEATURES))
+        return mean + scale * rng.uniform(-3, 3, size=(rows, len(FEATURES)))
+
+    def matches_pipeline(self, X: np.ndarray, rtol: float = 1e-6, atol: float = 1e-5) -> bool:
+        expected = self.pipeline.predict(pd.DataFrame(X, columns=FEATURES))
+        return bool(np.allclose(self.predict(X), expected, rtol=rtol, atol=atol))
@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+import uuid
+import random
+import functools
+import threading
+import contextvars
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Union
+from prometheus_client import Histogram
+
+# Stage timings. Every `with stage("weather"):` block is observed in a Prometheus histogram
+# (served on /metrics) and, when a collector is active in the current context, added to that
+# request's timings, which become its Server-Timing header. Work handed to worker threads keeps
+# the collector as long as the context is copied along (SimulationPipeline.run_stage does).
+#
+# Stages: resolve, weather, solar, predict (simulator); snapshot_load, ifc_parse, geometry
+# (building); weather_fetch (remote weather); pvlib (solar position/irradiance);
+# frost_fetch, featurize, train, save (training script); scan, dmatrix (out-of-core training).
+
+# ~1 ms .. ~1 min; IFC parsing of the full building lands in the top buckets
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "bkviewer_stage_duration_seconds", "Time spent in each simulation/training stage", ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "bkviewer_request_duration_seconds", "API request latency", ["method", "route", "status"],
+    buckets=STAGE_BUCKETS,
+)
+
+_timings: contextvars.ContextVar[Optional[dict[str, float]]] = contextvars.ContextVar("stage_timings", default=None)
+
+
+def record(name: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(name).observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        # a stage that runs several times in one request is reported as its total
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    sampler = _sampler.get()
+    if sampler is not None:
+        sampler.enter()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+        if sampler is not None:
+            sampler.exit()
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of stage()."""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def collect_timings() -> Iterator[dict[str, float]]:
+    """Collect the stage timings of everything run in this context (seconds per stage)."""
+    timings: dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def print_stage_timings(timings: dict[str, float]) -> None:
+    """Timings from collect_timings as a table, for the training scripts."""
+    for name, seconds in timings.items():
+        print(f"[INFO] {name:14s} {seconds:8.2f} s")
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    """Server-Timing header value, durations in milliseconds."""
+    return ", ".join(f"{name};dur={seconds * 1e3:.2f}" for name, seconds in timings.items())
+
+
+# PROFILING
+PROFILE_RATE_ENV = "PROFILE_SAMPLE_RATE"
+PROFILE_DIR = Path("profiles")
+
+_sampler: contextvars.ContextVar[Optional["StackSampler"]] = contextvars.ContextVar("stack_sampler", default=None)
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of the threads currently running stages for one request (stage()
+    registers its thread while a sampler is active in the context) and counts them as folded
+    stacks, the input format of flame graph tools (speedscope, flamegraph.pl, inferno).
+    """
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.counts: Counter[str] = Counter()
+        self.samples = 0
+        self._threads: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enter(self) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] = self._threads.get(tid, 0) + 1
+
+    def exit(self) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            depth = self._threads.get(tid, 0) - 1
+            if depth > 0:
+                self._threads[tid] = depth
+            else:
+                self._threads.pop(tid, None)
+
+    @staticmethod
+    def _folded(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = list(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for tid in threads:
+                frame = frames.get(tid)
+                if frame is not None:
+                    self.counts[self._folded(frame)] += 1
+                    self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class RequestProfiler:
+    """
+    Opt-in sampling profiler for live requests. Off unless sample_rate > 0 (set at startup via
+    PROFILE_SAMPLE_RATE or at runtime via the API). For a sampled request, the stacks of its
+    stage work are sampled every `interval` seconds and written to output_dir as a
+    .folded file; only the newest `keep` profiles are kept.
+    """
+    def __init__(self, sample_rate: float = 0.0, output_dir: Union[str, Path] = PROFILE_DIR,
+                 interval: float = 0.002, keep: int = 50):
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.keep = keep
+        self.sample_rate = 0.0
+        self._lock = threading.Lock()
+        self.configure(sample_rate)
+
+    @classmethod
+    def from_env(cls) -> "RequestProfiler":
+        return cls(sample_rate=float(os.environ.get(PROFILE_RATE_ENV, 0) or 0))
+
+    def configure(self, sample_rate: float) -> None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.sample_rate = sample_rate
+
+    def start(self) -> Optional[tuple[StackSampler, contextvars.Token]]:
+        """Start sampling the current context if this request is picked; pass the result to finish()."""
+        if not (self.sample_rate > 0 and random.random() < self.sample_rate):
+            return None
+        sampler = StackSampler(self.interval)
+        token = _sampler.set(sampler)
+        sampler.start()
+        return sampler, token
+
+    def finish(self, started: tuple[StackSampler, contextvars.Token], label: str) -> Optional[Path]:
+        """Stop sampling and write the profile. Returns its path, None if nothing was sampled."""
+        sampler, token = started
+        sampler.stop()
+        _sampler.reset(token)
+        if not sampler.samples:
+            return None
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in label)[:80]
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}-{safe}.folded"
+        path.write_text(sampler.folded())
+        with self._lock:
+            for old in sorted(self.output_dir.glob("*.folded"))[:-self.keep]:
+                old.unlink(missing_ok=True)
+        return path
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "interval": self.interval,
+            "output_dir": str(self.output_dir),
+            "profiles": len(list(self.output_dir.glob("*.folded"))) if self.output_dir.exists() else 0,
+        }
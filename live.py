@@ -0,0 +1,195 @@
+import json
+import time
+import asyncio
+from typing import AsyncIterator, Optional
+
+from pipeline import BUCKET_SECONDS, SimulationPipeline
+from startup import LazyModule
+
+simulator = LazyModule("simulator")
+
+# Live predictions over Server-Sent Events. Browsers subscribe to rooms; one scheduler task
+# recomputes every watched room once per 5-minute solar bucket, and again whenever another model
+# version becomes active, in one batch call per building (simulator.simulate_rooms), then hands each
+# result to that room's subscribers. Server work grows with the number of distinct rooms being
+# watched, not with the number of open connections.
+
+# upper bound on rooms per connection
+MAX_LIVE_ROOMS = 100
+# idle connections get a comment line this often, so proxies don't time them out
+KEEPALIVE_SECONDS = 15
+
+
+class Subscription:
+    """
+    One client's rooms (all in one building) and the newest result per room it hasn't been sent
+    yet. A slow client only ever has one pending result per room, it never builds up a backlog.
+    """
+    def __init__(self, building: str, rooms: dict[str, str]):
+        self.building = building
+        # global id -> name the client asked for
+        self.rooms = rooms
+        self.pending: dict[str, dict] = {}
+        self.ready = asyncio.Event()
+
+    def push(self, global_id: str, result: dict) -> None:
+        self.pending[global_id] = {**result, "room": self.rooms[global_id]}
+        self.ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> list[dict]:
+        """Results pushed since the last call; empty if timeout passes first."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self.ready.clear()
+        results, self.pending = list(self.pending.values()), {}
+        return results
+
+
+class LiveScheduler:
+    """
+    Shared tick scheduler for live predictions. Runs as one task on the event loop, started by
+    the first subscription; the batch itself runs on the pipeline's CPU pool.
+    """
+    def __init__(self, pipeline: SimulationPipeline, poll_interval: float = 1.0):
+        self.pipeline = pipeline
+        # how often the active model version is checked between bucket boundaries
+        self.poll_interval = poll_interval
+        self.subscriptions: set[Subscription] = set()
+        # (building, global id) -> (tick the result belongs to, result)
+        self.latest: dict[tuple[str, str], tuple[tuple, dict]] = {}
+        self.ticks = 0
+        self.computed = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def watched(self) -> dict[tuple[str, str], str]:
+        """Distinct rooms with at least one subscriber: (building, global id) -> a name to simulate it by."""
+        rooms: dict[tuple[str, str], str] = {}
+        for subscription in self.subscriptions:
+            for global_id, name in subscription.rooms.items():
+                rooms.setdefault((subscription.building, global_id), name)
+        return rooms
+
+    @staticmethod
+    def current_tick(building: str) -> tuple:
+        return int(time.time()) // BUCKET_SECONDS, simulator.buildings.models(building).active_version
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run(), name="live-scheduler")
+
+    async def resolve(self, names: list[str], building: str) -> dict[str, str]:
+        """
+        Room names of one building -> {global id: name}. Raises simulator.RoomNotFoundError for
+        an unknown room.
+        """
+        def lookup() -> dict[str, str]:
+            site = simulator.buildings.site(building)
+            rooms = {}
+            for name in names:
+                rooms.setdefault(simulator.find_room(site, name).global_id, name)
+            return rooms
+        return await self.pipeline.run_stage("resolve", lookup)
+
+    def subscribe(self, building: str, rooms: dict[str, str]) -> Subscription:
+        self._ensure_running()
+        subscription = Subscription(building, rooms)
+        self.subscriptions.add(subscription)
+        # rooms already computed for this tick are sent right away; the others wake the scheduler
+        tick = self.current_tick(building)
+        for global_id in rooms:
+            cached = self.latest.get((building, global_id))
+            if cached is not None and cached[0] == tick:
+                subscription.push(global_id, cached[1])
+            else:
+                self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+        watched = self.watched
+        for key in list(self.latest):
+            if key not in watched:
+                del self.latest[key]
+
+    async def _compute(self, building: str, rooms: dict[str, str], tick: tuple) -> None:
+        """One batch for the given rooms of a building, fanned out to every subscriber of each room."""
+        ids = list(rooms)
+        try:
+            results = await self.pipeline.run_stage("predict", simulator.simulate_rooms, [rooms[i] for i in ids],
+                                                    None, building)
+        except Exception as e:
+            print(f"[WARNING] Live update failed: {e!r}")
+            results = [{"error": f"Simulator error: {e!r}"} for _ in ids]
+        self.ticks += 1
+        self.computed += len(ids)
+        bucket_start = tick[0] * BUCKET_SECONDS
+        for global_id, result in zip(ids, results):
+            result = {k: v for k, v in result.items() if k != "room"}
+            result["global_id"] = global_id
+            result["building"] = building
+            result["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(bucket_start))
+            if "error" not in result:
+                self.latest[(building, global_id)] = (tick, result)
+            for subscription in list(self.subscriptions):
+                if subscription.building == building and global_id in subscription.rooms:
+                    subscription.push(global_id, result)
+
+    async def _run(self) -> None:
+        while True:
+            # cleared before computing, so a room subscribed during the batch triggers the next one
+            self._wake.clear()
+            by_building: dict[str, dict[str, str]] = {}
+            for (building, global_id), name in self.watched.items():
+                by_building.setdefault(building, {})[global_id] = name
+            for building, rooms in by_building.items():
+                try:
+                    tick = self.current_tick(building)
+                    stale = {gid: name for gid, name in rooms.items()
+                             if (building, gid) not in self.latest or self.latest[(building, gid)][0] != tick}
+                    if stale:
+                        await self._compute(building, stale, tick)
+                except Exception as e:
+                    print(f"[WARNING] Live scheduler tick failed for building '{building}': {e!r}")
+            # sleep until the bucket ends, the model is re-checked, or a new room is subscribed
+            until_bucket = BUCKET_SECONDS - time.time() % BUCKET_SECONDS
+            try:
+                await asyncio.wait_for(self._wake.wait(), min(self.poll_interval, until_bucket))
+            except asyncio.TimeoutError:
+                pass
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[str]:
+        """
+        SSE body for one subscription: a `prediction` event per result (failed rooms carry an
+        "error" field instead of a temperature), keepalive comments in between.
+        """
+        try:
+            # clients reconnect after 5 s if the connection drops
+            yield "retry: 5000\n\n"
+            while True:
+                results = await subscription.next(timeout=KEEPALIVE_SECONDS)
+                if not results:
+                    yield ": keepalive\n\n"
+                for result in results:
+                    yield f"event: prediction\ndata: {json.dumps(result)}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.subscriptions),
+            "buildings_watched": len({subscription.building for subscription in self.subscriptions}),
+            "rooms_watched": len(self.watched),
+            "ticks": self.ticks,
+            "rooms_computed": self.computed,
+        }
+
+    def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
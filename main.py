@@ -1,15 +1,280 @@
-from fastapi import FastAPI, HTTPException
+import os
+import gzip
+import hmac
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import simulator
+from pydantic import BaseModel, Field
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import traceback
+from caching import TTLCache
+from pipeline import SimulationPipeline
+from live import MAX_LIVE_ROOMS, LiveScheduler
+from room_catalogue import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_catalogue
+from instrumentation import REQUEST_SECONDS, RequestProfiler, collect_timings, server_timing
+from startup import LazyModule, Readiness, start_warmup
 
-app = FastAPI()
+# the simulation stack is heavy to import; it loads in the background warmup (or on first use)
+simulator = LazyModule("simulator")
 
-# so /api/rooms/{room_name} endpoint calls predict_internal_temp:
+# bounded executors + single-flight for the per-room simulation path
+pipeline = SimulationPipeline()
+
+# one shared scheduler pushes live predictions to every SSE subscriber
+live = LiveScheduler(pipeline)
+
+# encoded /api/rooms bodies (plain and gzipped), keyed by catalogue ETag and query
+catalogue_responses = TTLCache(maxsize=256)
+# the room list only changes with the IFC; the ETag (a hash of the catalogue) catches that on revalidation
+CATALOGUE_CACHE_CONTROL = "public, max-age=3600, stale-while-revalidate=86400"
+# smaller bodies aren't worth compressing
+GZIP_MIN_SIZE = 1024
+
+# opt-in sampling profiler (PROFILE_SAMPLE_RATE or POST /api/profiling); off by default
+profiler = RequestProfiler.from_env()
+
+# Endpoints that change server state (model pin/unpin/rollback, profiler settings) need
+# "Authorization: Bearer $ADMIN_TOKEN"; without ADMIN_TOKEN set they are switched off
+ADMIN_TOKEN_ENV = "ADMIN_TOKEN"
+
+def require_admin(authorization: Optional[str] = Header(default=None)) -> None:
+    token = os.environ.get(ADMIN_TOKEN_ENV)
+    if not token:
+        raise HTTPException(status_code=404, detail=f"Admin endpoints are disabled (set {ADMIN_TOKEN_ENV})")
+    scheme, _, given = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(given.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Admin token required",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start serving immediately; imports, building snapshot, model (plus its watcher) and the
+    # solar/weather caches are loaded on a background thread, and /readyz turns 200 once done
+    app.state.readiness = Readiness()
+    start_warmup(app.state.readiness)
+    yield
+    live.shutdown()
+    if simulator.loaded:
+        simulator.buildings.stop_watching()
+    pipeline.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Per-request latency histogram for every /api route; simulate responses also get a
+# Server-Timing header with the time spent per stage (resolve, weather, solar, predict, ...)
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    start = time.perf_counter()
+    sampling = profiler.start()
+    with collect_timings() as timings:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    if sampling is not None:
+        path = profiler.finish(sampling, f"{request.method} {request.url.path}")
+        if path is not None:
+            response.headers["X-Profile"] = path.name
+    route = request.scope.get("route")
+    REQUEST_SECONDS.labels(request.method, getattr(route, "path", "unmatched"), str(response.status_code)).observe(elapsed)
+    if request.url.path.startswith("/api/simulate"):
+        response.headers["Server-Timing"] = server_timing({**timings, "total": elapsed})
+    return response
+
+# Liveness: the process is up and the event loop answers
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+# Readiness: 200 once building, model and caches are warm, 503 (with per-step progress) before
+@app.get("/readyz")
+def readyz(request: Request):
+    report = request.app.state.readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+# Prometheus scrape endpoint: stage/request latency histograms plus process metrics
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# Every simulation/room endpoint takes an optional ?building=<id> (see buildings.py); without it
+# the default building is used. Unknown ids are a 404
+def require_building(building: Optional[str]) -> str:
+    try:
+        return simulator.buildings.get(building).id
+    except simulator.UnknownBuildingError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+async def resolve_building(building: Optional[str]) -> str:
+    """
+    require_building for async handlers. The first touch of `simulator` imports the whole
+    simulation stack, so it runs on the pipeline's pool: during warmup the event loop keeps
+    serving /healthz and static files instead of waiting for the imports.
+    """
+    return await pipeline.run_stage("resolve", require_building, building)
+
+# configured buildings, which of them are in memory, and the model version serving each
+@app.get("/api/buildings")
+def list_buildings():
+    return {"default": simulator.buildings.default, "buildings": simulator.buildings.describe()}
+
+class BatchRequest(BaseModel):
+    rooms: list[str] = Field(min_length=1, max_length=1000)
+    # defaults to now; naive times are taken in the site's timezone
+    timestamp: Optional[datetime] = None
+    # defaults to the default building
+    building: Optional[str] = None
+
+# many rooms in one request: one weather lookup, one solar pass, one model call
+@app.post("/api/simulate/batch")
+def simulate_batch(request: BatchRequest):
+    building = require_building(request.building)
+    try:
+        results = simulator.simulate_rooms(request.rooms, request.timestamp, building)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Simulator error: {e!r}"
+        )
+    return {"results": results}
+
+# every room of the building, streamed as NDJSON ({"global_id": ..., "predicted_temp": ...} per line)
+# so the viewer can start colouring rooms before the last one is predicted
+@app.get("/api/building/temperatures")
+def building_temperatures(building: Optional[str] = None):
+    building = require_building(building)
+    try:
+        meta, chunks = simulator.building_temperature_stream(building)
+    except ValueError as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Simulator error: {e!r}"
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={
+            "X-Model-Version": meta["model_version"],
+            "X-Solar-Bucket": meta["timestamp"],
+            "X-Room-Count": str(meta["rooms"]),
+            "X-Building": meta["building"],
+        },
+    )
+
+# predicted temperature curve for one room, e.g. to drive the Cesium timeline
+@app.get("/api/simulate/{room_name}/series")
+def get_room_series(room_name: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    freq: str = "1h", building: Optional[str] = None):
+    building = require_building(building)
+    try:
+        return simulator.simulate_series(room_name, start, end, freq, building)
+    except simulator.RoomNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except simulator.SeriesRequestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Simulator error: {e!r}"
+        )
+
+# Live predictions as Server-Sent Events: GET /api/live?rooms=00.West.010&rooms=...
+# Each room is recomputed once per 5-minute bucket (or on a model change) for all subscribers together
+@app.get("/api/live")
+async def live_predictions(rooms: list[str] = Query(min_length=1, max_length=MAX_LIVE_ROOMS),
+                           building: Optional[str] = None):
+    building = await resolve_building(building)
+    try:
+        resolved = await live.resolve(rooms, building)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    subscription = live.subscribe(building, resolved)
+    return StreamingResponse(
+        live.stream(subscription),
+        media_type="text/event-stream",
+        # proxies must neither cache nor buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/live/stats")
+def live_stats():
+    return live.stats()
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the If-None-Match header lists etag (weak or strong) or is '*'."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates or "*" in candidates
+
+def catalogue_response(request: Request, etag: str, key: tuple, build) -> Response:
+    """
+    JSON response for a catalogue query: 304 if the client holds the current ETag, otherwise the
+    body built once per (catalogue, query) and served gzipped to clients that accept it.
+    """
+    # weak: the plain and gzipped bodies are the same content in different encodings
+    headers = {"ETag": f"W/{etag}", "Cache-Control": CATALOGUE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    bodies = catalogue_responses.get(key)
+    if bodies is None:
+        body = json.dumps(build()).encode()
+        bodies = (body, gzip.compress(body) if len(body) >= GZIP_MIN_SIZE else None)
+        catalogue_responses.set(key, bodies)
+    body, compressed = bodies
+    if compressed is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(compressed, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(body, media_type="application/json", headers=headers)
+
+# Room catalogue for dropdowns/autocomplete: GET /api/rooms?q=00.we&offset=0&limit=100 matches the
+# prefix against long names, short names and Global IDs (case-insensitive); without q, every room
+@app.get("/api/rooms")
+def list_rooms(request: Request, q: str = "", offset: int = Query(0, ge=0),
+               limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), building: Optional[str] = None):
+    catalogue = get_catalogue(simulator.buildings.site(require_building(building)))
+    key = (catalogue.etag, "search", q.strip().lower(), offset, limit)
+    return catalogue_response(request, catalogue.etag, key, lambda: catalogue.search(q, offset, limit))
+
+# one room by long name, short name or Global ID; unknown names get a 404 with close matches
+@app.get("/api/rooms/{room_name}")
+def get_room_entry(room_name: str, request: Request, building: Optional[str] = None):
+    catalogue = get_catalogue(simulator.buildings.site(require_building(building)))
+    index = catalogue.find_index(room_name)
+    if index is None:
+        raise HTTPException(status_code=404, detail={
+            "message": f"No room named '{room_name}' found in IFC rooms",
+            "suggestions": catalogue.suggest(room_name),
+        })
+    return catalogue_response(request, catalogue.etag, (catalogue.etag, "room", index),
+                              lambda: catalogue.entries[index])
+
+# so /api/simulate/{room_name} endpoint predicts the room's internal temperature (via the pipeline):
 @app.get("/api/simulate/{room_name}")
-def get_room(room_name: str):
+async def get_room(room_name: str, request: Request, response: Response, building: Optional[str] = None):
+    building = await resolve_building(building)
     try:
-        temp = simulator.predict_internal_temp(room_name)
+        # a prediction is fixed for the current (building, room, 5-minute bucket, model version),
+        # so browsers and proxies may reuse it until the bucket ends and revalidate with the ETag
+        _, etag, max_age = await pipeline.response_key(room_name, building)
+        cache_headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=cache_headers)
+        result, etag, max_age = await pipeline.cached_simulate_room(room_name, building)
+        response.headers.update({"ETag": etag, "Cache-Control": f"public, max-age={max_age}"})
     except ValueError as e:
         traceback.print_exc()                  # ← prints full stack for 404s
         raise HTTPException(status_code=404, detail=str(e))
@@ -19,9 +284,67 @@ def get_room(room_name: str):
             status_code=500,
             detail=f"Simulator error: {e!r}"
         )
-    return {"predicted_temp": temp}
+    return result
 # what happens to the content I return from this function - FastAPI serves up the same to any HTTP client—be it curl, Postman, or browser’s fetch—and it’s up to that client to decide how to display or consume it
 
+# cache sizes and hit rates, for tuning
+@app.get("/api/cache/stats")
+def cache_stats():
+    return {
+        "simulation": pipeline.stats(),
+        "solar": simulator.solar_cache.stats(),
+        "building_map": simulator.building_map_cache.stats(),
+        "buildings": simulator.building_cache.stats(),
+    }
+
+# Sampling profiler: GET shows the settings, POST ?sample_rate=0.05 (admin only) profiles 5% of API requests
+# (0 switches it off); profiles are written to profiles/ as folded stacks for flame graph tools
+@app.get("/api/profiling")
+def profiling_status():
+    return profiler.stats()
+
+@app.post("/api/profiling", dependencies=[Depends(require_admin)])
+def configure_profiling(sample_rate: float):
+    try:
+        profiler.configure(sample_rate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profiler.stats()
+
+# Model management: which version is active, pin/unpin a version, roll back one version (admin only)
+# (of the building's model directory; ?building=<id>, default building without it)
+@app.get("/api/models")
+def list_models(building: Optional[str] = None):
+    registry = simulator.buildings.models(require_building(building))
+    return {
+        "active": registry.active_version,
+        "pinned": registry.pinned,
+        "available": registry.available_versions(),
+    }
+
+@app.post("/api/models/{version}/pin", dependencies=[Depends(require_admin)])
+def pin_model(version: str, building: Optional[str] = None):
+    registry = simulator.buildings.models(require_building(building))
+    try:
+        loaded = registry.pin(version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"active": loaded.version, "pinned": registry.pinned}
+
+@app.post("/api/models/unpin", dependencies=[Depends(require_admin)])
+def unpin_model(building: Optional[str] = None):
+    loaded = simulator.buildings.models(require_building(building)).unpin()
+    return {"active": loaded.version, "pinned": None}
+
+@app.post("/api/models/rollback", dependencies=[Depends(require_admin)])
+def rollback_model(building: Optional[str] = None):
+    registry = simulator.buildings.models(require_building(building))
+    try:
+        loaded = registry.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"active": loaded.version, "pinned": registry.pinned}
+
 # Mount the entire `static/` directory at the web root,
 # with html=True so "/" serves index.html by default.
 app.mount(
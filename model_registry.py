@@ -0,0 +1,144 @@
+import re
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+import joblib
+
+from inference import FastPredictor
+
+MODEL_DIR = Path("xgboost_models")
+MODEL_PATTERN = "xgb_pipeline_*.joblib"
+_VERSION_RE = re.compile(r"xgb_pipeline_(\w+)\.joblib$")
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    version: str  # the YYYYMMDD part of xgb_pipeline_YYYYMMDD.joblib
+    path: Path
+    pipeline: Any
+    predictor: FastPredictor  # the pipeline folded into NumPy + booster.inplace_predict
+
+
+class ModelRegistry:
+    """
+    Keeps the trained pipeline resident in memory instead of joblib.load-ing it per request.
+    A background watcher polls the model directory and, when a newer xgb_pipeline_*.joblib
+    appears, loads it off the request path and swaps it in atomically. A version can be pinned
+    (which stops auto-upgrades) and the active model can be rolled back to the previous version.
+    """
+    def __init__(self, model_dir: Union[str, Path] = MODEL_DIR, poll_interval: float = 30.0):
+        self.model_dir = Path(model_dir)
+        self.poll_interval = poll_interval
+        self.pinned: Optional[str] = None
+        self._active: Optional[LoadedModel] = None
+        self._lock = threading.Lock()
+        # held from the load through publishing it: concurrent first requests wait for one load
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def available_versions(self) -> list[str]:
+        """Versions on disk, oldest first (YYYYMMDD sorts chronologically)."""
+        versions = []
+        for path in self.model_dir.glob(MODEL_PATTERN):
+            match = _VERSION_RE.search(path.name)
+            if match:
+                versions.append(match.group(1))
+        return sorted(versions)
+
+    def _path(self, version: str) -> Path:
+        return self.model_dir / f"xgb_pipeline_{version}.joblib"
+
+    def _load(self, version: str) -> LoadedModel:
+        """Deserialize a version; callers hold _load_lock."""
+        path = self._path(version)
+        if not path.exists():
+            raise FileNotFoundError(f"No XGBoost model version '{version}' in '{self.model_dir}/'")
+        pipeline = joblib.load(path)
+        return LoadedModel(version=version, path=path, pipeline=pipeline, predictor=FastPredictor(pipeline))
+
+    def _target(self) -> Optional[str]:
+        """The version that should be active: the pinned one, else the newest on disk."""
+        if self.pinned is not None:
+            return self.pinned
+        versions = self.available_versions()
+        return versions[-1] if versions else None
+
+    @property
+    def active(self) -> LoadedModel:
+        """The model serving predictions; loaded on first use if the watcher hasn't done so yet."""
+        model = self._active
+        if model is None:
+            self.refresh()
+            model = self._active
+            if model is None:
+                raise FileNotFoundError(f"No XGBoost model found in '{self.model_dir}/'")
+        return model
+
+    @property
+    def active_version(self) -> Optional[str]:
+        return self._active.version if self._active else None
+
+    def refresh(self) -> bool:
+        """Load the newest version (or the pinned one) if it isn't active yet. Returns True on swap."""
+        target = self._target()
+        if target is None or self.active_version == target:
+            return False
+        # requests keep using the current model while the new one deserializes; concurrent
+        # callers wait here and find it active instead of loading it again
+        with self._load_lock:
+            target = self._target()
+            if target is None or self.active_version == target:
+                return False
+            loaded = self._load(target)
+            with self._lock:
+                self._active = loaded
+        print(f"[INFO] Model {loaded.version} is now active")
+        return True
+
+    def pin(self, version: str) -> LoadedModel:
+        """Serve exactly this version until unpin() is called."""
+        with self._load_lock:
+            loaded = self._active
+            if loaded is None or loaded.version != version:
+                loaded = self._load(version)
+            with self._lock:
+                self.pinned = version
+                self._active = loaded
+        return loaded
+
+    def unpin(self) -> LoadedModel:
+        """Return to following the newest version on disk."""
+        with self._lock:
+            self.pinned = None
+        self.refresh()
+        return self.active
+
+    def rollback(self) -> LoadedModel:
+        """Pin the version just before the active one."""
+        current = self.active.version
+        older = [v for v in self.available_versions() if v < current]
+        if not older:
+            raise ValueError(f"No model version older than '{current}' to roll back to")
+        return self.pin(older[-1])
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[WARNING] Model refresh failed: {e!r}")
+
+    def start_watching(self) -> None:
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
@@ -0,0 +1,181 @@
+import os
+import time
+import asyncio
+import hashlib
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from caching import TTLCache
+from startup import LazyModule
+
+# imported on first use, so importing the pipeline (and the app) doesn't load pvlib/ifcopenshell
+simulator = LazyModule("simulator")
+
+# Async request path for simulations. Blocking stages (IFC/snapshot lookup, pvlib, XGBoost)
+# run on a bounded CPU pool and weather lookups on a separate I/O pool, each stage behind its
+# own concurrency limit, so a slow weather backend can't take threads away from CPU-bound work.
+# Concurrent requests for the same (building, room, 5-minute bucket, model version) share one computation.
+
+CPU_STAGES = ("resolve", "solar", "predict")
+IO_STAGES = ("weather",)
+# length of ifc_calculators.SOLAR_BUCKET; spelled out so this module stays free of pandas/pvlib
+BUCKET_SECONDS = 5 * 60
+
+
+def normalize_room_name(room_name: str) -> str:
+    return room_name.strip().lower()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight computation.
+    The computation runs as its own task, so a caller that disconnects doesn't cancel it
+    for the others; the key is released as soon as it finishes.
+    """
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._done, key))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+
+class SimulationPipeline:
+    def __init__(self, cpu_workers: Optional[int] = None, io_workers: int = 8,
+                 stage_limits: Optional[dict[str, int]] = None, response_cache_size: int = 2048):
+        cpu_workers = cpu_workers or os.cpu_count() or 4
+        self.pool_sizes = {"cpu": cpu_workers, "io": io_workers}
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        self.stage_limits = {stage: cpu_workers for stage in CPU_STAGES}
+        self.stage_limits.update({stage: max(1, io_workers // 2) for stage in IO_STAGES})
+        self.stage_limits.update(stage_limits or {})
+        self.single_flight = SingleFlight()
+        # finished responses; an entry is only valid until its 5-minute bucket ends
+        self.response_cache = TTLCache(maxsize=response_cache_size, ttl=BUCKET_SECONDS)
+        # asyncio primitives belong to one event loop; (re)created for whichever loop runs us
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.stage_limits.items()}
+        return self._semaphores[stage]
+
+    def _executor(self, pool: str) -> ThreadPoolExecutor:
+        executor = self._executors.get(pool)
+        if executor is None:
+            executor = self._executors[pool] = ThreadPoolExecutor(
+                max_workers=self.pool_sizes[pool], thread_name_prefix=f"sim-{pool}"
+            )
+        return executor
+
+    async def run_stage(self, stage: str, fn: Callable, *args) -> Any:
+        """Run a blocking function on the stage's pool, within the stage's concurrency limit."""
+        executor = self._executor("io" if stage in IO_STAGES else "cpu")
+        # copy the caller's context so context-local state follows the work into the thread
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        async with self._semaphore(stage):
+            return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    @staticmethod
+    def _resolve(room_name: str, building: Optional[str]) -> tuple:
+        """(building id, site, room, active model). Blocking: may load the building or the model."""
+        building = simulator.buildings.get(building).id
+        site, room = simulator.resolve_room(room_name, building)
+        return building, site, room, simulator.buildings.models(building).active
+
+    @staticmethod
+    def _load_model_version(building: Optional[str]) -> tuple[str, str]:
+        building = simulator.buildings.get(building).id
+        return building, simulator.buildings.models(building).active.version
+
+    async def model_version(self, building: Optional[str] = None) -> tuple[str, str]:
+        """
+        (building id, active model version). Answered on the event loop when the simulator and the
+        model are loaded already; otherwise the import/load runs on the resolve pool.
+        """
+        if simulator.loaded:
+            building_id = simulator.buildings.get(building).id
+            version = simulator.buildings.models(building_id).active_version
+            if version is not None:
+                return building_id, version
+        return await self.run_stage("resolve", self._load_model_version, building)
+
+    async def simulate_room(self, room_name: str, building: Optional[str] = None) -> dict:
+        """Async simulator.simulate_room with single-flight coalescing of identical requests."""
+        building, site, room, model = await self.run_stage("resolve", self._resolve, room_name, building)
+        timestamp = simulator.site_timestamp(site)
+        key = (building, room.global_id, int(timestamp.timestamp()) // BUCKET_SECONDS, model.version)
+
+        async def compute() -> dict:
+            # weather I/O and the solar pass are independent, so they overlap
+            external_temp, solar_inflow = await asyncio.gather(
+                self.run_stage("weather", simulator.require_external_temp, site, timestamp),
+                self.run_stage("solar", simulator.rooms_solar_inflow, site, [room], timestamp),
+            )
+            return await self.run_stage("predict", simulator.predict_room, room, external_temp, solar_inflow, model)
+
+        # callers get their own copy of the shared result
+        return dict(await self.single_flight.do(key, compute))
+
+    async def response_key(self, room_name: str, building: Optional[str] = None) -> tuple[tuple, str, int]:
+        """
+        (cache key, ETag, seconds until the current bucket ends) for a room's prediction.
+        A prediction only changes with the weather hour, the 5-minute solar bucket or the model
+        version, so the key (and the ETag derived from it) is known without computing anything.
+        """
+        building, version = await self.model_version(building)
+        now = time.time()
+        bucket = int(now) // BUCKET_SECONDS
+        key = (building, normalize_room_name(room_name), bucket, version)
+        etag = '"' + hashlib.sha1(repr(key).encode()).hexdigest()[:24] + '"'
+        max_age = max(1, BUCKET_SECONDS - int(now - bucket * BUCKET_SECONDS))
+        return key, etag, max_age
+
+    async def cached_simulate_room(self, room_name: str, building: Optional[str] = None) -> tuple[dict, str, int]:
+        """simulate_room behind the response cache. Returns (result, ETag, max-age in seconds)."""
+        key, etag, max_age = await self.response_key(room_name, building)
+        result = self.response_cache.get(key)
+        if result is None:
+            result = await self.simulate_room(room_name, building)
+            self.response_cache.set(key, result, ttl=max_age)
+        return dict(result), etag, max_age
+
+    def stats(self) -> dict:
+        return {
+            "pool_sizes": dict(self.pool_sizes),
+            "stage_limits": dict(self.stage_limits),
+            "in_flight": len(self.single_flight),
+            "calls": self.single_flight.calls,
+            "shared": self.single_flight.shared,
+            "response_cache": self.response_cache.stats(),
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pools; they are started again on the next request."""
+        executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,114 @@
+import bisect
+import difflib
+import hashlib
+import json
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    # type only: main imports this module at startup, before ifcopenshell is loaded
+    from ifc_parsers import Site
+
+# Room catalogue: every room's short name, long name and Global ID, indexed once per building.
+# Exact lookups (by any of the three, names case-insensitive) are dict hits, prefix search is a
+# bisect over one sorted key list, and unknown names get close matches from difflib. Serves
+# /api/rooms and name resolution in the simulator.
+
+# rooms per page when the client doesn't ask for a size, and the most it may ask for
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+
+
+class RoomCatalogue:
+    def __init__(self, site: "Site"):
+        rooms = list(site.rooms.values())
+        # listing order: long name, then short name
+        order = sorted(range(len(rooms)), key=lambda i: (rooms[i].long_name.lower(), rooms[i].short_name.lower()))
+        self.rooms = [rooms[i] for i in order]
+        self.entries: list[dict[str, str]] = [
+            {"short_name": r.short_name, "long_name": r.long_name, "global_id": r.global_id} for r in self.rooms
+        ]
+
+        # exact lookups, same precedence as Site.get_room (long name, then short name), then Global ID
+        self._by_long: dict[str, int] = {}
+        self._by_short: dict[str, int] = {}
+        self._by_gid: dict[str, int] = {}
+        # filled in building order, so duplicate names resolve to the same room as before
+        for i in sorted(range(len(order)), key=order.__getitem__):
+            entry = self.entries[i]
+            self._by_long.setdefault(entry["long_name"].strip().lower(), i)
+            self._by_short.setdefault(entry["short_name"].strip().lower(), i)
+            self._by_gid.setdefault(entry["global_id"], i)
+
+        # prefix search: (lower-cased key, entry) for every name and Global ID, sorted
+        keys = sorted({(k, i) for i, e in enumerate(self.entries) for k in
+                       (e["long_name"].strip().lower(), e["short_name"].strip().lower(), e["global_id"].lower())})
+        self._keys = [k for k, _ in keys]
+        self._key_entries = [i for _, i in keys]
+
+        # names offered as suggestions, lower-cased -> display name
+        self._names: dict[str, str] = {}
+        for entry in self.entries:
+            for name in (entry["long_name"], entry["short_name"]):
+                if name.strip():
+                    self._names.setdefault(name.strip().lower(), name)
+
+        # changes whenever any room is added, removed or renamed
+        self.etag = '"' + hashlib.sha1(json.dumps(self.entries).encode()).hexdigest()[:24] + '"'
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def find_index(self, name: str) -> Optional[int]:
+        target = name.strip()
+        index = self._by_long.get(target.lower())
+        if index is None:
+            index = self._by_short.get(target.lower())
+        if index is None:
+            index = self._by_gid.get(target)
+        return index
+
+    def find(self, name: str) -> Optional[Any]:
+        """The room with this long name, short name (case-insensitive) or Global ID; None if unknown."""
+        index = self.find_index(name)
+        return self.rooms[index] if index is not None else None
+
+    def search(self, prefix: str = "", offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+        """
+        One page of the rooms whose long name, short name or Global ID starts with prefix
+        (case-insensitive), in catalogue order. An empty prefix lists every room.
+        """
+        prefix = prefix.strip().lower()
+        if prefix:
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, prefix + "\U0010ffff")
+            matches = sorted(set(self._key_entries[lo:hi]))
+        else:
+            matches = range(len(self.entries))
+        return {
+            "total": len(matches),
+            "offset": offset,
+            "limit": limit,
+            "rooms": [self.entries[i] for i in matches[offset:offset + limit]],
+        }
+
+    def suggest(self, name: str, n: int = 5) -> list[str]:
+        """Up to n room names closest to an unknown name."""
+        matches = difflib.get_close_matches(name.strip().lower(), list(self._names), n=n, cutoff=0.6)
+        return [self._names[m] for m in matches]
+
+
+# one catalogue per loaded Site; dropped together with the Site when the building is reloaded
+_catalogues: "weakref.WeakKeyDictionary[Site, RoomCatalogue]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_catalogue(site: "Site") -> RoomCatalogue:
+    catalogue = _catalogues.get(site)
+    if catalogue is None:
+        with _lock:
+            catalogue = _catalogues.get(site)
+            if catalogue is None:
+                catalogue = _catalogues[site] = RoomCatalogue(site)
+    return catalogue
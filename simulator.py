@@ -1,84 +1,320 @@
-import os
-import ifcopenshell
-from pathlib import Path
-from typing import Union, Optional
-from typing import Any
+import json
+from typing import Iterator, Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import pytz
-from meteostat import Point, Hourly
-
-#  for xgboost
-import joblib
-from pathlib import Path
 
 # Import mediator functions
-from ifc_parsers import parse_room, BoundingBox, Window, Room, Site
-from ifc_calculators import window_solar_inflow
+from ifc_parsers import Room, Site
+from ifc_calculators import solar_inflow_matrix, gain_solar_inflow, solar_cache, solar_bucket
+from caching import TTLCache
+from building_snapshot import building_cache
+from buildings import BuildingRegistry, UnknownBuildingError
+from room_catalogue import get_catalogue
+from weather import get_weather_store, utc_hour
+from model_registry import LoadedModel
+from inference import FEATURES
+from instrumentation import stage, timed
+
+# configured buildings (buildings.json, else just BK): IFC file, model directory and timezone per id.
+# Each building's trained pipeline is kept in memory; newer xgb_pipeline_*.joblib files in its
+# model directory are picked up in the background
+buildings = BuildingRegistry.from_env()
 
-IFC_PATH = os.path.join("static", "IFC", "BK_v2_vb_updated.ifc")
+# whole-building predictions as NDJSON chunks, keyed by (building, 5-minute solar bucket, model version)
+building_map_cache = TTLCache(maxsize=16, ttl=15 * 60)
 
+@timed("weather")
 def get_current_external_temp(site: Site, timestamp: pd.Timestamp) -> Optional[float]:
-    loc = Point(site.latitude, site.longitude, site.elevation)
-    rounded_time = timestamp.floor('h')
-    if rounded_time.tzinfo:
-        rounded_time = rounded_time.tz_convert('UTC').tz_localize(None)
-    df_weather = Hourly(loc, rounded_time, rounded_time).fetch()
-    if not df_weather.empty:
-        return float(df_weather['temp'].iloc[0])
-    print(f"[WARNING] No external temperature data found for {rounded_time}")
-    return None
-
-def get_latest_model(path: str = "xgboost_models") -> Optional[Any]:
-    models = sorted(Path(path).glob("xgb_pipeline_*.joblib"), reverse=True)
-    if not models:
-        raise FileNotFoundError("No XGBoost model found in 'xgboost_models/'")
-    return joblib.load(models[0])
-
-def predict_internal_temp(room_name: str, ifc_path: Union[str, Path] = IFC_PATH) -> float:
-    """
-    Mediator function: given a room_name, extracts site and room details from corrected BK IFC
-    """
+    # served from the local weather store; only hours it doesn't hold yet are fetched remotely
+    temp = get_weather_store().get_temp(site, timestamp)
+    if temp is None:
+        print(f"[WARNING] No external temperature data found for {utc_hour(timestamp)}")
+    return temp
 
-    # Parse SELECTED ROOM into a Site object that has locational data
-    site: Site = parse_room(ifc_path, room_name)
-    # parse_room invokes extract_site_details internally to add locational data
+class RoomNotFoundError(ValueError):
+    """Raised when a room name matches no long name, short name or Global ID in the building."""
+    def __init__(self, message: str, suggestions: Optional[list[str]] = None):
+        super().__init__(message)
+        self.suggestions = suggestions or []
 
-    # Attempt to find the room by its long_name key
-    room: Optional[Room] = site.rooms.get(room_name)
-    # If eaxct match not found - try case-insensitive match
-    if room is None:
-        for key, r in site.rooms.items():
-            if key.lower() == room_name.strip().lower():
-                room = r
-                break
+class SeriesRequestError(ValueError):
+    """Raised for a series range or frequency that can't be served: invalid, not positive or too many points."""
+
+def site_timestamp(site: Site, timestamp: Optional[datetime] = None) -> pd.Timestamp:
+    """The given time in the site's timezone (naive times are taken as site-local); now if omitted."""
+    if timestamp is None:
+        return pd.Timestamp(datetime.now(pytz.timezone(site.timezone)))
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_convert(site.timezone) if timestamp.tzinfo else timestamp.tz_localize(site.timezone)
+
+@timed("solar")
+def rooms_solar_inflow(site: Site, rooms: list[Room], timestamp: pd.Timestamp) -> np.ndarray:
+    """Total solar inflow per room: every window of every room goes through one solar_inflow_matrix call."""
+    totals = np.zeros(len(rooms))
+    if site.tables is not None:
+        # columnar building: window gains are gathered straight from the tables, no per-window objects
+        rows, owner = site.tables.windows_of([room.index for room in rooms])
+        if len(rows):
+            times = pd.DatetimeIndex([timestamp])
+            per_window = gain_solar_inflow(site, site.tables.window_gain(rows), times, cache=solar_cache)[0]
+            totals = np.bincount(owner, weights=per_window, minlength=len(rooms))
+        return totals
+    windows = [w for room in rooms for w in (room.windows or [])]
+    if windows:
+        per_window = solar_inflow_matrix(site, windows, pd.DatetimeIndex([timestamp]), cache=solar_cache)[0]
+        owner = np.repeat(np.arange(len(rooms)), [len(room.windows or []) for room in rooms])
+        totals = np.bincount(owner, weights=per_window, minlength=len(rooms))
+    return totals
+
+def build_features(rooms: list[Room], external_temp: float, solar_inflow: np.ndarray) -> np.ndarray:
+    """(rooms × FEATURES) float64 matrix for the model's FastPredictor."""
+    features = np.empty((len(rooms), len(FEATURES)))
+    features[:, 0] = external_temp
+    features[:, 1] = [room.volume for room in rooms]
+    features[:, 2] = solar_inflow
+    return features
+
+def find_room(site: Site, room_name: str) -> Room:
+    """Room by long or short name (case-insensitive) or Global ID, via the building's catalogue."""
+    catalogue = get_catalogue(site)
+    room: Optional[Room] = catalogue.find(room_name)
     if room is None:
-        raise ValueError(f"No room named '{room_name}' found in IFC rooms")
-
-    # Serialize windows for output along with solar_inflow for each
-    now = datetime.now(pytz.timezone(site.timezone))
-    timestamp = pd.Timestamp(now)
-    windows_out = []
-    total_solar_inflow = 0.0
-    if room.windows:
-        for w in room.windows:
-            # compute solar inflow for this window
-            inflow = window_solar_inflow(w, site, timestamp)
-            total_solar_inflow += inflow
-    # Get external temperature
+        suggestions = catalogue.suggest(room_name)
+        hint = f"; did you mean {', '.join(repr(s) for s in suggestions)}?" if suggestions else ""
+        raise RoomNotFoundError(f"No room named '{room_name}' found in IFC rooms{hint}", suggestions)
+    return room
+
+@timed("resolve")
+def resolve_room(room_name: str, building: Optional[str] = None) -> tuple[Site, Room]:
+    # Whole building is parsed once and kept as a snapshot, and its catalogue indexes every
+    # name and Global ID, so this is a dict lookup
+    site: Site = buildings.site(building)
+    return site, find_room(site, room_name)
+
+def require_external_temp(site: Site, timestamp: pd.Timestamp) -> float:
     external_temp = get_current_external_temp(site, timestamp)
     if external_temp is None:
         raise ValueError("Failed to retrieve external temperature")
-    
-    # Load latest model
-    model = get_latest_model()
+    return external_temp
 
+@timed("predict")
+def predict_room(room: Room, external_temp: float, solar_inflow: np.ndarray, model: LoadedModel) -> dict:
     # Construct input for prediction
-    input_df = pd.DataFrame([{
-        "external_temp": external_temp,
-        "volume": room.volume,
-        "solar_inflow": total_solar_inflow
-    }])
-    # Run prediction
-    predicted_temp = model.predict(input_df)[0]
-    return float(predicted_temp)
\ No newline at end of file
+    features = build_features([room], external_temp, solar_inflow)
+    # Run prediction (scaler folded into NumPy, booster called directly)
+    predicted_temp = model.predictor.predict(features)[0]
+    return {"predicted_temp": float(predicted_temp), "model_version": model.version}
+
+def simulate_room(room_name: str, building: Optional[str] = None) -> dict:
+    """
+    Mediator function: given a room_name, extracts site and room details from the building's IFC
+    (the default building if none is given) and returns the predicted temperature together with
+    the model version that produced it
+    """
+    site, room = resolve_room(room_name, building)
+    timestamp = site_timestamp(site)
+    # solar inflow for all windows at once; sun/clearsky shared across rooms per 5-minute bucket
+    total_solar_inflow = rooms_solar_inflow(site, [room], timestamp)
+    # Get external temperature
+    external_temp = require_external_temp(site, timestamp)
+    # Resident model: loaded once and hot-swapped by the registry's watcher
+    return predict_room(room, external_temp, total_solar_inflow, buildings.models(building).active)
+
+def predict_internal_temp(room_name: str, building: Optional[str] = None) -> float:
+    return simulate_room(room_name, building)["predicted_temp"]
+
+def simulate_rooms(room_names: list[str], timestamp: Optional[datetime] = None,
+                   building: Optional[str] = None) -> list[dict]:
+    """
+    Batch version of simulate_room: weather and solar geometry are resolved once, the feature
+    matrix for all rooms is assembled at once and the model is called a single time.
+    Returns one entry per requested name, in order; unknown rooms get an "error" entry
+    instead of failing the whole batch.
+    """
+    with stage("resolve"):
+        site: Site = buildings.site(building)
+        ts = site_timestamp(site, timestamp)
+
+        results: list[dict] = [{"room": name} for name in room_names]
+        catalogue = get_catalogue(site)
+        found: list[tuple[int, Room]] = []
+        for i, name in enumerate(room_names):
+            room = catalogue.find(name)
+            if room is None:
+                results[i]["error"] = f"No room named '{name}' found in IFC rooms"
+            else:
+                found.append((i, room))
+    if not found:
+        return results
+
+    external_temp = get_current_external_temp(site, ts)
+    if external_temp is None:
+        for i, _ in found:
+            results[i]["error"] = "Failed to retrieve external temperature"
+        return results
+
+    rooms = [room for _, room in found]
+    model = buildings.models(building).active
+    features = build_features(rooms, external_temp, rooms_solar_inflow(site, rooms, ts))
+    with stage("predict"):
+        predicted = model.predictor.predict(features)
+    for (i, room), temp in zip(found, predicted):
+        results[i].update({
+            "global_id": room.global_id,
+            "predicted_temp": float(temp),
+            "model_version": model.version,
+        })
+    return results
+
+def building_temperature_stream(building: Optional[str] = None, chunk_size: int = 128) -> tuple[dict, Iterator[str]]:
+    """
+    Predictions for every room of the building as NDJSON lines keyed by Global ID.
+    Weather, solar inflow and the feature matrix are computed for all rooms in one pass up front
+    (so errors surface before anything is streamed); the model then runs chunk by chunk and each
+    chunk is yielded as soon as it is ready. Finished streams are cached per 5-minute solar bucket
+    and model version, so repeat viewers in the same bucket are served from memory.
+    Returns (metadata, iterator of NDJSON chunks).
+    """
+    building_id = buildings.get(building).id
+    site: Site = buildings.site(building_id)
+    ts = site_timestamp(site)
+    model = buildings.models(building_id).active
+    bucket = solar_bucket(pd.DatetimeIndex([ts]))[0]
+    meta = {"timestamp": bucket.isoformat(), "model_version": model.version, "rooms": len(site.rooms),
+            "building": building_id}
+    key = (building_id, bucket.value, model.version)
+
+    cached = building_map_cache.get(key)
+    if cached is not None:
+        return meta, iter(cached)
+
+    external_temp = get_current_external_temp(site, ts)
+    if external_temp is None:
+        raise ValueError("Failed to retrieve external temperature")
+    rooms = list(site.rooms.values())
+    features = build_features(rooms, external_temp, rooms_solar_inflow(site, rooms, ts))
+
+    def chunks() -> Iterator[str]:
+        done = []
+        for start in range(0, len(rooms), chunk_size):
+            with stage("predict"):
+                predicted = model.predictor.predict(features[start:start + chunk_size])
+            chunk = "".join(
+                json.dumps({
+                    "global_id": room.global_id,
+                    "short_name": room.short_name,
+                    "long_name": room.long_name,
+                    "predicted_temp": float(temp),
+                }) + "\n"
+                for room, temp in zip(rooms[start:start + chunk_size], predicted)
+            )
+            done.append(chunk)
+            yield chunk
+        # only complete streams are cached
+        building_map_cache.set(key, done)
+
+    return meta, chunks()
+
+# upper bound on points per series request (a year at 5-minute resolution)
+MAX_SERIES_POINTS = 366 * 24 * 12
+
+def series_offset(start: pd.Timestamp, end: pd.Timestamp, freq: str) -> pd.DateOffset:
+    """
+    freq parsed into a positive offset, checked to give at most MAX_SERIES_POINTS points from
+    start to end, before any index is built. Raises SeriesRequestError otherwise.
+    """
+    try:
+        offset = pd.tseries.frequencies.to_offset(freq)
+    except ValueError:
+        raise SeriesRequestError(f"Invalid frequency '{freq}'")
+    if offset.n <= 0:
+        raise SeriesRequestError(f"Frequency must be positive, got '{freq}'")
+    if isinstance(offset, pd.offsets.Tick):
+        points = (end - start) // pd.Timedelta(offset) + 1
+        if points > MAX_SERIES_POINTS:
+            raise SeriesRequestError(f"Series would have {points} points, the maximum is {MAX_SERIES_POINTS}")
+        return offset
+    # calendar offsets (months, weeks, business days) have no fixed length: too many points if the
+    # point just past the limit still falls before end. Business hours, the only sub-daily ones,
+    # are slow to step through and not useful here
+    if isinstance(offset, (pd.offsets.BusinessHour, pd.offsets.CustomBusinessHour)):
+        raise SeriesRequestError(f"Business-hour frequencies are not supported, got '{freq}'")
+    # the others step at least a day, so only very long ranges can go over
+    if end - start < pd.Timedelta(days=MAX_SERIES_POINTS - 1):
+        return offset
+    try:
+        # the point just past the limit, stepped on the wall clock like series_index
+        first = offset.rollforward(start.tz_localize(None))
+        too_many = first + MAX_SERIES_POINTS * offset <= end.tz_localize(None)
+    except (OverflowError, pd.errors.OutOfBoundsDatetime, pd.errors.OutOfBoundsTimedelta):
+        # the limit lies past the last representable timestamp, so far beyond end
+        too_many = False
+    if too_many:
+        raise SeriesRequestError(f"Series would have more than {MAX_SERIES_POINTS} points")
+    return offset
+
+def series_index(start: pd.Timestamp, end: pd.Timestamp, freq: str) -> pd.DatetimeIndex:
+    """
+    Timestamps from start to end every freq (checked by series_offset). Calendar offsets step on
+    the local wall clock, so a day stays a day across DST changes; local times skipped by a
+    change are moved forward and repeated ones take their first (summer time) occurrence.
+    """
+    offset = series_offset(start, end, freq)
+    # Day is a Tick, but pandas steps it on the wall clock too
+    if (isinstance(offset, pd.offsets.Tick) and not isinstance(offset, pd.offsets.Day)) or start.tzinfo is None:
+        return pd.date_range(start, end, freq=offset)
+    wall = pd.date_range(start.tz_localize(None), end.tz_localize(None), freq=offset)
+    return wall.tz_localize(start.tz, ambiguous=np.ones(len(wall), dtype=bool), nonexistent="shift_forward")
+
+def simulate_series(room_name: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    freq: str = "1h", building: Optional[str] = None) -> dict:
+    """
+    Predicted temperature curve for one room from start to end (inclusive) every freq.
+    Defaults to the next 24 hours. The feature frame is built for all timestamps at once:
+    one vectorized solar inflow pass over the DatetimeIndex, one weather range lookup and a
+    single model call. Timestamps without weather data get a null prediction.
+    """
+    site, room = resolve_room(room_name, building)
+
+    start_ts = site_timestamp(site, start) if start is not None else site_timestamp(site).floor("h")
+    end_ts = site_timestamp(site, end) if end is not None else start_ts + pd.Timedelta(days=1)
+    if end_ts < start_ts:
+        raise SeriesRequestError("end must not be before start")
+    times = series_index(start_ts, end_ts, freq)
+
+    # solar inflow of every window at every timestamp, summed per timestamp
+    solar_inflow = np.zeros(len(times))
+    if room.windows and len(times):
+        with stage("solar"):
+            solar_inflow = solar_inflow_matrix(site, room.windows, times).sum(axis=1)
+
+    # one range lookup, then each timestamp takes the temperature of its UTC hour
+    external_temp = np.full(len(times), np.nan)
+    if len(times):
+        with stage("weather"):
+            weather = get_weather_store().get_range(site, times[0], times[-1])
+        hours = times.tz_convert("UTC").floor("h").tz_localize(None)
+        external_temp = weather.reindex(hours).to_numpy(dtype=float)
+
+    model = buildings.models(building).active
+    predicted = np.full(len(times), np.nan)
+    valid = ~np.isnan(external_temp)
+    if valid.any():
+        features = np.column_stack([
+            external_temp[valid],
+            np.full(int(valid.sum()), room.volume, dtype=float),
+            solar_inflow[valid],
+        ])
+        with stage("predict"):
+            predicted[valid] = model.predictor.predict(features)
+
+    return {
+        "room": room.long_name,
+        "global_id": room.global_id,
+        "model_version": model.version,
+        "freq": freq,
+        "timestamps": [t.isoformat() for t in times],
+        "predicted_temp": [None if np.isnan(v) else float(v) for v in predicted],
+    }
@@ -0,0 +1,146 @@
+import time
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Callable, Optional
+
+from instrumentation import stage
+
+# Cold start. The app module only imports FastAPI, so uvicorn serves static files and /healthz
+# right away; the simulation stack (pvlib, pandas, xgboost; ifcopenshell only if a building has no
+# snapshot yet) is imported, and the building, model and solar cache are loaded, by a background
+# warmup thread. /readyz reports when that is done, so an orchestrator only routes traffic to
+# warm workers.
+
+
+# Heavy imports happen under this lock, one thread at a time: some packages (xgboost) break
+# when two threads import them concurrently, e.g. the warmup and an early request.
+IMPORT_LOCK = threading.RLock()
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access, e.g.
+    `simulator = LazyModule("simulator")`. The first access waits for IMPORT_LOCK, so a request
+    arriving during warmup waits for the warmup's imports instead of racing them.
+    """
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._module
+        if module is None:
+            with IMPORT_LOCK:
+                module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+
+STEPS = ("imports", "building", "model", "solar", "weather")
+# the simulation path is warm once these succeeded; solar and weather only pre-fill caches
+REQUIRED_STEPS = ("imports", "building", "model")
+
+
+class Readiness:
+    """Progress of the warmup steps, as reported by /readyz."""
+    def __init__(self):
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.steps: dict[str, dict] = {name: {"status": "pending"} for name in STEPS}
+        self._lock = threading.Lock()
+
+    def run(self, name: str, fn: Callable[[], Any]) -> bool:
+        with self._lock:
+            self.steps[name] = {"status": "running"}
+        start = time.perf_counter()
+        try:
+            with stage(f"warmup_{name}"):
+                fn()
+        except Exception as e:
+            print(f"[WARNING] Warmup step '{name}' failed: {e!r}")
+            result = {"status": "failed", "error": str(e)}
+        else:
+            result = {"status": "ok"}
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        with self._lock:
+            self.steps[name] = result
+        return result["status"] == "ok"
+
+    def skip(self, name: str, reason: str) -> None:
+        with self._lock:
+            self.steps[name] = {"status": "skipped", "error": reason}
+
+    @property
+    def ready(self) -> bool:
+        return self.finished is not None and all(self.steps[name]["status"] == "ok" for name in REQUIRED_STEPS)
+
+    def report(self) -> dict:
+        with self._lock:
+            steps = {name: dict(step) for name, step in self.steps.items()}
+        return {
+            "ready": self.ready,
+            "warming_up": self.finished is None,
+            "seconds_since_start": round(time.time() - self.started, 3),
+            "steps": steps,
+        }
+
+
+def warm_up(readiness: Readiness) -> None:
+    """
+    Import the simulation stack, then load the building snapshot and the model and fill the solar
+    and weather caches for the current 5-minute bucket. Blocking; run it on a background thread.
+    """
+    modules: dict[str, ModuleType] = {}
+
+    def imports() -> None:
+        with IMPORT_LOCK:
+            modules["simulator"] = importlib.import_module("simulator")
+            # joblib.load of the pipeline would otherwise import these on the first model load
+            importlib.import_module("xgboost")
+            importlib.import_module("sklearn.pipeline")
+
+    try:
+        if not readiness.run("imports", imports):
+            for name in STEPS[1:]:
+                readiness.skip(name, "imports failed")
+            return
+        simulator = modules["simulator"]
+
+        # only the default building is warmed; the others load on their first request
+        def model() -> None:
+            registry = simulator.buildings.models()
+            registry.refresh()
+            registry.active
+            simulator.buildings.start_watching()
+
+        def building() -> None:
+            # the room catalogue indexes every name once, ahead of the first lookup
+            simulator.get_catalogue(simulator.buildings.site())
+
+        building_ok = readiness.run("building", building)
+        readiness.run("model", model)
+        if not building_ok:
+            readiness.skip("solar", "building not loaded")
+            readiness.skip("weather", "building not loaded")
+            return
+
+        site = simulator.buildings.site()
+        timestamp = simulator.site_timestamp(site)
+        # sun position/irradiance for this bucket, shared by every room's first request
+        readiness.run("solar", lambda: simulator.rooms_solar_inflow(site, list(site.rooms.values()), timestamp))
+        # pulls the whole UTC day into the weather store
+        readiness.run("weather", lambda: simulator.require_external_temp(site, timestamp))
+    finally:
+        readiness.finished = time.time()
+        status = "ready" if readiness.ready else "NOT ready"
+        print(f"[INFO] Warmup finished in {readiness.finished - readiness.started:.1f} s, {status}")
+
+
+def start_warmup(readiness: Readiness) -> threading.Thread:
+    thread = threading.Thread(target=warm_up, args=(readiness,), name="warmup", daemon=True)
+    thread.start()
+    return thread
@@ -17,21 +17,34 @@ async function startViewer() {
   viewer.zoomTo(bkTileset);
 }
 
-// 3. Load rooms into the dropdown
+// Which building to show: the page's ?building=<id>, else the server's default building
+const building      = new URLSearchParams(window.location.search).get('building');
+const buildingQuery = building ? `&building=${encodeURIComponent(building)}` : '';
+
+// 3. Load rooms into the dropdown from the server's room catalogue (paged, gzipped, cacheable)
 async function loadRooms() {
-  const response = await fetch('./bk_rooms.csv');
-  const text     = await response.text();
-  const rows     = text.split('\n').slice(1); // skip header
-  const select   = document.getElementById('roomSelect');
+  const select = document.getElementById('roomSelect');
+  const limit  = 1000;
+  let offset   = 0;
+  let total    = Infinity;
 
-  for (let row of rows) {
-    if (!row.trim()) continue;
-    const [shortName, longName, globalId] = row.split(',');
-    const option = document.createElement('option');
-    option.value       = longName.trim();     // what we send to the API
-    option.dataset.gid = globalId.trim();     // for local lookup if desired
-    option.textContent = `${shortName.trim()} - ${longName.trim()}`;
-    select.appendChild(option);
+  while (offset < total) {
+    const response = await fetch(`/api/rooms?offset=${offset}&limit=${limit}${buildingQuery}`);
+    if (!response.ok) {
+      console.error('Error loading rooms:', response.status);
+      return;
+    }
+    const page = await response.json();
+    total = page.total;
+    for (const { short_name, long_name, global_id } of page.rooms) {
+      const option = document.createElement('option');
+      option.value       = long_name;     // what we send to the API
+      option.dataset.gid = global_id;     // for local lookup if desired
+      option.textContent = `${short_name} - ${long_name}`;
+      select.appendChild(option);
+    }
+    offset += page.rooms.length;
+    if (!page.rooms.length) break;
   }
 }
 
@@ -44,8 +57,12 @@ const displayEl   = document.getElementById('selectedRoom');
 // grab the <span> where we'll show the predicted temperature
 const predictedEl = document.getElementById('predictedTemp');
 
-// 5. Handle user selection
-selectEl.addEventListener('change', async (evt) => {
+// 5. Handle user selection: subscribe to live predictions for the picked room.
+// The server pushes a new value every 5-minute solar bucket and whenever the model changes,
+// so the page stays current without polling; EventSource reconnects on its own after drops.
+let liveSource = null;
+
+selectEl.addEventListener('change', (evt) => {
   console.log('🔔 change event fired!', evt.target.value);
   const roomName = evt.target.value;
   if (!roomName) { return; }
@@ -57,19 +74,34 @@ selectEl.addEventListener('change', async (evt) => {
   // B) now that we know there's a valid room, show it
   spinner.style.display = 'flex';
 
-  try {
-    // C) calling FastAPI
-    const resp = await fetch(`/api/simulate/${encodeURIComponent(roomName)}`);
-    if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
-    const { predicted_temp } = await resp.json();
-    // D) Show predicted temperature
-    predictedEl.textContent = predicted_temp.toFixed(1);
-    console.log('Predicted temp from server:', predicted_temp);
-  } catch (err) {
-    console.error('Error fetching prediction:', err);
-    predictedEl.textContent = 'Error';
-  } finally {
-    // E) always hide the spinner at the end
+  // C) one live subscription at a time: drop the previous room's stream
+  if (liveSource) { liveSource.close(); }
+  const source = new EventSource(`/api/live?rooms=${encodeURIComponent(roomName)}${buildingQuery}`);
+  liveSource = source;
+  let received = false;
+
+  source.addEventListener('prediction', (msg) => {
+    const { predicted_temp, error, model_version, timestamp } = JSON.parse(msg.data);
+    received = true;
+    // D) Show predicted temperature; E) the spinner only covers the wait for the first value
     spinner.style.display = 'none';
-  }
-});
\ No newline at end of file
+    if (error) {
+      console.error('Error from live prediction:', error);
+      predictedEl.textContent = 'Error';
+      return;
+    }
+    predictedEl.textContent = predicted_temp.toFixed(1);
+    console.log('Predicted temp from server:', predicted_temp, model_version, timestamp);
+  });
+
+  source.onerror = () => {
+    // the browser retries by itself; only report an error if nothing ever arrived
+    if (!received) {
+      console.error('Error fetching prediction for', roomName);
+      predictedEl.textContent = 'Error';
+      spinner.style.display = 'none';
+    }
+    // e.g. 404 for an unknown room: the stream never opened, stop retrying
+    if (source.readyState === EventSource.CLOSED && liveSource === source) { liveSource = null; }
+  };
+});
@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+import resource
+import itertools
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional, Union
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import xgboost as xgb
+import joblib
+from xgboost import XGBRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from inference import FEATURES
+from training_store import TrainingStore
+from instrumentation import collect_timings, print_stage_timings, stage
+
+# Out-of-core training over every dataset accumulated so far (output/*.csv and the training
+# store's feature parts). Sources are streamed in chunks, deduplicated by (room, timestamp), and
+# fed to XGBoost through a DataIter, so only the quantized QuantileDMatrix is ever held in memory
+# (or not even that, with a cache_dir: ExtMemQuantileDMatrix pages it to disk). The newest part
+# of the time range is held out for early stopping, and a hyperparameter sweep trains several
+# boosters at once on the same matrices. The result is saved as the usual scaler + XGBRegressor
+# Pipeline, so the model registry and FastPredictor load it like any other.
+
+TARGET = "internal_temp"
+COLUMNS = ["timestamp", "room_name", *FEATURES, TARGET]
+OUTPUT_DIR = Path("output")
+MODEL_DIR = "xgboost_models"
+DEFAULT_CHUNK_ROWS = 100_000
+
+BASE_PARAMS = {"objective": "reg:squarederror", "tree_method": "hist", "max_depth": 3, "learning_rate": 0.1, "seed": 42}
+SWEEP_GRID = {"max_depth": [3, 5, 7], "learning_rate": [0.05, 0.1, 0.2], "min_child_weight": [1, 5]}
+
+
+def training_sources(output_dir: Union[str, Path] = OUTPUT_DIR, store: Optional[TrainingStore] = None) -> list[Path]:
+    """
+    Every training dataset on disk, in the order duplicates are resolved (first wins): the
+    training store's feature parts, then the dated output CSVs, newest first.
+    """
+    sources = list(store.parts("features")) if store is not None else []
+    sources += sorted(Path(output_dir).glob("combined_training_data_*.csv"), reverse=True)
+    return sources
+
+
+def read_chunks(path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    One source in chunks of at most chunk_rows, timestamps as int64 UTC nanoseconds.
+    Rows missing a feature or the target are dropped.
+    """
+    if path.suffix == ".parquet":
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=COLUMNS))
+    else:
+        chunks = pd.read_csv(path, usecols=COLUMNS, chunksize=chunk_rows)
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=[*FEATURES, TARGET])
+        chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], utc=True).astype("int64")
+        yield chunk.reset_index(drop=True)
+
+
+class TrainingChunks:
+    """
+    All sources as one stream of chunks, deduplicated by (room, timestamp) across sources.
+    Iterable any number of times; each pass rereads the sources. Only the timestamps seen so
+    far are kept, as one sorted array per room.
+    """
+    def __init__(self, sources: list[Path], chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.sources = sources
+        self.chunk_rows = chunk_rows
+        # counts from the last complete pass
+        self.rows = 0
+        self.duplicates = 0
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        seen: dict[str, np.ndarray] = {}
+        rows = duplicates = 0
+        for path in self.sources:
+            for chunk in read_chunks(path, self.chunk_rows):
+                keep = ~chunk.duplicated(["room_name", "timestamp"]).to_numpy()
+                timestamps = chunk["timestamp"].to_numpy()
+                for room, index in chunk.groupby("room_name").indices.items():
+                    prior = seen.get(room)
+                    if prior is not None:
+                        keep[index] &= ~np.isin(timestamps[index], prior)
+                    new = timestamps[index][keep[index]]
+                    seen[room] = np.union1d(prior, new) if prior is not None else np.unique(new)
+                kept = int(keep.sum())
+                rows += kept
+                duplicates += len(keep) - kept
+                if kept:
+                    yield chunk[keep]
+        self.rows, self.duplicates = rows, duplicates
+
+
+class ChunkIter(xgb.DataIter):
+    """Feeds the scaled features and target of the selected rows of every chunk to XGBoost."""
+    def __init__(self, chunks: TrainingChunks, select: Callable[[np.ndarray], np.ndarray],
+                 scaler: StandardScaler, cache_prefix: Optional[str] = None):
+        super().__init__(cache_prefix=cache_prefix)
+        self.chunks = chunks
+        self.select = select
+        self.scaler = scaler
+        self.rows = 0
+        self._chunks: Optional[Iterator[pd.DataFrame]] = None
+
+    def next(self, input_data: Callable) -> bool:
+        if self._chunks is None:
+            self._chunks = iter(self.chunks)
+            self.rows = 0
+        for chunk in self._chunks:
+            mask = self.select(chunk["timestamp"].to_numpy())
+            if not mask.any():
+                continue
+            rows = chunk[mask]
+            self.rows += len(rows)
+            input_data(data=self.scaler.transform(rows[FEATURES]), label=rows[TARGET].to_numpy())
+            return True
+        return False
+
+    def reset(self) -> None:
+        self._chunks = None
+
+
+def scan(chunks: TrainingChunks, valid_fraction: float) -> tuple[StandardScaler, int]:
+    """
+    One pass over the data: fits the scaler incrementally and picks the validation cutoff,
+    the start of the newest valid_fraction of the covered time span. The scaler sees every row;
+    a per-feature affine rescaling doesn't change what the trees can learn.
+    """
+    scaler = StandardScaler()
+    first, last = None, None
+    for chunk in chunks:
+        scaler.partial_fit(chunk[FEATURES])
+        timestamps = chunk["timestamp"].to_numpy()
+        first = timestamps.min() if first is None else min(first, timestamps.min())
+        last = timestamps.max() if last is None else max(last, timestamps.max())
+    if first is None:
+        raise ValueError("No training data found")
+    return scaler, int(last - (last - first) * valid_fraction)
+
+
+def peak_memory_mib() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+def train_booster(params: dict, dtrain: xgb.DMatrix, dvalid: xgb.DMatrix, num_boost_round: int,
+                  early_stopping_rounds: int, nthread: int) -> xgb.Booster:
+    return xgb.train({**params, "nthread": nthread, "eval_metric": "rmse"}, dtrain, num_boost_round,
+                     evals=[(dvalid, "valid")], early_stopping_rounds=early_stopping_rounds, verbose_eval=False)
+
+
+def sweep(grid: dict[str, list], dtrain: xgb.DMatrix, dvalid: xgb.DMatrix, num_boost_round: int,
+          early_stopping_rounds: int, parallel: int) -> list[tuple[dict, xgb.Booster]]:
+    """
+    Trains one booster per combination in grid, `parallel` at a time with the cores split
+    between them (XGBoost releases the GIL). Returns (params, booster) by validation RMSE, best first.
+    """
+    combos = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    parallel = max(1, min(parallel, len(combos)))
+    nthread = max(1, (os.cpu_count() or 1) // parallel)
+
+    def fit(combo: dict) -> tuple[dict, xgb.Booster]:
+        params = {**BASE_PARAMS, **combo}
+        booster = train_booster(params, dtrain, dvalid, num_boost_round, early_stopping_rounds, nthread)
+        print(f"[INFO] {combo}: valid RMSE {booster.best_score:.4f} at {booster.best_iteration + 1} trees")
+        return params, booster
+
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="sweep") as executor:
+        results = list(executor.map(fit, combos))
+    return sorted(results, key=lambda result: result[1].best_score)
+
+
+def to_pipeline(scaler: StandardScaler, params: dict, booster: xgb.Booster) -> Pipeline:
+    """The scaler and the booster's best iteration as the Pipeline the app loads."""
+    n_trees = booster.best_iteration + 1
+    regressor = XGBRegressor(n_estimators=n_trees, **{k: v for k, v in params.items() if k != "seed"},
+                             random_state=params.get("seed"))
+    regressor.load_model(bytearray(booster[:n_trees].save_raw("ubj")))
+    return Pipeline([("scaler", scaler), ("xgb", regressor)])
+
+
+def train_out_of_core(sources: list[Path], model_dir: str = MODEL_DIR, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                      valid_fraction: float = 0.2, grid: Optional[dict[str, list]] = None,
+                      parallel: Optional[int] = None, num_boost_round: int = 1000,
+                      early_stopping_rounds: int = 25, cache_dir: Optional[Union[str, Path]] = None) -> dict:
+    """
+    Streams sources into XGBoost, trains with early stopping on the newest valid_fraction of
+    the time span (a sweep over grid if given, else BASE_PARAMS) using every core, and saves
+    the best model. Returns a summary with validation MSE, throughput and peak memory.
+    """
+    chunks = TrainingChunks(sources, chunk_rows)
+    with stage("scan"):
+        scaler, cutoff = scan(chunks, valid_fraction)
+
+    cores = os.cpu_count() or 1
+    start = time.perf_counter()
+    with stage("dmatrix"):
+        prefix = {}
+        if cache_dir is not None:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            prefix = {"train": str(Path(cache_dir) / "train"), "valid": str(Path(cache_dir) / "valid")}
+        train_iter = ChunkIter(chunks, lambda ts: ts < cutoff, scaler, prefix.get("train"))
+        valid_iter = ChunkIter(chunks, lambda ts: ts >= cutoff, scaler, prefix.get("valid"))
+        matrix = xgb.ExtMemQuantileDMatrix if cache_dir is not None else xgb.QuantileDMatrix
+        dtrain = matrix(train_iter, nthread=cores)
+        dvalid = matrix(valid_iter, nthread=cores, ref=dtrain)
+    build_seconds = time.perf_counter() - start
+    if not train_iter.rows or not valid_iter.rows:
+        raise ValueError(f"Time split left {train_iter.rows} training and {valid_iter.rows} validation rows")
+    print(f"[INFO] {chunks.rows} rows from {len(sources)} sources ({chunks.duplicates} duplicates dropped): "
+          f"{train_iter.rows} train / {valid_iter.rows} valid from {pd.Timestamp(cutoff, tz='UTC')}")
+
+    start = time.perf_counter()
+    with stage("train"):
+        if grid:
+            results = sweep(grid, dtrain, dvalid, num_boost_round, early_stopping_rounds,
+                            parallel or min(cores, len(list(itertools.product(*grid.values())))))
+            params, booster = results[0]
+        else:
+            params = dict(BASE_PARAMS)
+            booster = train_booster(params, dtrain, dvalid, num_boost_round, early_stopping_rounds, cores)
+    train_seconds = time.perf_counter() - start
+
+    pipeline = to_pipeline(scaler, params, booster)
+    os.makedirs(model_dir, exist_ok=True)
+    model_path = os.path.join(model_dir, f"xgb_pipeline_{datetime.now().strftime('%Y%m%d')}.joblib")
+    with stage("save"):
+        joblib.dump(pipeline, model_path)
+
+    summary = {
+        "model_path": model_path,
+        "params": {k: v for k, v in params.items() if k in (grid or {}) or k in ("max_depth", "learning_rate")},
+        "trees": booster.best_iteration + 1,
+        "valid_mse": float(booster.best_score) ** 2,
+        "rows": chunks.rows,
+        "duplicates": chunks.duplicates,
+        "dmatrix_rows_per_s": chunks.rows / build_seconds,
+        "train_rows_per_s": train_iter.rows / train_seconds,
+        "peak_memory_mib": peak_memory_mib(),
+    }
+    print(f"Model saved to {model_path}. Validation MSE: {summary['valid_mse']:.2f} "
+          f"({summary['trees']} trees, {summary['params']})")
+    print(f"[INFO] Throughput: DMatrix {summary['dmatrix_rows_per_s']:,.0f} rows/s, "
+          f"training {summary['train_rows_per_s']:,.0f} rows/s; peak memory {summary['peak_memory_mib']:.0f} MiB")
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Train on every accumulated dataset (output/*.csv and the "
+                                                 "training store) without fetching new observations.")
+    parser.add_argument("--sweep", action="store_true", help="train every combination of SWEEP_GRID, keep the best")
+    parser.add_argument("--parallel", type=int, default=None, help="boosters trained at once during a sweep")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--valid-fraction", type=float, default=0.2,
+                        help="newest share of the time span held out for early stopping")
+    parser.add_argument("--cache-dir", default=None, help="page the quantized matrices to disk here")
+    args = parser.parse_args()
+
+    with collect_timings() as timings:
+        try:
+            train_out_of_core(training_sources(store=TrainingStore()), chunk_rows=args.chunk_rows,
+                              valid_fraction=args.valid_fraction, grid=SWEEP_GRID if args.sweep else None,
+                              parallel=args.parallel, cache_dir=args.cache_dir)
+        finally:
+            print_stage_timings(timings)
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import weather
+from weather import WeatherStore
+from building_snapshot import SNAPSHOT_DIR_ENV, load_building
+from benchmarks.synthetic_ifc import generate_building
+from benchmarks.stub_weather import StubWeatherProvider
+
+
+class GappyWeatherProvider(StubWeatherProvider):
+    """StubWeatherProvider without data for the hours in gaps."""
+    def __init__(self, gaps=()):
+        super().__init__()
+        self.gaps = {pd.Timestamp(hour) for hour in gaps}
+
+    def fetch_hourly(self, site, start, end):
+        temps = super().fetch_hourly(site, start, end)
+        return temps[~temps.index.isin(list(self.gaps))]
+
+
+@pytest.fixture(scope="session")
+def building_ifc(tmp_path_factory):
+    """A small synthetic building: 2 floors of 6 rooms, the south rooms with 2 windows each."""
+    return generate_building(tmp_path_factory.mktemp("ifc") / "building.ifc", floors=2, rooms_per_floor=6)
+
+
+@pytest.fixture(scope="session")
+def site(building_ifc, tmp_path_factory):
+    """The synthetic building, parsed and memory-mapped from a snapshot outside the checkout."""
+    return load_building(building_ifc, snapshot_dir=tmp_path_factory.mktemp("snapshots"))
+
+
+@pytest.fixture
+def weather_store(monkeypatch):
+    """Offline, in-memory weather as the process-wide store."""
+    store = WeatherStore(GappyWeatherProvider(), db_path=":memory:")
+    monkeypatch.setattr(weather, "_store", store)
+    return store
+
+
+@pytest.fixture
+def app_client(building_ifc, weather_store, monkeypatch, tmp_path):
+    """The app serving the synthetic building with the shipped models; no lifespan, so no warmup."""
+    import main
+    import simulator
+    from buildings import Building, BuildingRegistry
+    from model_registry import MODEL_DIR
+    monkeypatch.setenv(SNAPSHOT_DIR_ENV, str(tmp_path / "snapshots"))
+    monkeypatch.setattr(simulator, "buildings", BuildingRegistry([Building("test", building_ifc, MODEL_DIR)]))
+    yield TestClient(main.app)
+    main.pipeline.shutdown()
@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    # no lifespan: these routes don't need the simulation stack
+    yield TestClient(main.app)
+    main.profiler.configure(0)
+
+
+def test_admin_endpoints_disabled_without_token(client, monkeypatch):
+    monkeypatch.delenv(main.ADMIN_TOKEN_ENV, raising=False)
+    assert client.post("/api/profiling", params={"sample_rate": 0.5}).status_code == 404
+    assert client.post("/api/models/rollback").status_code == 404
+    assert client.get("/api/profiling").status_code == 200
+
+
+def test_admin_endpoints_need_the_token(client, monkeypatch):
+    monkeypatch.setenv(main.ADMIN_TOKEN_ENV, "secret")
+    assert client.post("/api/profiling", params={"sample_rate": 0.5}).status_code == 401
+    wrong = {"Authorization": "Bearer nope"}
+    assert client.post("/api/models/20250101/pin", headers=wrong).status_code == 401
+    right = {"Authorization": "Bearer secret"}
+    response = client.post("/api/profiling", params={"sample_rate": 0.5}, headers=right)
+    assert response.status_code == 200
+    assert response.json()["sample_rate"] == 0.5
@@ -0,0 +1,77 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import main
+import pipeline
+import simulator
+
+
+def test_matching_etag_gets_304_without_simulating(app_client, site, monkeypatch):
+    # both requests fall in the same 5-minute bucket, so the ETag can't roll over in between
+    now = time.time()
+    monkeypatch.setattr(pipeline, "time", SimpleNamespace(time=lambda: now))
+    simulations, predictions = [], []
+    cached_simulate_room, predict_room = main.pipeline.cached_simulate_room, simulator.predict_room
+
+    async def counting_simulation(*args):
+        simulations.append(args)
+        return await cached_simulate_room(*args)
+
+    def counting_prediction(*args):
+        predictions.append(args)
+        return predict_room(*args)
+
+    monkeypatch.setattr(main.pipeline, "cached_simulate_room", counting_simulation)
+    monkeypatch.setattr(simulator, "predict_room", counting_prediction)
+    room = next(iter(site.rooms.values())).long_name
+
+    first = app_client.get(f"/api/simulate/{room}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    second = app_client.get(f"/api/simulate/{room}", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag and not second.content
+    assert (len(simulations), len(predictions)) == (1, 1)
+
+
+@pytest.mark.parametrize("params", [
+    {"freq": "0h"},
+    {"freq": "-2h"},
+    {"freq": "fortnightly"},
+    {"freq": "bh"},
+    # over MAX_SERIES_POINTS: a Tick frequency, and a calendar one checked by stepping
+    {"start": "2020-01-01T00:00", "end": "2024-01-01T00:00", "freq": "5min"},
+    {"start": "1800-01-01T00:00", "end": "2250-01-01T00:00", "freq": "B"},
+    {"start": "2025-01-02T00:00", "end": "2025-01-01T00:00", "freq": "1h"},
+])
+def test_invalid_series_requests_are_rejected(app_client, site, params):
+    room = next(iter(site.rooms.values())).long_name
+    started = time.perf_counter()
+    response = app_client.get(f"/api/simulate/{room}/series", params=params)
+    assert response.status_code == 422, response.text
+    # rejected before any index, weather or solar work
+    assert time.perf_counter() - started < 1
+
+
+def test_calendar_frequencies_are_accepted(app_client, site):
+    room = next(iter(site.rooms.values())).long_name
+    params = {"start": "2025-01-01T00:00", "end": "2025-12-31T23:00"}
+    monthly = app_client.get(f"/api/simulate/{room}/series", params={**params, "freq": "1ME"})
+    assert monthly.status_code == 200, monthly.text
+    body = monthly.json()
+    assert len(body["timestamps"]) == len(body["predicted_temp"]) == 12
+    assert body["timestamps"][0].startswith("2025-01-31")
+    assert all(temp is not None for temp in body["predicted_temp"])
+    for freq in ("W", "B", "1h"):
+        assert app_client.get(f"/api/simulate/{room}/series", params={**params, "freq": freq}).status_code == 200
+
+
+def test_daily_series_across_dst_changes(app_client, site):
+    room = next(iter(site.rooms.values())).long_name
+    # 02:30 doesn't exist on 30 March 2025 in Amsterdam and happens twice on 26 October
+    for start, end in (("2025-03-28T02:30", "2025-04-01T02:30"), ("2025-10-24T02:30", "2025-10-28T02:30")):
+        response = app_client.get(f"/api/simulate/{room}/series", params={"start": start, "end": end, "freq": "D"})
+        assert response.status_code == 200, response.text
+        assert len(response.json()["timestamps"]) == 5
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import building_snapshot
+from building_snapshot import BuildingCache
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Stand-in for load_building that records each load and takes a moment, like a real one."""
+    calls = []
+
+    def load_building(ifc_path):
+        calls.append(ifc_path.name)
+        time.sleep(0.05)
+        return SimpleNamespace(path=ifc_path, timezone=None)
+
+    monkeypatch.setattr(building_snapshot, "load_building", load_building)
+    return calls
+
+
+def ifc_files(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / f"{name}.ifc"
+        path.write_text("ISO-10303-21;")
+        paths.append(path)
+    return paths
+
+
+def test_least_recently_used_building_is_evicted(tmp_path, loads):
+    a, b, c = ifc_files(tmp_path, "a", "b", "c")
+    cache = BuildingCache(maxsize=2)
+    site_a = cache.get(a)
+    cache.get(b)
+    assert cache.get(a) is site_a  # a is now the most recently used
+    cache.get(c)
+    assert len(cache) == 2
+    assert (cache.loaded(a), cache.loaded(b), cache.loaded(c)) == (True, False, True)
+    cache.get(b)
+    assert loads == ["a.ifc", "b.ifc", "c.ifc", "b.ifc"]
+    assert cache.stats()["evictions"] == 2 and cache.stats()["hits"] == 1
+
+
+def test_changed_file_is_reloaded(tmp_path, loads):
+    (a,) = ifc_files(tmp_path, "a")
+    cache = BuildingCache()
+    first = cache.get(a)
+    assert cache.get(a) is first
+    stat = os.stat(a)
+    os.utime(a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = cache.get(a)
+    assert second is not first
+    with open(a, "a") as f:
+        f.write("\n")
+    os.utime(a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))  # same mtime, new size
+    assert cache.get(a) is not second
+    assert loads == ["a.ifc"] * 3
+
+
+def test_concurrent_gets_load_once(tmp_path, loads):
+    a, b = ifc_files(tmp_path, "a", "b")
+    cache = BuildingCache()
+    barrier = threading.Barrier(9)
+    sites = []
+
+    def request(path):
+        barrier.wait()
+        sites.append(cache.get(path))
+
+    threads = [threading.Thread(target=request, args=(a,)) for _ in range(8)]
+    threads.append(threading.Thread(target=request, args=(b,)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(loads) == ["a.ifc", "b.ifc"]
+    assert len({id(site) for site in sites if site.path == a}) == 1
+    assert cache.stats()["loads"] == 2 and cache.stats()["coalesced"] >= 1
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from ifc_parsers import parse_building
+from building_tables import MAGIC, BuildingTables
+
+ROOM_FIELDS = ("global_id", "short_name", "long_name", "volume", "bounding_box")
+WINDOW_FIELDS = ("global_id", "room_name", "bounding_box", "SHGC", "area", "is_external")
+
+
+@pytest.fixture(scope="module")
+def parsed(building_ifc):
+    return parse_building(building_ifc)
+
+
+@pytest.fixture
+def saved(parsed, tmp_path):
+    path = tmp_path / "building.bkt"
+    BuildingTables.from_site(parsed).save(path)
+    return path
+
+
+def test_round_trip_matches_the_parsed_site(parsed, saved):
+    tables = BuildingTables.load(saved)
+    mapped = tables.site()
+    assert isinstance(tables.rooms["volume"], np.memmap)
+    assert (mapped.latitude, mapped.longitude, mapped.elevation, mapped.timezone) == \
+           (parsed.latitude, parsed.longitude, parsed.elevation, parsed.timezone)
+    assert list(mapped.rooms) == list(parsed.rooms)
+
+    for gid, room in parsed.rooms.items():
+        view = mapped.rooms[gid]
+        assert [getattr(view, f) for f in ROOM_FIELDS] == [getattr(room, f) for f in ROOM_FIELDS]
+        assert [[getattr(w, f) for f in WINDOW_FIELDS] for w in view.windows or []] == \
+               [[getattr(w, f) for f in WINDOW_FIELDS] for w in room.windows or []]
+    assert sum(len(room.windows or []) for room in parsed.rooms.values()) > 0
+
+
+def test_lookups_and_window_gain_match_the_parsed_site(parsed, saved):
+    tables = BuildingTables.load(saved)
+    rooms = list(parsed.rooms.values())
+    for index, room in enumerate(rooms):
+        assert tables.find("gid", room.global_id) == index
+        for name in (room.long_name.upper(), f" {room.short_name} "):
+            assert [r.global_id for r in tables.find_rooms(name)] == [r.global_id for r in parsed.find_rooms(name)]
+    assert tables.find("gid", "no-such-id") is None
+    assert tables.find_rooms("no such room") == []
+
+    indices = np.arange(len(rooms))[::-1]
+    rows, owner = tables.windows_of(indices)
+    expected = [(position, (w.area or 0) * (w.SHGC or 0))
+                for position, index in enumerate(indices) for w in rooms[index].windows or []]
+    assert owner.tolist() == [position for position, _ in expected]
+    np.testing.assert_allclose(tables.window_gain(rows), [gain for _, gain in expected])
+
+
+def test_wrong_magic_is_rejected(saved):
+    data = bytearray(saved.read_bytes())
+    data[:len(MAGIC)] = b"NOTATBLE"
+    saved.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="not a building table file"):
+        BuildingTables.load(saved)
+
+
+def test_other_format_version_is_rejected(saved):
+    data = saved.read_bytes()
+    assert data.count(b'"version": 1') == 1
+    saved.write_bytes(data.replace(b'"version": 1', b'"version": 9'))
+    with pytest.raises(ValueError, match="format 9, expected 1"):
+        BuildingTables.load(saved)
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+import frost_client
+from frost_client import FrostClient, IncompletePageError, iter_observations
+
+BODY = json.dumps({"value": [
+    {"phenomenonTime": f"2025-01-01T0{i}:00:00Z", "result": 20 + i} for i in range(3)
+]}).encode()
+
+
+def chunked(body, size=7):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def test_streamed_page_decodes():
+    assert [obs["result"] for obs in iter_observations(chunked(BODY))] == [20, 21, 22]
+
+
+@pytest.mark.parametrize("body", [
+    BODY[:60],                                      # cut inside an object
+    BODY[:BODY.index(b"},") + 2],                   # cut between objects
+    BODY[:5],                                       # cut before the array
+    BODY.replace(b'"result": 21', b'"result": 2x1'),  # malformed
+])
+def test_incomplete_page_raises(body):
+    with pytest.raises(IncompletePageError):
+        list(iter_observations(chunked(body)))
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        return chunked(self.body)
+
+
+def test_incomplete_page_is_requested_again(monkeypatch):
+    monkeypatch.setattr(frost_client.time, "sleep", lambda seconds: None)
+    bodies = [BODY[:60], BODY]
+    with FrostClient(retries=2) as client:
+        monkeypatch.setattr(client.session, "get", lambda url, **kwargs: FakeResponse(bodies.pop(0)))
+        page = client.fetch_page("http://frost/Observations?$top=500")
+    assert len(page) == 3 and not bodies
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from caching import TTLCache
+from ifc_parsers import Window
+from ifc_calculators import solar_inflow_matrix, window_solar_inflow
+
+
+def test_matrix_matches_per_window_inflow(site):
+    windows = [w for room in site.rooms.values() for w in room.windows or []][:3]
+    # a window without SHGC lets no sun in
+    windows.append(Window(global_id="no-shgc", room_name="1", area=2.0))
+    times = pd.DatetimeIndex([pd.Timestamp("2025-06-21 06:00"), pd.Timestamp("2025-06-21 12:30"),
+                              pd.Timestamp("2025-12-21 13:15"), pd.Timestamp("2025-03-20 23:00")],
+                             tz="Europe/Amsterdam")
+
+    matrix = solar_inflow_matrix(site, windows, times)
+    expected = [[window_solar_inflow(w, site, t) for w in windows] for t in times]
+    assert matrix.shape == (len(times), len(windows))
+    np.testing.assert_allclose(matrix, expected, rtol=1e-12)
+    assert matrix[1, 0] > 0 and not matrix[:, -1].any() and not matrix[3].any()
+    # on bucket starts, the cached path gives the same values
+    np.testing.assert_allclose(solar_inflow_matrix(site, windows, times, cache=TTLCache(maxsize=16)), expected, rtol=1e-12)
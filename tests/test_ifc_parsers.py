@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import ifcopenshell
+
+from ifc_parsers import parse_building
+from building_tables import BuildingTables
+from room_catalogue import RoomCatalogue
+from benchmarks.synthetic_ifc import generate_building
+
+
+def building_with_duplicate_names(tmp_path: Path) -> Path:
+    """Synthetic building where four spaces share the long name "Room", as in BK (short names 721-724)."""
+    path = generate_building(tmp_path / "building.ifc", floors=1, rooms_per_floor=8)
+    model = ifcopenshell.open(path)
+    for number, space in enumerate(model.by_type("IfcSpace")[:4], start=721):
+        space.Name = str(number)
+        space.LongName = "Room"
+    model.write(str(path))
+    return path
+
+
+def test_every_space_is_a_room(tmp_path):
+    path = building_with_duplicate_names(tmp_path)
+    spaces = ifcopenshell.open(path).by_type("IfcSpace")
+    site = parse_building(path)
+
+    assert len(site.rooms) == len(spaces)
+    assert set(site.rooms) == {space.GlobalId for space in spaces}
+    assert [room.short_name for room in site.find_rooms("room")] == ["721", "722", "723", "724"]
+    assert site.get_room("722").long_name == "Room"
+
+
+def test_duplicate_names_survive_tables_and_catalogue(tmp_path):
+    path = building_with_duplicate_names(tmp_path)
+    site = parse_building(path)
+    BuildingTables.from_site(site).save(tmp_path / "building.bkt")
+    mapped = BuildingTables.load(tmp_path / "building.bkt").site()
+
+    assert len(mapped.rooms) == len(site.rooms)
+    assert set(mapped.rooms) == set(site.rooms)
+    assert [room.short_name for room in mapped.find_rooms("Room")] == ["721", "722", "723", "724"]
+    assert mapped.get_room("723").global_id == site.get_room("723").global_id
+    assert len(RoomCatalogue(mapped)) == len(site.rooms)
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import model_registry
+from model_registry import ModelRegistry
+
+
+def fake_models(tmp_path, monkeypatch, versions):
+    for version in versions:
+        (tmp_path / f"xgb_pipeline_{version}.joblib").touch()
+    loads = []
+
+    def load(path):
+        loads.append(path.name)
+        time.sleep(0.05)
+        return path.name
+
+    monkeypatch.setattr(model_registry.joblib, "load", load)
+    def predictor(pipeline):
+        time.sleep(0.05)
+        return pipeline
+
+    monkeypatch.setattr(model_registry, "FastPredictor", predictor)
+    return loads
+
+
+def test_concurrent_cold_requests_load_once(tmp_path, monkeypatch):
+    loads = fake_models(tmp_path, monkeypatch, ["20250101", "20250102"])
+    registry = ModelRegistry(tmp_path)
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def request():
+        barrier.wait()
+        seen.append(registry.active.version)
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == ["xgb_pipeline_20250102.joblib"]
+    assert seen == ["20250102"] * 8
+
+
+def test_pin_and_rollback_reuse_the_active_model(tmp_path, monkeypatch):
+    loads = fake_models(tmp_path, monkeypatch, ["20250101", "20250102"])
+    registry = ModelRegistry(tmp_path)
+    assert registry.rollback().version == "20250101"
+    assert registry.pin("20250101").version == "20250101"
+    assert not registry.refresh()
+    assert registry.unpin().version == "20250102"
+    assert loads == ["xgb_pipeline_20250102.joblib", "xgb_pipeline_20250101.joblib", "xgb_pipeline_20250102.joblib"]
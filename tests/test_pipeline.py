@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pipeline import SimulationPipeline, SingleFlight
+
+
+def test_identical_concurrent_calls_run_once():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+            return {"temperature": 21.5}
+
+        waiters = [asyncio.ensure_future(flight.do("room", work)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return flight, runs, results
+
+    flight, runs, results = asyncio.run(scenario())
+    assert runs == [1]
+    assert results == [{"temperature": 21.5}] * 10
+    assert (flight.calls, flight.shared, len(flight)) == (10, 9, 0)
+
+
+def test_cancelling_a_waiter_keeps_the_shared_task():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+            return 42
+
+        first = asyncio.ensure_future(flight.do("room", work))
+        second = asyncio.ensure_future(flight.do("room", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return runs, await second
+
+    runs, result = asyncio.run(scenario())
+    assert runs == [1] and result == 42
+
+
+def test_exception_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+        runs = []
+
+        async def failing():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("no weather")
+
+        results = await asyncio.gather(*(flight.do("room", failing) for _ in range(5)), return_exceptions=True)
+        # the key is released, so the next call computes again
+        retry = await asyncio.gather(flight.do("room", failing), return_exceptions=True)
+        return runs, results + retry
+
+    runs, results = asyncio.run(scenario())
+    assert runs == [1, 1]
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_run_stage_respects_the_stage_limit():
+    pipeline = SimulationPipeline(cpu_workers=8, stage_limits={"solar": 2})
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def blocking(value):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return value * 2
+
+    async def scenario():
+        return await asyncio.gather(*(pipeline.run_stage("solar", blocking, i) for i in range(8)))
+
+    try:
+        assert asyncio.run(scenario()) == [i * 2 for i in range(8)]
+    finally:
+        pipeline.shutdown()
+    assert peak[0] == 2
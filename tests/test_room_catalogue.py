@@ -0,0 +1,41 @@
+from ifc_parsers import parse_building
+from building_snapshot import load_building
+from room_catalogue import RoomCatalogue, get_catalogue
+
+
+def test_prefix_search_is_case_insensitive_and_paged(site):
+    catalogue = get_catalogue(site)
+    first = catalogue.search("00.WE", offset=0, limit=4)
+    rest = catalogue.search(" 00.west", offset=4, limit=4)
+    assert (first["total"], first["offset"], first["limit"]) == (6, 0, 4)
+    assert rest["total"] == 6
+    names = [room["long_name"] for room in first["rooms"] + rest["rooms"]]
+    assert names == [f"00.West.{number:03d}" for number in range(6)]
+    assert catalogue.search("00.we", offset=6, limit=4)["rooms"] == []
+    assert catalogue.search("", limit=3)["total"] == len(site.rooms)
+
+    room = first["rooms"][2]
+    assert catalogue.search(room["global_id"].lower())["rooms"][0] == room
+    assert catalogue.search("zz")["total"] == 0
+
+
+def test_unknown_room_gets_suggestions(site, app_client):
+    catalogue = get_catalogue(site)
+    assert catalogue.find("00.Wst.001") is None
+    assert catalogue.suggest("00.Wst.001")[0] == "00.West.001"
+    assert catalogue.suggest("nothing like it") == []
+
+    response = app_client.get("/api/rooms/00.Wst.001")
+    assert response.status_code == 404
+    assert response.json()["detail"]["suggestions"][0] == "00.West.001"
+
+
+def test_etag_is_stable_across_reloads_of_the_same_ifc(building_ifc, tmp_path):
+    mapped = load_building(building_ifc, snapshot_dir=tmp_path)
+    rebuilt = load_building(building_ifc, snapshot_dir=tmp_path, rebuild=True)
+    parsed = parse_building(building_ifc)
+    assert get_catalogue(mapped) is not get_catalogue(rebuilt)
+    assert get_catalogue(mapped).etag == get_catalogue(rebuilt).etag == RoomCatalogue(parsed).etag
+
+    next(iter(parsed.rooms.values())).long_name = "Renamed"
+    assert RoomCatalogue(parsed).etag != get_catalogue(mapped).etag
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from ifc_calculators import solar_inflow_matrix
+from weather import get_weather_store
+from xgboost_training_NEW import prepare_training_data
+
+
+def rowwise_training_data(df, site, room):
+    """The per-row featurization prepare_training_data replaced, then its earliest-row-per-hour pass."""
+    records = []
+    for _, row in df.iterrows():
+        timestamp = row['timestamp']
+        external_temp = get_weather_store().get_temp(site, timestamp)
+        if external_temp is None:
+            continue
+        solar_inflow = 0.0
+        if room.windows:
+            solar_inflow = float(solar_inflow_matrix(site, room.windows, pd.DatetimeIndex([timestamp])).sum())
+        records.append({
+            'timestamp': timestamp,
+            'room_name': room.long_name,
+            'internal_temp': row['internal_temp'],
+            'external_temp': external_temp,
+            'volume': room.volume,
+            'solar_inflow': solar_inflow,
+        })
+    df_prepared = pd.DataFrame(records)
+    df_prepared['hour'] = df_prepared['timestamp'].dt.floor('h')
+    df_prepared = df_prepared.sort_values('timestamp')
+    return df_prepared.groupby('hour', group_keys=False).first().reset_index(drop=True)
+
+
+def frost_frame(start, hours, seed=0):
+    """Shuffled FROST-like observations: 1-4 per hour at random minutes, UTC timestamps."""
+    rng = np.random.default_rng(seed)
+    times = []
+    for hour in pd.date_range(start, periods=hours, freq='h'):
+        minutes = rng.choice(60, size=rng.integers(1, 5), replace=False)
+        times.extend(hour + pd.to_timedelta(np.sort(minutes), unit='min') + pd.Timedelta(seconds=17))
+    df = pd.DataFrame({'timestamp': pd.DatetimeIndex(times), 'internal_temp': rng.normal(21, 1, len(times)).round(2)})
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def test_vectorized_features_match_rowwise(site, weather_store):
+    start = pd.Timestamp('2025-06-20 18:00', tz='UTC')
+    # no weather for two hours: their observations are dropped on both paths
+    weather_store.provider.gaps = {pd.Timestamp('2025-06-21 04:00'), pd.Timestamp('2025-06-21 11:00')}
+    df = frost_frame(start, hours=30)
+    rooms = [room for room in site.rooms.values() if room.windows][:1] + \
+            [room for room in site.rooms.values() if not room.windows][:1]
+    assert len(rooms) == 2
+
+    for room in rooms:
+        expected = rowwise_training_data(df, site, room)
+        actual = prepare_training_data(df, site, room)
+        assert list(actual.columns) == list(expected.columns)
+        assert len(actual) == 28
+        assert not actual['timestamp'].dt.floor('h').isin(
+            [pd.Timestamp('2025-06-21 04:00', tz='UTC'), pd.Timestamp('2025-06-21 11:00', tz='UTC')]).any()
+        assert_frame_equal(actual, expected, check_dtype=False, rtol=1e-9)
+    # daytime rows of the room with windows carry solar gains
+    assert prepare_training_data(df, site, rooms[0])['solar_inflow'].max() > 0
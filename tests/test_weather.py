@@ -0,0 +1,48 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from weather import WeatherProvider, WeatherStore
+
+SITE = SimpleNamespace(latitude=52.0056, longitude=4.3707, elevation=0)
+DAY = pd.Timestamp("2025-01-01")
+
+
+class SlowProvider(WeatherProvider):
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def fetch_hourly(self, site, start, end):
+        self.calls.append((start, end))
+        self.release.wait(5)
+        index = pd.date_range(start, end, freq="h", name="time")
+        return pd.Series(10.0, index=index, name="temp")
+
+
+def test_same_range_is_fetched_once_and_stored_hours_stay_available():
+    provider = SlowProvider()
+    store = WeatherStore(provider, db_path=":memory:")
+    provider.release.set()
+    assert store.get_temp(SITE, DAY - pd.Timedelta(days=1)) == 10.0
+    provider.release.clear()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(store.get_range(SITE, DAY, DAY + pd.Timedelta(hours=23))))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    # the fetch is in flight; hours already stored don't wait for it
+    started = time.perf_counter()
+    assert store.get_temp(SITE, DAY - pd.Timedelta(hours=12)) == 10.0
+    assert time.perf_counter() - started < 0.1
+    provider.release.set()
+    for thread in threads:
+        thread.join()
+    assert len(provider.calls) == 2
+    assert len(results) == 8 and all(series.notna().all() and len(series) == 24 for series in results)
@@ -0,0 +1,93 @@
+import json
+import uuid
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Optional, Union
+import pandas as pd
+
+# Append-only, partitioned store of sensor observations and training features:
+#
+#   training_store/<kind>/room=<room name>/month=<YYYY-MM>/part-<run id>.parquet
+#   training_store/watermarks.json   {datastream: latest phenomenonTime ingested}
+#
+# Each training run only adds the observations newer than its datastream's watermark, and
+# training reads the union of all parts, so daily runs don't refetch or rewrite history.
+
+STORE_DIR = Path("training_store")
+KINDS = ("observations", "features")
+
+
+class TrainingStore:
+    def __init__(self, root: Union[str, Path] = STORE_DIR):
+        self.root = Path(root)
+        self._watermark_path = self.root / "watermarks.json"
+
+    # ── watermarks ──
+    def watermarks(self) -> dict[str, pd.Timestamp]:
+        if not self._watermark_path.exists():
+            return {}
+        with open(self._watermark_path) as f:
+            return {ds: pd.Timestamp(ts) for ds, ts in json.load(f).items()}
+
+    def watermark(self, datastream: str) -> Optional[pd.Timestamp]:
+        """Latest phenomenonTime already stored for this datastream, None if it was never ingested."""
+        return self.watermarks().get(datastream)
+
+    def set_watermark(self, datastream: str, timestamp: pd.Timestamp) -> None:
+        marks = {ds: ts.isoformat() for ds, ts in self.watermarks().items()}
+        marks[datastream] = pd.Timestamp(timestamp).isoformat()
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._watermark_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(marks, f, indent=2, sort_keys=True)
+        tmp.replace(self._watermark_path)
+
+    # ── partitions ──
+    def partition_dir(self, kind: str, room_name: str, month: str) -> Path:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind '{kind}', expected one of {KINDS}")
+        return self.root / kind / f"room={room_name}" / f"month={month}"
+
+    def append(self, kind: str, room_name: str, df: pd.DataFrame) -> list[Path]:
+        """
+        Write df as new parts, one per month of its 'timestamp' column. Existing parts are never
+        touched; a part is written under a temporary name first so readers never see half a file.
+        """
+        if df.empty:
+            return []
+        run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        months = pd.to_datetime(df["timestamp"], utc=True).dt.strftime("%Y-%m")
+        written = []
+        for month, part in df.groupby(months.to_numpy()):
+            directory = self.partition_dir(kind, room_name, month)
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"part-{run_id}.parquet"
+            tmp = directory / f".part-{run_id}.parquet.tmp"
+            part.to_parquet(tmp, index=False)
+            tmp.replace(path)
+            written.append(path)
+        return written
+
+    def parts(self, kind: str, rooms: Optional[list[str]] = None) -> list[Path]:
+        pattern_rooms = [f"room={room}" for room in rooms] if rooms else ["room=*"]
+        paths = []
+        for room in pattern_rooms:
+            paths.extend((self.root / kind).glob(f"{room}/month=*/part-*.parquet"))
+        return sorted(paths)
+
+    def read(self, kind: str = "features", rooms: Optional[list[str]] = None) -> pd.DataFrame:
+        """
+        Union of all stored parts. Features are deduplicated to the first observation per
+        room and hour (as a full rebuild would produce); observations per room and timestamp.
+        """
+        paths = self.parts(kind, rooms)
+        if not paths:
+            return pd.DataFrame()
+        df = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+        df = df.sort_values("timestamp", kind="stable")
+        if kind == "features":
+            hour = pd.to_datetime(df["timestamp"], utc=True).dt.floor("h")
+            df = df[~pd.DataFrame({"room_name": df["room_name"], "hour": hour}).duplicated()]
+        else:
+            df = df.drop_duplicates(subset=["room_name", "timestamp"])
+        return df.reset_index(drop=True)
@@ -0,0 +1,222 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Union
+import pandas as pd
+
+from ifc_parsers import Site
+from instrumentation import stage
+
+# Hourly external temperatures, fetched from a provider in bulk date ranges and kept in a local
+# SQLite store, so point lookups are served from memory and only missing hours go remote.
+
+WEATHER_DB = Path("weather_cache") / "weather.sqlite"
+# Set to a CSV path to run fully offline with CSVWeatherProvider instead of Meteostat
+WEATHER_CSV_ENV = "WEATHER_CSV"
+
+
+def utc_hour(timestamp: pd.Timestamp) -> pd.Timestamp:
+    """Floor to the hour and express as naive UTC, the time base Meteostat uses."""
+    timestamp = pd.Timestamp(timestamp).floor("h")
+    if timestamp.tzinfo:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp
+
+
+def _empty_series() -> pd.Series:
+    return pd.Series(dtype=float, index=pd.DatetimeIndex([], name="time"), name="temp")
+
+
+class WeatherProvider:
+    """Source of hourly external temperatures. Subclasses implement fetch_hourly."""
+
+    def fetch_hourly(self, site: Site, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+        """
+        Temperatures (°C) for every available hour from start to end inclusive (naive UTC),
+        indexed by naive UTC hour. Hours without data are simply absent.
+        """
+        raise NotImplementedError
+
+
+class MeteostatProvider(WeatherProvider):
+    """Meteostat hourly data for the site's location; one request per date range."""
+
+    def fetch_hourly(self, site: Site, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+        from meteostat import Point, Hourly
+        loc = Point(site.latitude, site.longitude, site.elevation)
+        df_weather = Hourly(loc, start.to_pydatetime(), end.to_pydatetime()).fetch()
+        if df_weather.empty:
+            return _empty_series()
+        return df_weather["temp"].dropna()
+
+
+class CSVWeatherProvider(WeatherProvider):
+    """
+    Offline stand-in reading hourly temperatures from a CSV (the same series for every site).
+    Timestamps are floored to the hour and taken as UTC when they carry no offset; the training
+    CSVs in output/ work as fixtures with time_column="timestamp", temp_column="external_temp".
+    """
+
+    def __init__(self, path: Union[str, Path], time_column: str = "time", temp_column: str = "temp"):
+        df = pd.read_csv(path, usecols=[time_column, temp_column])
+        times = pd.to_datetime(df[time_column], utc=True).dt.floor("h").dt.tz_localize(None)
+        temps = pd.Series(df[temp_column].to_numpy(dtype=float), index=pd.DatetimeIndex(times, name="time"), name="temp")
+        self.temps = temps.dropna().groupby(level=0).first().sort_index()
+
+    def fetch_hourly(self, site: Site, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+        return self.temps.loc[start:end]
+
+
+class WeatherStore:
+    """
+    Hourly temperatures per site location, persisted in SQLite and mirrored in memory.
+    Range requests fetch only the hours that are not stored yet, one provider call per gap.
+    Hours the provider has no data for are remembered once they are settle_hours old,
+    so they are not requested again; more recent gaps are retried on the next lookup.
+    """
+
+    def __init__(self, provider: Optional[WeatherProvider] = None, db_path: Union[str, Path] = WEATHER_DB,
+                 settle_hours: int = 6):
+        self.provider = provider or MeteostatProvider()
+        self.settle_hours = settle_hours
+        if str(db_path) != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hourly_temp ("
+            " location TEXT NOT NULL, hour INTEGER NOT NULL, temp REAL,"
+            " PRIMARY KEY (location, hour))"
+        )
+        self._db.commit()
+        # location -> {epoch seconds of the UTC hour -> temperature or None}
+        self._memory: dict[str, dict[int, Optional[float]]] = {}
+        # guards _memory, _inflight and the database; never held while the provider is called
+        self._lock = threading.RLock()
+        # (location, first hour, last hour) -> set once that range's fetch is stored
+        self._inflight: dict[tuple[str, int, int], threading.Event] = {}
+
+    @staticmethod
+    def location_key(site: Site) -> str:
+        return f"{site.latitude:.4f},{site.longitude:.4f},{(site.elevation or 0):.0f}"
+
+    def _hours(self, location: str) -> dict[int, Optional[float]]:
+        hours = self._memory.get(location)
+        if hours is None:
+            rows = self._db.execute("SELECT hour, temp FROM hourly_temp WHERE location = ?", (location,))
+            hours = self._memory[location] = dict(rows.fetchall())
+        return hours
+
+    @staticmethod
+    def _runs(missing: list[int]) -> list[list[int]]:
+        """Missing hours grouped into contiguous runs, so each gap is one bulk request."""
+        runs, run = [], [missing[0]]
+        for h in missing[1:]:
+            if h == run[-1] + 3600:
+                run.append(h)
+            else:
+                runs.append(run)
+                run = [h]
+        runs.append(run)
+        return runs
+
+    def _fill(self, site: Site, location: str, keys: list[int]) -> None:
+        """
+        Fetch the hours of keys that aren't stored yet. A gap another thread is already fetching
+        is waited for instead of requested again; lookups of stored hours go on meanwhile.
+        """
+        with self._lock:
+            hours = self._hours(location)
+            missing = [h for h in keys if h not in hours]
+            if not missing:
+                return
+            claimed, pending = [], []
+            for run in self._runs(missing):
+                event = self._inflight.get((location, run[0], run[-1]))
+                if event is None:
+                    self._inflight[(location, run[0], run[-1])] = threading.Event()
+                    claimed.append(run)
+                else:
+                    pending.append(event)
+        settled_before = int(pd.Timestamp.now(tz="UTC").floor("h").timestamp()) - self.settle_hours * 3600
+        try:
+            for run in claimed:
+                with stage("weather_fetch"):
+                    fetched = self.provider.fetch_hourly(
+                        site, pd.Timestamp(run[0], unit="s"), pd.Timestamp(run[-1], unit="s")
+                    )
+                found = dict(zip(fetched.index.as_unit("s").asi8.tolist(), fetched.to_numpy(dtype=float).tolist()))
+                rows = []
+                for h in run:
+                    temp = found.get(h)
+                    if temp is not None or h < settled_before:
+                        rows.append((location, h, temp))
+                if rows:
+                    with self._lock:
+                        hours.update((h, temp) for _, h, temp in rows)
+                        self._db.executemany("INSERT OR REPLACE INTO hourly_temp VALUES (?, ?, ?)", rows)
+                        self._db.commit()
+        finally:
+            with self._lock:
+                for run in claimed:
+                    self._inflight.pop((location, run[0], run[-1])).set()
+        for event in pending:
+            event.wait()
+
+    def get_range(self, site: Site, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+        """Hourly temperatures from start to end (floored to UTC hours), NaN where no data exists."""
+        index = pd.date_range(utc_hour(start), utc_hour(end), freq="h", name="time")
+        keys = index.as_unit("s").asi8.tolist()
+        location = self.location_key(site)
+        with self._lock:
+            hours = self._hours(location)
+            complete = all(h in hours for h in keys)
+        if not complete:
+            self._fill(site, location, keys)
+        with self._lock:
+            values = [hours.get(h) for h in keys]
+        return pd.Series([float("nan") if v is None else v for v in values], index=index, name="temp", dtype=float)
+
+    def get_temp(self, site: Site, timestamp: pd.Timestamp) -> Optional[float]:
+        """
+        Temperature for the hour containing timestamp. A miss prefetches the whole UTC day,
+        so neighbouring hours are already in memory for the next lookups.
+        """
+        hour = utc_hour(timestamp)
+        location = self.location_key(site)
+        key = int(hour.timestamp())
+        with self._lock:
+            hours = self._hours(location)
+            if key in hours:
+                return hours[key]
+        day = hour.floor("D")
+        temps = self.get_range(site, day, day + pd.Timedelta(hours=23))
+        temp = temps.get(hour)
+        return None if temp is None or pd.isna(temp) else float(temp)
+
+
+_store: Optional[WeatherStore] = None
+_store_lock = threading.Lock()
+
+
+def get_weather_store() -> WeatherStore:
+    """
+    Process-wide store. Uses CSVWeatherProvider when the WEATHER_CSV environment variable
+    points to a CSV, Meteostat otherwise.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                csv_path = os.environ.get(WEATHER_CSV_ENV)
+                provider = CSVWeatherProvider(csv_path) if csv_path else MeteostatProvider()
+                _store = WeatherStore(provider)
+    return _store
+
+
+def configure_weather(provider: Optional[WeatherProvider] = None, db_path: Union[str, Path] = WEATHER_DB) -> WeatherStore:
+    """Replace the process-wide store, e.g. with an offline provider and an in-memory database."""
+    global _store
+    with _store_lock:
+        _store = WeatherStore(provider, db_path=db_path)
+    return _store
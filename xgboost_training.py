@@ -108,7 +108,7 @@ if __name__ == "__main__":
     ifc_file = Path("static/IFC/BK_v2_vb_updated.ifc")
     room_1 = "BG.West.010"
     site = parse_room(ifc_file, room_1)
-    room = site.rooms[room_1]
+    room = site.get_room(room_1)
 
     # Fetch + process data
     url_1 = "https://multicare.bk.tudelft.nl/FROST-Server/v1.0/Datastreams(1)/Observations?$orderby=phenomenonTime desc"
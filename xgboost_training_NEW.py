@@ -1,6 +1,5 @@
 import os
 import pandas as pd
-import requests
 from typing import Optional
 from xgboost import XGBRegressor
 from sklearn.pipeline import Pipeline
@@ -9,104 +8,147 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
 import joblib
 from pathlib import Path
-from ifc_parsers import Site, Room, Window, parse_room
-from ifc_calculators import window_solar_inflow
-from meteostat import Point, Hourly
+from ifc_parsers import Site, Room
+from building_snapshot import load_building
+from ifc_calculators import solar_inflow_matrix
+from weather import get_weather_store
+from frost_client import FrostClient
+from training_store import TrainingStore
+from streaming_training import SWEEP_GRID, train_out_of_core, training_sources
+from instrumentation import collect_timings, print_stage_timings, stage, timed
 from datetime import datetime
 
 # THIS FILE IS FOR TRAINING THE XGBOOST MODEL - IT IS A STANDALONE SCRIPT
 
 
+# pooled, retrying FROST client shared by every fetch in this script
+frost = FrostClient(max_workers=8, max_streams=4)
+
+
 def fetch_sensor_data(url: str, limit: int = 100) -> pd.DataFrame:
     """
     Fetch sensor observations from the given URL, optionally limiting the number of records.
     Returns an empty DataFrame with the expected columns if no data.
     """
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    observations = data.get('value', [])[:limit]
-    # build DataFrame
-    df = pd.DataFrame([
-        {'timestamp': obs.get('phenomenonTime'), 'internal_temp': obs.get('result')}
-        for obs in observations
-    ])
-    # if no observations, return empty DataFrame with timestamp column
-    if df.empty:
-        return pd.DataFrame(columns=['timestamp', 'internal_temp'])
-    df = df.drop_duplicates(subset='timestamp')
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+    return frost.fetch_page(url, limit=limit)
 
 
 def fetch_all_sensor_data(base_url: str, page_size: int = 500) -> pd.DataFrame:
     """
     Page through the FROST Server OData API, collecting all observations in blocks of `page_size`.
+    Pages are requested concurrently when the server reports the total count.
+    """
+    return frost.fetch_all(base_url, page_size)
+
+
+@timed('featurize')
+def prepare_training_data(df: pd.DataFrame, site: Site, room: Room) -> pd.DataFrame:
+    """
+    Given raw observations and IFC room/site info, compute features and tag with room name.
+    Keeps the earliest observation per hour; weather and solar inflow are computed for all
+    remaining timestamps at once.
     """
-    all_dfs = []
-    skip = 0
-
-    while True:
-        # build the paged URL
-        paged_url = f"{base_url}&$top={page_size}&$skip={skip}"
-        # fetch up to page_size rows
-        df_page = fetch_sensor_data(paged_url, limit=page_size)
-        if df_page.empty:
-            break
-        all_dfs.append(df_page)
-        skip += page_size
-
-    if all_dfs:
-        return pd.concat(all_dfs, ignore_index=True)
+    if df.empty:
+        return pd.DataFrame()
+    # 1. Downsample first: only the earliest observation of each hour becomes a training row
+    df = df.dropna(subset=['internal_temp']).sort_values('timestamp', kind='stable')
+    df = df[~df['timestamp'].dt.floor('h').duplicated()].reset_index(drop=True)
+    if df.empty:
+        return pd.DataFrame()
+
+    # 2. One bulk weather fetch, joined on the hour each observation falls in. The weather
+    #    series has a row for every hour (NaN where missing), so a backward match is exact.
+    weather = get_weather_store().get_range(site, df['timestamp'].min(), df['timestamp'].max())
+    times = pd.to_datetime(df['timestamp'], utc=True).dt.tz_localize(None).astype(weather.index.dtype)
+    joined = pd.merge_asof(
+        times.rename('time').to_frame(),
+        weather.rename('external_temp').rename_axis('time').reset_index(),
+        on='time', direction='backward',
+    )
+    missing = joined['external_temp'].isna()
+    for hour in times[missing].dt.floor('h').unique():
+        print(f"[WARNING] No external temperature data found for {hour}")
+    df = df[~missing.to_numpy()].reset_index(drop=True)
+    external_temp = joined.loc[~missing, 'external_temp'].to_numpy()
+
+    # 3. Solar inflow for the whole timestamp vector in one (time x window) pass
+    if room.windows:
+        solar_inflow = solar_inflow_matrix(site, room.windows, pd.DatetimeIndex(df['timestamp'])).sum(axis=1)
     else:
-        return pd.DataFrame(columns=['timestamp','internal_temp'])
+        print(f"[INFO] No windows found for room '{room.long_name}'")
+        solar_inflow = 0.0
 
+    return pd.DataFrame({
+        'timestamp': df['timestamp'],
+        'room_name': room.long_name,
+        'internal_temp': df['internal_temp'],
+        'external_temp': external_temp,
+        'volume': room.volume,
+        'solar_inflow': solar_inflow,
+    })
 
-def fetch_external_temp(site: Site, timestamp: pd.Timestamp) -> Optional[float]:
-    loc = Point(site.latitude, site.longitude, site.elevation)
-    rounded_time = timestamp.floor('h')  # use 'h' to avoid deprecation
-    if rounded_time.tzinfo:
-        rounded_time = rounded_time.tz_convert('UTC').tz_localize(None)
-    df_weather = Hourly(loc, rounded_time, rounded_time).fetch()
-    if not df_weather.empty:
-        return float(df_weather['temp'].iloc[0])
-    print(f"[WARNING] No external temperature data found for {rounded_time}")
-    return None
 
+def frost_time(timestamp: pd.Timestamp) -> str:
+    """UTC timestamp in the form FROST expects in $filter expressions."""
+    timestamp = pd.Timestamp(timestamp).tz_convert('UTC')
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%S.') + f"{timestamp.microsecond // 1000:03d}Z"
 
-def calculate_total_solar_inflow(site: Site, room: Room, timestamp: pd.Timestamp) -> float:
-    total_inflow = 0.0
-    if not room.windows:
-        print(f"[INFO] No windows found for room '{room.long_name}' at {timestamp}")
-        return total_inflow
-    for window in room.windows:
-        inflow = window_solar_inflow(window, site, timestamp)
-        total_inflow += inflow
-    print(f"[INFO] Total solar inflow at {timestamp}: {total_inflow:.2f} J")
-    return total_inflow
 
+def ingested_until(last_featurized: pd.Timestamp) -> pd.Timestamp:
+    """Watermark after featurizing up to last_featurized: the last millisecond (FROST's resolution) of its hour."""
+    return pd.Timestamp(last_featurized).floor('h') + pd.Timedelta(hours=1) - pd.Timedelta(milliseconds=1)
 
-def prepare_training_data(df: pd.DataFrame, site: Site, room: Room) -> pd.DataFrame:
+
+def update_training_store(store: TrainingStore, site: Site, rooms: list[tuple[str, str]],
+                          page_size: int = 500) -> pd.DataFrame:
     """
-    Given raw observations and IFC room/site info, compute features and tag with room name.
+    Incremental run: fetch only observations newer than each datastream's watermark, featurize
+    just those, append both to the store and advance the watermarks. Returns the new features.
     """
-    records = []
-    for _, row in df.iterrows():
-        timestamp = row['timestamp']
-        internal_temp = row['internal_temp']
-        external_temp = fetch_external_temp(site, timestamp)
-        if external_temp is None:
+    urls = {}
+    marks = {}
+    for room_code, url in rooms:
+        datastream = url.split('?')[0]
+        marks[room_code] = (datastream, store.watermark(datastream))
+        wm = marks[room_code][1]
+        urls[room_code] = url if wm is None else f"{url}&$filter=phenomenonTime gt {frost_time(wm)}"
+
+    with stage('frost_fetch'):
+        raw_data = frost.fetch_many(urls, page_size=page_size)
+
+    new_features = []
+    for room_code, _ in rooms:
+        room = site.get_room(room_code)
+        if room is None:
+            raise ValueError(f"No room named '{room_code}' found in IFC")
+        datastream, wm = marks[room_code]
+        df_raw = raw_data[room_code]
+        if wm is not None and not df_raw.empty:
+            df_raw = df_raw[df_raw['timestamp'] > wm]
+        if df_raw.empty:
+            print(f"[INFO] {room_code}: no observations newer than {wm}")
+            continue
+        df_prepared = prepare_training_data(df_raw, site, room)
+        if df_prepared.empty:
+            print(f"[INFO] {room_code}: {len(df_raw)} new observations, none featurized yet (no weather); "
+                  f"they are fetched again next run")
             continue
-        solar_inflow = calculate_total_solar_inflow(site, room, timestamp)
-        records.append({
-            'timestamp': timestamp,
-            'room_name': room.long_name,
-            'internal_temp': internal_temp,
-            'external_temp': external_temp,
-            'volume': room.volume,
-            'solar_inflow': solar_inflow
-        })
-    return pd.DataFrame(records)
+        # Observations are only done with up to the end of the newest featurized hour (the rest of
+        # that hour is downsampled away). Newer hours usually have no weather yet; they stay past the
+        # watermark, so the next run fetches and featurizes them.
+        done = ingested_until(df_prepared['timestamp'].max())
+        ingested = df_raw[df_raw['timestamp'] <= done]
+        store.append('observations', room.long_name, ingested.assign(room_name=room.long_name))
+        store.append('features', room.long_name, df_prepared)
+        # advance the watermark only once both appends are on disk
+        store.set_watermark(datastream, done)
+        print(f"[INFO] {room_code}: {len(ingested)} new observations, {len(df_prepared)} new feature rows"
+              + (f", {len(df_raw) - len(ingested)} left for the next run" if len(ingested) < len(df_raw) else ""))
+        new_features.append(df_prepared)
+
+    if not new_features:
+        return pd.DataFrame()
+    return pd.concat(new_features, ignore_index=True)
 
 
 def train_and_save_model(df: pd.DataFrame, model_dir: str = "xgboost_models") -> float:
@@ -119,62 +161,92 @@ def train_and_save_model(df: pd.DataFrame, model_dir: str = "xgboost_models") ->
         ('xgb', XGBRegressor(n_estimators=100, learning_rate=0.1, max_depth=3, random_state=42))
     ])
 
-    pipeline.fit(X_train, y_train)
+    with stage('train'):
+        pipeline.fit(X_train, y_train)
     y_pred = pipeline.predict(X_test)
     mse = mean_squared_error(y_test, y_pred)
 
     os.makedirs(model_dir, exist_ok=True)
     today = datetime.now().strftime("%Y%m%d")
     model_path = os.path.join(model_dir, f"xgb_pipeline_{today}.joblib")
-    joblib.dump(pipeline, model_path)
+    with stage('save'):
+        joblib.dump(pipeline, model_path)
     print(f"Model saved to {model_path}. MSE: {mse:.2f}")
     return mse
 
 
 if __name__ == "__main__":
-    # Path to IFC file
-    IFC_FILE = Path("static/IFC/BK_v2_vb_updated.ifc")
-
-    # Set a higher limit for sensor entries
-    SENSOR_LIMIT = 500  # increase from default 100
-
-    # Room definitions
-    rooms = [
-        ("BG.West.010", "https://multicare.bk.tudelft.nl/FROST-Server/v1.0/Datastreams(1)/Observations?$orderby=phenomenonTime desc"),
-        ("BG.West.270", "https://multicare.bk.tudelft.nl/FROST-Server/v1.0/Datastreams(7)/Observations?$orderby=phenomenonTime desc"),
-        ("01.West.120", "https://multicare.bk.tudelft.nl/FROST-Server/v1.0/Datastreams(13)/Observations?$orderby=phenomenonTime desc"),
-    ]
-
-    df_list = []
-    for room_code, url in rooms:
-        site = parse_room(IFC_FILE, room_code)
-        room = site.rooms[room_code]
-        df_raw = fetch_all_sensor_data(url, page_size=SENSOR_LIMIT)
-        df_prepared = prepare_training_data(df_raw, site, room)
-        # ── keep only one observation per hour ──
-        # 1. Floor each timestamp to its hour
-        df_prepared['hour'] = df_prepared['timestamp'].dt.floor('h')
-        # 2. Sort so you pick the earliest (or latest) in each hour
-        df_prepared = df_prepared.sort_values('timestamp')
-        # 3. Group by the floored hour and take the first record
-        df_prepared = (
-            df_prepared
-            .groupby('hour', group_keys=False)
-            .first()
-            .reset_index(drop=True)
-        )
-
-        df_list.append(df_prepared)
-
-    # Merge all rooms into a single DataFrame
-    df_train = pd.concat(df_list, ignore_index=True)
-
-    # Save combined data with room names included
-    OUTPUT_DIR = Path("output")
-    OUTPUT_DIR.mkdir(exist_ok=True)
-    csv_path = OUTPUT_DIR / f"combined_training_data_{datetime.now().strftime('%Y%m%d')}.csv"
-    df_train.to_csv(csv_path, index=False)
-    print(f"Combined training data saved to {csv_path}")
-
-    # Train and save model
-    train_and_save_model(df_train)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Fetch sensor data, build features and train the XGBoost pipeline.")
+    parser.add_argument("--full", action="store_true",
+                        help="refetch everything and write a dated CSV to output/ instead of updating the training store")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="train on every accumulated dataset (output/*.csv and the store), streamed into XGBoost "
+                             "with early stopping on the newest data (see streaming_training.py)")
+    parser.add_argument("--sweep", action="store_true", help="with --out-of-core: parallel hyperparameter sweep")
+    args = parser.parse_args()
+
+    def train(df_train: Optional[pd.DataFrame]) -> None:
+        if args.out_of_core:
+            # streams every dataset on disk instead of training on df_train
+            train_out_of_core(training_sources(store=TrainingStore()), grid=SWEEP_GRID if args.sweep else None)
+        else:
+            train_and_save_model(df_train)
+
+    # wall time per stage (frost_fetch, featurize, pvlib, weather_fetch, train, save), printed at the end
+    with collect_timings() as timings:
+        try:
+            # Path to IFC file
+            IFC_FILE = Path("static/IFC/BK_v2_vb_updated.ifc")
+
+            # Set a higher limit for sensor entries
+            SENSOR_LIMIT = 500  # increase from default 100
+
+            # Room definitions
+            rooms = [
+                ("BG.West.010", "https://multicare.bk.tudelft.nl/FROST-Server/v1.0/Datastreams(1)/Observations?$orderby=phenomenonTime desc"),
+                ("BG.West.270", "https://multicare.bk.tudelft.nl/FROST-Server/v1.0/Datastreams(7)/Observations?$orderby=phenomenonTime desc"),
+                ("01.West.120", "https://multicare.bk.tudelft.nl/FROST-Server/v1.0/Datastreams(13)/Observations?$orderby=phenomenonTime desc"),
+            ]
+
+            # Parse the building once (or reuse its snapshot) for all rooms
+            site = load_building(IFC_FILE)
+
+            if args.full:
+                # Fetch every room's datastream concurrently over one pooled session
+                with stage('frost_fetch'):
+                    raw_data = frost.fetch_many({room_code: url for room_code, url in rooms}, page_size=SENSOR_LIMIT)
+
+                df_list = []
+                for room_code, url in rooms:
+                    room = site.get_room(room_code)
+                    if room is None:
+                        raise ValueError(f"No room named '{room_code}' found in IFC")
+                    df_raw = raw_data[room_code]
+                    # one row per hour (the earliest observation), see prepare_training_data
+                    df_list.append(prepare_training_data(df_raw, site, room))
+
+                # Merge all rooms into a single DataFrame
+                df_train = pd.concat(df_list, ignore_index=True)
+
+                # Save combined data with room names included
+                OUTPUT_DIR = Path("output")
+                OUTPUT_DIR.mkdir(exist_ok=True)
+                csv_path = OUTPUT_DIR / f"combined_training_data_{datetime.now().strftime('%Y%m%d')}.csv"
+                df_train.to_csv(csv_path, index=False)
+                print(f"Combined training data saved to {csv_path}")
+            else:
+                # Only observations newer than the last run are fetched and featurized
+                store = TrainingStore()
+                update_training_store(store, site, rooms, page_size=SENSOR_LIMIT)
+                if args.out_of_core:
+                    # train() streams every dataset on disk instead
+                    df_train = None
+                else:
+                    df_train = store.read('features')
+                    print(f"Training on {len(df_train)} rows from {store.root}/")
+
+            # Train and save model
+            train(df_train)
+        finally:
+            print_stage_timings(timings)